@@ -0,0 +1,99 @@
+import asyncio
+import calendar
+import os
+import time
+from datetime import datetime
+
+from utils.profiling import detach_timer
+
+def add_months(sourcedate, months):
+    """Adds months to a date, preserving day of month where possible."""
+    month = sourcedate.month - 1 + months
+    year = sourcedate.year + month // 12
+    month = month % 12 + 1
+    day = min(sourcedate.day, calendar.monthrange(year, month)[1])
+    return datetime(year, month, day, sourcedate.hour, sourcedate.minute, sourcedate.second)
+
+def next_due(due_ts, monthly_rent, outstanding, now_ts):
+    """Returns (new_due, next_due_ts) if a due has to be billed now, else None.
+
+    Same rule the Payments tab always applied: a resident whose due date has passed is billed one month,
+    and only while nothing is outstanding, since payments also move the due date forward by the months
+    they cover. The next missed month is billed once this one is settled.
+    """
+    if monthly_rent is None or monthly_rent <= 0: return None
+    if due_ts is None or due_ts >= now_ts or outstanding > 0: return None
+
+    new_due = {"date": int(due_ts), "amount": monthly_rent, "remark": "overdue"}
+    return new_due, int(add_months(datetime.fromtimestamp(due_ts), 1).timestamp())
+
+def settle_dues(dues, amount):
+    """Applies a payment to (id, amount) dues, oldest first. Returns (ids paid off, (id, remaining amount) or None)."""
+    paid_ids = []
+    remaining = amount
+    for due_id, due_amount in dues:
+        if remaining <= 0: break
+        if remaining >= due_amount:
+            paid_ids.append(due_id)
+            remaining -= due_amount
+        else:
+            return paid_ids, (due_id, due_amount - remaining)
+    return paid_ids, None
+
+def advance_due_date(due_ts, amount, monthly_rent):
+    """Moves the due date forward by the whole months `amount` covers; unchanged if it covers none or there is no due date."""
+    if due_ts is None or not monthly_rent or monthly_rent <= 0: return due_ts
+    months_paid = amount // monthly_rent
+    if months_paid < 1: return due_ts
+    return int(add_months(datetime.fromtimestamp(due_ts), months_paid).timestamp())
+
+class BillingScheduler:
+    """Runs Database.roll_over_dues for all residents on an interval, guarded by a MySQL named lock
+    so that only one app instance bills at a time."""
+
+    LOCK_NAME = "dormhub_billing"
+
+    def __init__(self, db, interval=None):
+        self.db = db
+        self.interval = interval if interval is not None else int(os.getenv("DORMHUB_BILLING_INTERVAL", 3600))
+        self.task = None
+        self.last_run = None # {"started_at", "duration_ms", "residents_billed", "dues_created", "skipped"}
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run_forever())
+
+    async def stop(self):
+        if self.task is None: return
+        self.task.cancel()
+        try: await self.task
+        except asyncio.CancelledError: pass
+        self.task = None
+
+    async def run_forever(self):
+        detach_timer() # started from Database.connect, possibly inside a route's timer
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Billing run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self):
+        started_at = int(time.time())
+        start = time.perf_counter()
+
+        async with self.db.named_lock(self.LOCK_NAME) as acquired:
+            if not acquired:
+                self.last_run = {"started_at": started_at, "duration_ms": 0, "residents_billed": 0, "dues_created": 0, "skipped": True}
+                print("Billing run skipped: another instance holds the billing lock.")
+                return self.last_run
+
+            billed, dues = await self.db.roll_over_dues()
+
+        duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.last_run = {"started_at": started_at, "duration_ms": duration_ms, "residents_billed": billed, "dues_created": dues, "skipped": False}
+        print(f"Billing run: {dues} due(s) created for {billed} resident(s) in {duration_ms} ms.")
+        return self.last_run
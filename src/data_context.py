@@ -0,0 +1,38 @@
+import asyncio
+
+class DataContext:
+    """The admin-scoped reads shared by AdminPage and its sections for one navigation.
+
+    Each read runs at most once per context, however many sections ask for it. It is only re-run
+    if one of its tables was written (or seen changing by Database.get_table_versions) since.
+    """
+
+    def __init__(self, db, admin_id):
+        self.db = db
+        self.admin_id = admin_id
+        self.reads = {} # name -> (table generation, task)
+
+    async def fetch(self, name, tables, loader):
+        generation = self.db.cache.generation(tables)
+        entry = self.reads.get(name)
+        if entry is None or entry[0] != generation:
+            # A task, so sections loading at the same time share one query
+            entry = (generation, asyncio.ensure_future(loader()))
+            self.reads[name] = entry
+
+        try:
+            return await entry[1]
+        except:
+            if self.reads.get(name) is entry: del self.reads[name]
+            raise
+
+    async def admin(self):
+        res = await self.fetch("admin", ("users",), lambda: self.db.get_user_by_id(self.admin_id))
+        return res[0] if res else None
+
+    async def residents(self):
+        return await self.fetch("residents", ("users",), lambda: self.db.get_residents_for_admin(self.admin_id))
+
+    async def rooms(self):
+        """This admin's rooms, with residents_count/free_beds filled in."""
+        return await self.fetch("rooms", ("rooms", "users"), lambda: self.db.get_rooms_with_occupancy(self.admin_id))
@@ -1,14 +1,98 @@
 import aiomysql
+import asyncio
 import os
+import time
 import aiofiles
 import json
 from datetime import datetime
-import random 
+import secrets
 import string 
+from contextlib import asynccontextmanager
+import functools
 
 import flet as ft
 from utils.element_factory import *
-
+from utils.query_cache import QueryCache
+from utils.pool_stats import PoolStats
+from utils.instrumentation import Instrumentation, instrument_methods, DIAGNOSTICS_ENABLED
+from utils.profiling import add_db_time, route_timings
+from billing import next_due, settle_dues, advance_due_date, BillingScheduler
+from migrations import migrate
+from records import User, Room, MaintenanceRequest, Announcement, Comment
+
+ACCESS_KEY_ATTEMPTS = 10 # unique-key collisions tolerated before create_user gives up
+# users.data keys superseded by the payments/unpaid_dues tables and the users.due_date column; dropped on write
+LEDGER_KEYS = ("payment_history", "unpaid_dues", "due_date")
+
+def db_settings_from_env():
+    """Connection and pool settings, overridable through DORMHUB_DB_* environment variables."""
+    return {
+        "host": os.getenv("DORMHUB_DB_HOST", "localhost"),
+        "port": int(os.getenv("DORMHUB_DB_PORT", 3306)),
+        "user": os.getenv("DORMHUB_DB_USER", "root"),
+        "password": os.getenv("DORMHUB_DB_PASSWORD", ""),
+        "db": os.getenv("DORMHUB_DB_NAME", "dormhub_database"),
+        "minsize": int(os.getenv("DORMHUB_DB_POOL_MIN", 2)),
+        "maxsize": int(os.getenv("DORMHUB_DB_POOL_MAX", 10)),
+        "pool_recycle": int(os.getenv("DORMHUB_DB_POOL_RECYCLE", 3600)), # seconds before an idle connection is replaced
+        "connect_timeout": int(os.getenv("DORMHUB_DB_CONNECT_TIMEOUT", 10)),
+        "acquire_timeout": float(os.getenv("DORMHUB_DB_ACQUIRE_TIMEOUT", 10)) # seconds to wait for a free pooled connection
+    }
+
+def to_int_or_none(value):
+    """Converts the "N/A"-or-epoch-string values stored in users.data to an int (or None)."""
+    try: return int(value)
+    except (ValueError, TypeError): return None
+
+def user_columns_from_data(data):
+    """Returns the typed users columns (role, linked_admin_id, room_id, move_in_date, due_date) for a data dict."""
+    return (
+        data.get("role", "resident"),
+        to_int_or_none(data.get("linked_admin_id")),
+        to_int_or_none(data.get("room_id")),
+        to_int_or_none(data.get("move_in_date")),
+        to_int_or_none(data.get("due_date"))
+    )
+
+def like_prefix(text):
+    """LIKE pattern matching values that start with `text`, with its wildcards escaped."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def time_range_conditions(column, since=None, until=None):
+    """WHERE conditions and params keeping rows whose epoch-seconds `column` is in [since, until)."""
+    conditions, params = [], []
+    if since is not None:
+        conditions.append(f"{column} >= %s")
+        params.append(since)
+    if until is not None:
+        conditions.append(f"{column} < %s")
+        params.append(until)
+    return conditions, params
+
+def version_bump_query(tables):
+    """Builds the statement that increments table_versions for each of the given tables."""
+    rows = ", ".join(["(%s, 1)"] * len(tables))
+    return f"INSERT INTO table_versions (table_name, version) VALUES {rows} ON DUPLICATE KEY UPDATE version = version + 1"
+
+def cached(*tables):
+    """Serves a read method from Database.cache; entries are dropped whenever one of `tables` is written."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            try: hash(key)
+            except TypeError: return await func(self, *args, **kwargs)
+
+            found, value = self.cache.get(key)
+            if found: return value
+
+            value = await func(self, *args, **kwargs)
+            self.cache.set(key, value, tables)
+            return value
+        return wrapper
+    return decorator
+
+@instrument_methods
 class Database:
     def __init__(self):
         self.connected = False
@@ -18,8 +102,16 @@ class Database:
         if base_path is None: base_path = os.getcwd()
 
         self.token_path = os.path.join(base_path, "token.txt")
+        self.diagnostics_path = os.getenv("DORMHUB_DIAGNOSTICS_PATH", os.path.join(base_path, "diagnostics.json"))
         self.pool = None
 
+        self.settings = db_settings_from_env()
+        self.pool_stats = PoolStats()
+        self.instrumentation = Instrumentation()
+        self.cache = QueryCache(ttl=float(os.getenv("DORMHUB_CACHE_TTL", 5)))
+        self.known_versions = {}
+        self.billing_scheduler = BillingScheduler(self)
+
     def set_active_user(self, user_id):
         self.active_user = user_id
 
@@ -27,271 +119,664 @@ class Database:
         return self.active_user
 
     def generate_access_key(self, length=6):
+        """Random key candidate; uniqueness is enforced by the users.access_key unique index on insert."""
         characters = string.ascii_letters + string.digits
-        return ''.join(random.choice(characters) for i in range(length))
+        return ''.join(secrets.choice(characters) for i in range(length))
 
     async def connect(self, page):
         if self.connected: return
 
         create_banner(page, ft.Colors.AMBER_100, ft.Image(src="assets/db-connect.png", color=ft.Colors.AMBER_900), "Attempting to connect to database...", ft.Colors.BLUE)
         try:
-            self.pool = await aiomysql.create_pool(host="localhost", user="root", password="", db="dormhub_database", autocommit=True)
-            create_banner(page, ft.Colors.GREEN_100, ft.Icon(ft.Icons.CHECK_CIRCLE_OUTLINED, color=ft.Colors.GREEN), "You are now connected!", ft.Colors.GREEN_500)
-            self.connected = True
-            await self.create_tables()
-
+            settings = {k: v for k, v in self.settings.items() if k != "acquire_timeout"}
+            self.pool = await aiomysql.create_pool(**settings, autocommit=True)
+            await self.warm_up()
         except Exception as e:
             create_banner(page, ft.Colors.RED_100, ft.Icon(ft.Icons.WARNING_AMBER_OUTLINED, color=ft.Colors.RED), f"Could not connect to database! Please check your internet connection.", ft.Colors.RED)
+            return
 
-    async def create_tables(self):
-        await self.custom_query("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT,
-                username VARCHAR(24),
-                email TEXT,
-                password TEXT,
-                data TEXT,
-                PRIMARY KEY(id)
-            )
-        """)
-        await self.custom_query("""
-            CREATE TABLE IF NOT EXISTS rooms (
-                id INT AUTO_INCREMENT,
-                admin_user_id INT DEFAULT 0, -- NEW COLUMN
-                amenities TEXT,
-                residents TEXT,
-                bed_count INT DEFAULT 0,
-                monthly_rent INT,
-                current_status TEXT,
-                thumbnail TEXT,
-                PRIMARY KEY(id)
-            )
-        """)
-        await self.custom_query("""
-            CREATE TABLE IF NOT EXISTS requests (
-                id INT AUTO_INCREMENT,
-                room_id INT,
-                issue TEXT,
-                current_status TEXT,
-                urgency TEXT,
-                user_id INT,
-                date_created TEXT,
-                date_updated TEXT,
-                PRIMARY KEY(id)
-            )
-        """)
-        await self.custom_query("""
-            CREATE TABLE IF NOT EXISTS announcements (
-                id INT AUTO_INCREMENT,
-                admin_user_id INT DEFAULT 0,  -- ADDED COLUMN
-                title TEXT,
-                content TEXT,
-                date_created TEXT,
-                likes TEXT,
-                PRIMARY KEY(id)
-            )
-        """)
-        
-        await self.custom_query("""
-            CREATE TABLE IF NOT EXISTS comments (
-                id INT AUTO_INCREMENT,
-                announcement_id INT,
-                user_id INT,
-                username TEXT,
-                content TEXT,
-                date_created TEXT,
-                parent_id INT DEFAULT NULL,
-                PRIMARY KEY(id)
-            )
-        """)
+        try:
+            await migrate(self)
+        except Exception as e:
+            # Left unconnected: the screens would otherwise run against a half-upgraded schema
+            create_banner(page, ft.Colors.RED_100, ft.Icon(ft.Icons.WARNING_AMBER_OUTLINED, color=ft.Colors.RED), f"Could not upgrade the database: {e}", ft.Colors.RED)
+            self.pool.close() # the next connect() attempt opens a fresh pool
+            await self.pool.wait_closed()
+            return
+
+        create_banner(page, ft.Colors.GREEN_100, ft.Icon(ft.Icons.CHECK_CIRCLE_OUTLINED, color=ft.Colors.GREEN), "You are now connected!", ft.Colors.GREEN_500)
+        self.connected = True
+        self.billing_scheduler.start()
 
+    async def warm_up(self):
+        """Opens and pings minsize connections up front so the first screens don't pay for the handshakes."""
+        start = time.perf_counter()
+        conns = await asyncio.gather(*[self.pool.acquire() for i in range(self.pool.minsize)])
         try:
-            await self.custom_query("SELECT admin_user_id FROM announcements LIMIT 1")
-        except:
-            print("Migrating Database: Adding 'admin_user_id' column to announcements table...")
-            try:
-                await self.custom_query("ALTER TABLE announcements ADD COLUMN admin_user_id INT DEFAULT 0")
-                print("Migration successful.")
-            except Exception as e:
-                print(f"Migration failed: {e}")
-        
+            await asyncio.gather(*[conn.ping() for conn in conns])
+        finally:
+            for conn in conns: self.pool.release(conn)
+        self.pool_stats.warmup_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrows a pooled connection, recording how long the caller waited for it."""
+        start = time.perf_counter()
         try:
-            await self.custom_query("SELECT admin_user_id FROM rooms LIMIT 1")
-        except:
-            print("Migrating Database: Adding 'admin_user_id' column to rooms table...")
-            try:
-                await self.custom_query("ALTER TABLE rooms ADD COLUMN admin_user_id INT DEFAULT 0")
-                print("Migration successful.")
-            except Exception as e:
-                print(f"Migration failed: {e}")
-
+            conn = await asyncio.wait_for(self.pool.acquire(), self.settings["acquire_timeout"])
+        except asyncio.TimeoutError:
+            self.pool_stats.record_timeout()
+            raise
+        wait = time.perf_counter() - start
+        self.pool_stats.record_acquire(wait, self.pool.size - self.pool.freesize)
+        add_db_time(wait, calls=0)
         try:
-            await self.custom_query("SELECT parent_id FROM comments LIMIT 1")
-        except:
-            print("Migrating Database: Adding 'parent_id' column to comments table...")
-            try:
-                await self.custom_query("ALTER TABLE comments ADD COLUMN parent_id INT DEFAULT NULL")
-                print("Migration successful.")
-            except Exception as e:
-                print(f"Migration failed: {e}")
+            yield conn
+        finally:
+            self.pool.release(conn)
+
+    def get_pool_stats(self):
+        return self.pool_stats.snapshot(self.pool)
+
+    def get_diagnostics(self):
+        """Everything the diagnostics panel shows, as one JSON-serializable dict."""
+        return {
+            "generated_at": int(time.time()),
+            "database": self.instrumentation.snapshot(),
+            "pool": self.get_pool_stats(),
+            "cache": self.get_cache_stats(),
+            "billing": self.billing_scheduler.last_run,
+            "routes": list(route_timings)
+        }
+
+    async def dump_diagnostics(self, path=None):
+        """Writes get_diagnostics() to `path` (DORMHUB_DIAGNOSTICS_PATH by default) and returns the path."""
+        if not DIAGNOSTICS_ENABLED: raise RuntimeError("Diagnostics are disabled; set DORMHUB_DIAGNOSTICS=1")
+        path = path or self.diagnostics_path
+        async with aiofiles.open(path, "w") as f:
+            await f.write(json.dumps(self.get_diagnostics(), indent=2, default=str))
+        return path
 
     async def custom_query(self, query, params=[]):
-        async with self.pool.acquire() as conn:
+        async with self.acquire() as conn:
             async with conn.cursor() as cur:
+                start = time.perf_counter()
                 await cur.execute(query, params)
-                return await cur.fetchall()
+                rows = await cur.fetchall()
+                duration = time.perf_counter() - start
+                self.pool_stats.record_query(duration)
+                add_db_time(duration)
+                self.instrumentation.record_query(query, duration * 1000, __file__)
+                return rows
+
+    @asynccontextmanager
+    async def named_lock(self, name, timeout=0):
+        """Holds MySQL's GET_LOCK(name) for the duration of the block; yields False if another session still holds it after `timeout` seconds."""
+        async with self.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+                acquired = (await cur.fetchone())[0] == 1
+                try:
+                    yield acquired
+                finally:
+                    if acquired: await cur.execute("SELECT RELEASE_LOCK(%s)", (name,))
+
+    async def get_table_versions(self):
+        """Returns {table_name: version}; a table's version changes every time one of the writers below touches it."""
+        res = await self.custom_query("SELECT table_name, version FROM table_versions")
+        versions = {name: version for name, version in res}
+
+        # Writes made by other app instances only show up here, so drop what they made stale
+        changed = [name for name, version in versions.items() if self.known_versions.get(name, version) != version]
+        if changed: self.cache.invalidate(*changed)
+        self.known_versions = versions
+
+        return versions
+
+    def get_cache_stats(self):
+        return self.cache.stats()
+
+    @asynccontextmanager
+    async def transaction(self, *tables):
+        """Yields a cursor whose statements are committed together, or rolled back if anything raises.
+
+        `tables` are the tables the transaction writes: their versions are bumped before the commit
+        and their cached reads are dropped after it.
+        """
+        async with self.acquire() as conn:
+            start = time.perf_counter()
+            await conn.begin()
+            try:
+                async with conn.cursor() as cur:
+                    yield cur
+                    if tables: await cur.execute(version_bump_query(tables), tables)
+                await conn.commit()
+            except:
+                await conn.rollback()
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                self.pool_stats.record_transaction(duration)
+                add_db_time(duration)
+                self.instrumentation.record_query(f"TRANSACTION ({', '.join(tables) or 'no version bump'})", duration * 1000, __file__)
+        if tables: self.cache.invalidate(*tables)
+
+    async def sync_user_tables(self, cur, user_id, data):
+        """Copies a legacy users.data dict, ledger included, into the typed columns and child tables. Only the backfill migration uses it."""
+        await cur.execute(
+            "UPDATE users SET role=%s, linked_admin_id=%s, room_id=%s, move_in_date=%s, due_date=%s WHERE id=%s",
+            (*user_columns_from_data(data), user_id)
+        )
+
+        await cur.execute("DELETE FROM payments WHERE user_id=%s", (user_id,))
+        payments = [(user_id, p.get("date", 0), p.get("amount", 0), p.get("remark")) for p in data.get("payment_history", [])]
+        if payments:
+            await cur.executemany("INSERT INTO payments (user_id, paid_at, amount, remark) VALUES (%s, %s, %s, %s)", payments)
+
+        await cur.execute("DELETE FROM unpaid_dues WHERE user_id=%s", (user_id,))
+        dues = [(user_id, d.get("date", 0), d.get("amount", 0), d.get("remark")) for d in data.get("unpaid_dues", [])]
+        if dues:
+            await cur.executemany("INSERT INTO unpaid_dues (user_id, due_at, amount, remark) VALUES (%s, %s, %s, %s)", dues)
+
+    async def sync_user_columns(self, cur, user_id, data):
+        """Mirrors a users.data dict into the typed role/linked_admin_id/room_id/move_in_date columns."""
+        await cur.execute(
+            "UPDATE users SET role=%s, linked_admin_id=%s, room_id=%s, move_in_date=%s WHERE id=%s",
+            (*user_columns_from_data(data)[:4], user_id)
+        )
 
     async def create_user(self, username, email, password, phone_number="N/A", role="resident", linked_admin_id=None): 
-        async with self.pool.acquire() as conn:
-            access_key = ""
-            if role == "admin":
-                access_key = self.generate_access_key()
-
-            if role == "resident" and linked_admin_id is not None:
-                admin_link = linked_admin_id
-            else:
-                admin_link = "N/A"
-                
+        if role == "resident" and linked_admin_id is not None:
+            admin_link = linked_admin_id
+        else:
+            admin_link = "N/A"
+
+        for attempt in range(ACCESS_KEY_ATTEMPTS):
+            access_key = self.generate_access_key() if role == "admin" else ""
             data = {
                 "role": role, 
                 "access_key": access_key, 
                 "linked_admin_id": admin_link, 
-                "room_id": "N/A", "move_in_date": "N/A", "due_date": "N/A",
-                "payment_history": [], "unpaid_dues": [], "phone_number": phone_number
+                "room_id": "N/A", "move_in_date": "N/A", "phone_number": phone_number
             }
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "INSERT INTO users (username, email, password, data) VALUES (%s, %s, %s, %s)",
-                    (username, email, password, json.dumps(data))
-                )
-                
-    async def get_admin_id_by_access_key(self, key):
-        admin_users = await self.custom_query("SELECT id, data FROM users")
-        
-        for user in admin_users:
-            user_id = user[0]
             try:
-                user_data = json.loads(user[1])
-                if user_data.get("role") == "admin" and user_data.get("access_key") == key:
-                    return user_id
-            except:
-                continue
-        return None
+                async with self.transaction("users") as cur:
+                    await cur.execute(
+                        "INSERT INTO users (username, email, password, data, role, linked_admin_id, access_key) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                        (username, email, password, json.dumps(data), role, to_int_or_none(admin_link), access_key or None)
+                    )
+                return
+            except aiomysql.IntegrityError as e:
+                # Another admin already holds this key: draw a new one
+                if "uq_users_access_key" not in str(e): raise
+        raise RuntimeError(f"Could not generate a unique access key after {ACCESS_KEY_ATTEMPTS} attempts")
+
+    @cached("users")
+    async def get_admin_id_by_access_key(self, key):
+        if not key: return None
+        res = await self.custom_query("SELECT id FROM users WHERE access_key=%s AND role='admin'", (key,))
+        return res[0][0] if res else None
 
+    @cached("users")
     async def get_all_users(self):
-        return await self.custom_query("SELECT * FROM users")
+        return User.from_rows(await self.custom_query(f"SELECT {User.select()} FROM users"))
+
+    @cached("users")
+    async def get_residents_for_admin(self, admin_id):
+        return User.from_rows(await self.custom_query(f"SELECT {User.select()} FROM users WHERE linked_admin_id = %s AND role = 'resident'", (admin_id,)))
+
+    @cached("users")
+    async def get_residents_by_room(self, room_id, exclude_user_id=None):
+        query = f"SELECT {User.select()} FROM users WHERE room_id = %s AND role = 'resident'"
+        if exclude_user_id is None:
+            return User.from_rows(await self.custom_query(query, (room_id,)))
+        return User.from_rows(await self.custom_query(query + " AND id <> %s", (room_id, exclude_user_id)))
+
+    @cached("users")
+    async def search_residents(self, admin_id, query="", assignment="all", after_id=None, limit=None):
+        """admin_id's residents whose username or email starts with `query`, in id order.
+
+        `assignment` is "all", "assigned" or "unassigned" (to a room). Pass the last id of the previous page as `after_id` to get the next one.
+        """
+        sql = f"SELECT {User.select()} FROM users WHERE linked_admin_id = %s AND role = 'resident'"
+        params = [admin_id]
+        if query:
+            # Prefix matches can use the (linked_admin_id, role, username/email) indexes; the column collation makes them case-insensitive
+            sql += " AND (username LIKE %s OR email LIKE %s)"
+            params += [like_prefix(query)] * 2
+        if assignment == "assigned": sql += " AND room_id IS NOT NULL"
+        elif assignment == "unassigned": sql += " AND room_id IS NULL"
+        if after_id is not None:
+            sql += " AND id > %s"
+            params.append(after_id)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return User.from_rows(await self.custom_query(sql, params))
+
+    @cached("users")
+    async def get_resident_counts(self, admin_id):
+        """Returns (residents, residents assigned to a room) for admin_id."""
+        res = await self.custom_query(
+            "SELECT COUNT(*), COUNT(room_id) FROM users WHERE linked_admin_id = %s AND role = 'resident'",
+            (admin_id,)
+        )
+        return (int(res[0][0]), int(res[0][1])) if res else (0, 0)
+
+    @cached("users")
+    async def get_payments(self, user_id):
+        """user_id's payments, oldest first, as {"date", "amount", "remark"} dicts like the old users.data entries."""
+        rows = await self.custom_query("SELECT paid_at, amount, remark FROM payments WHERE user_id = %s ORDER BY paid_at, id", (user_id,))
+        return [{"date": paid_at, "amount": amount, "remark": remark} for paid_at, amount, remark in rows]
+
+    @cached("users")
+    async def get_unpaid_dues(self, user_id):
+        """user_id's unpaid dues, oldest first, in the same shape as get_payments."""
+        rows = await self.custom_query("SELECT due_at, amount, remark FROM unpaid_dues WHERE user_id = %s ORDER BY due_at, id", (user_id,))
+        return [{"date": due_at, "amount": amount, "remark": remark} for due_at, amount, remark in rows]
+
+    @cached("users")
+    async def get_recent_payments(self, admin_id, limit):
+        """The latest `limit` payments by admin_id's residents, newest first, as (username, paid_at, amount)."""
+        return await self.custom_query(
+            """
+            SELECT u.username, p.paid_at, p.amount FROM payments p JOIN users u ON u.id = p.user_id
+            WHERE u.linked_admin_id = %s AND u.role = 'resident' ORDER BY p.paid_at DESC LIMIT %s
+            """,
+            (admin_id, limit)
+        )
 
+    @cached("users")
+    async def get_payment_total_since(self, admin_id, since):
+        """Sum of the payments admin_id's residents made at or after `since`."""
+        res = await self.custom_query(
+            "SELECT COALESCE(SUM(p.amount), 0) FROM payments p JOIN users u ON u.id = p.user_id WHERE u.linked_admin_id = %s AND u.role = 'resident' AND p.paid_at >= %s",
+            (admin_id, since)
+        )
+        return int(res[0][0]) if res else 0
+
+    @cached("users")
+    async def get_outstanding_by_user(self, admin_id):
+        """{resident id: sum of their unpaid dues} for admin_id's residents that owe anything."""
+        res = await self.custom_query(
+            "SELECT d.user_id, SUM(d.amount) FROM unpaid_dues d JOIN users u ON u.id = d.user_id WHERE u.linked_admin_id = %s AND u.role = 'resident' GROUP BY d.user_id",
+            (admin_id,)
+        )
+        return {user_id: int(total) for user_id, total in res}
+
+    async def roll_over_dues(self, now_ts=None, admin_id=None):
+        """Bills every overdue resident (optionally of one admin) that owes nothing yet, in a single transaction.
+
+        Only unpaid_dues and users.due_date are written, never users.data. Returns (residents_billed, dues_created).
+        """
+        if now_ts is None: now_ts = int(datetime.now().timestamp())
+
+        query = """
+            SELECT u.id, u.due_date, r.monthly_rent FROM users u JOIN rooms r ON r.id = u.room_id
+            WHERE u.role = 'resident' AND u.due_date IS NOT NULL AND u.due_date < %s
+            AND NOT EXISTS (SELECT 1 FROM unpaid_dues d WHERE d.user_id = u.id AND d.amount > 0)
+        """
+        params = [now_ts]
+        if admin_id is not None:
+            query += " AND u.linked_admin_id = %s"
+            params.append(admin_id)
+
+        # Not versioned up front: most runs bill nobody, and bumping "users" would make every open screen reload
+        async with self.transaction() as cur:
+            # Locks the user rows, so record_payment (which locks them first too) can't interleave
+            await cur.execute(query + " FOR UPDATE", params)
+            overdue = await cur.fetchall()
+
+            due_updates = []
+            due_rows = []
+            for user_id, due_ts, monthly_rent in overdue:
+                billed = next_due(due_ts, monthly_rent, 0, now_ts)
+                if billed is None: continue
+
+                new_due, next_due_ts = billed
+                due_updates.append((next_due_ts, user_id))
+                due_rows.append((user_id, new_due["date"], new_due["amount"], new_due["remark"]))
+
+            if due_updates:
+                await cur.executemany("UPDATE users SET due_date=%s WHERE id=%s", due_updates)
+                await cur.executemany("INSERT INTO unpaid_dues (user_id, due_at, amount, remark) VALUES (%s, %s, %s, %s)", due_rows)
+                await cur.execute(version_bump_query(("users",)), ("users",))
+
+        if due_updates: self.cache.invalidate("users")
+        return len(due_updates), len(due_rows)
+
+    async def record_payment(self, user_id, amount, remark=None, paid_at=None):
+        """Records a payment: settles unpaid dues oldest first and moves due_date forward by the months it covers.
+
+        Works on the rows as they are under lock, not on a snapshot the caller read earlier. Without a remark,
+        the payment is "late" if anything was outstanding, else "on time". Returns False if the user doesn't exist.
+        """
+        if paid_at is None: paid_at = int(datetime.now().timestamp())
+
+        async with self.transaction("users") as cur:
+            await cur.execute(
+                "SELECT u.due_date, r.monthly_rent FROM users u LEFT JOIN rooms r ON r.id = u.room_id WHERE u.id = %s FOR UPDATE",
+                (user_id,)
+            )
+            row = await cur.fetchone()
+            if row is None: return False
+            due_ts, monthly_rent = row
+
+            await cur.execute("SELECT id, amount FROM unpaid_dues WHERE user_id = %s ORDER BY due_at, id FOR UPDATE", (user_id,))
+            dues = await cur.fetchall()
+            if remark is None: remark = "late" if dues else "on time"
+
+            await cur.execute("INSERT INTO payments (user_id, paid_at, amount, remark) VALUES (%s, %s, %s, %s)", (user_id, paid_at, amount, remark))
+
+            paid_ids, partial = settle_dues(dues, amount)
+            if paid_ids:
+                await cur.execute(f"DELETE FROM unpaid_dues WHERE id IN ({', '.join(['%s'] * len(paid_ids))})", paid_ids)
+            if partial:
+                await cur.execute("UPDATE unpaid_dues SET amount=%s WHERE id=%s", (partial[1], partial[0]))
+
+            new_due_ts = advance_due_date(due_ts, amount, monthly_rent)
+            if new_due_ts != due_ts:
+                await cur.execute("UPDATE users SET due_date=%s WHERE id=%s", (new_due_ts, user_id))
+        return True
+
+    @cached("users")
     async def get_user_by_id(self, user_id):
-        return await self.custom_query("SELECT * FROM users WHERE id = %s", (user_id,))
+        return User.from_rows(await self.custom_query(f"SELECT {User.select()} FROM users WHERE id = %s", (user_id,)))
 
+    @cached("users")
     async def get_user_by_name(self, name, exact=True):
-        if exact: return await self.custom_query("SELECT * FROM users WHERE username = %s", (name,))
-        else: return await self.custom_query("SELECT * FROM users WHERE LOWER(username) LIKE %s", ("%" + name.lower() + "%",))
+        if exact: rows = await self.custom_query(f"SELECT {User.select()} FROM users WHERE username = %s", (name,))
+        else: rows = await self.custom_query(f"SELECT {User.select()} FROM users WHERE LOWER(username) LIKE %s", ("%" + name.lower() + "%",))
+        return User.from_rows(rows)
 
+    @cached("users")
     async def get_user_by_email(self, email):
-        return await self.custom_query("SELECT * FROM users WHERE email = %s", (email,))
+        return User.from_rows(await self.custom_query(f"SELECT {User.select()} FROM users WHERE email = %s", (email,)))
 
+    @cached("users")
     async def get_user_by_email_and_role(self, email, role):
-        res = await self.custom_query("SELECT * FROM users WHERE email = %s", (email,))
-        if res:
-            try:
-                user_data = json.loads(res[0][4])
-                if user_data.get("role") == role:
-                    return res
-            except:
-                pass
-        return []
+        return User.from_rows(await self.custom_query(f"SELECT {User.select()} FROM users WHERE email = %s AND role = %s", (email, role)))
 
     async def update_user(self, user_id, name, email, password, data):
-        await self.custom_query(
-            "UPDATE users SET username=%s, email=%s, password=%s, data=%s WHERE id=%s",
-            (name, email, password, json.dumps(data), user_id)
-        )
+        """Replaces the whole users.data blob. Prefer update_user_fields, which can't overwrite concurrent changes."""
+        data = {k: v for k, v in data.items() if k not in LEDGER_KEYS}
+        async with self.transaction("users") as cur:
+            await cur.execute(
+                "UPDATE users SET username=%s, email=%s, password=%s, data=%s WHERE id=%s",
+                (name, email, password, json.dumps(data), user_id)
+            )
+            await self.sync_user_columns(cur, user_id, data)
+
+    async def update_user_fields(self, user_id, data=None, due_date=None, **columns):
+        """Changes only the given users.data keys, due_date and username/email/password columns.
+
+        The blob is read and written back under a row lock, so values that other sessions changed since the
+        caller read the user are kept. Returns False if the user doesn't exist.
+        """
+        async with self.transaction("users") as cur:
+            await cur.execute("SELECT data FROM users WHERE id = %s FOR UPDATE", (user_id,))
+            row = await cur.fetchone()
+            if row is None: return False
+
+            try: current = json.loads(row[0]) if row[0] else {}
+            except (ValueError, TypeError): current = {}
+            current.update(data or {})
+            current = {k: v for k, v in current.items() if k not in LEDGER_KEYS}
+
+            sets, params = ["data=%s"], [json.dumps(current)]
+            for column in ("username", "email", "password"):
+                if column in columns:
+                    sets.append(f"{column}=%s")
+                    params.append(columns[column])
+            if due_date is not None:
+                sets.append("due_date=%s")
+                params.append(due_date)
+            await cur.execute(f"UPDATE users SET {', '.join(sets)} WHERE id=%s", params + [user_id])
+            await self.sync_user_columns(cur, user_id, current)
+        return True
 
     async def delete_user(self, user_id):
-        await self.custom_query("DELETE FROM users WHERE id=%s", (user_id,))
+        async with self.transaction("users", "requests") as cur:
+            await cur.execute("DELETE FROM payments WHERE user_id=%s", (user_id,))
+            # Their requests drop off the landlord's Maintenance list, as they did when it joined on users
+            await cur.execute("UPDATE requests SET admin_user_id=NULL WHERE user_id=%s", (user_id,))
+            await cur.execute("DELETE FROM unpaid_dues WHERE user_id=%s", (user_id,))
+            await cur.execute("DELETE FROM users WHERE id=%s", (user_id,))
 
     async def create_room(self, bed_count, monthly_rent, current_status, thumbnail, admin_user_id):
-        async with self.pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "INSERT INTO rooms (admin_user_id, amenities, residents, bed_count, monthly_rent, current_status, thumbnail) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                    (admin_user_id, json.dumps([]), json.dumps([]), bed_count, monthly_rent, current_status, thumbnail)
-                )
+        async with self.transaction("rooms") as cur:
+            await cur.execute(
+                "INSERT INTO rooms (admin_user_id, amenities, residents, bed_count, monthly_rent, current_status, thumbnail) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                (admin_user_id, json.dumps([]), json.dumps([]), bed_count, monthly_rent, current_status, thumbnail)
+            )
 
+    async def update_room(self, room_id, bed_count, monthly_rent, current_status, thumbnail):
+        async with self.transaction("rooms") as cur:
+            await cur.execute(
+                "UPDATE rooms SET bed_count=%s, monthly_rent=%s, current_status=%s, thumbnail=%s WHERE id=%s",
+                (bed_count, monthly_rent, current_status, thumbnail, room_id)
+            )
+
+    async def delete_room(self, room_id):
+        async with self.transaction("rooms") as cur:
+            await cur.execute("DELETE FROM rooms WHERE id=%s", (room_id,))
+
+    @cached("rooms")
     async def get_all_rooms(self, admin_user_id=None):
         if admin_user_id is None:
-            return await self.custom_query("SELECT * FROM rooms")
+            return Room.from_rows(await self.custom_query(f"SELECT {Room.select()} FROM rooms"))
         else:
-            return await self.custom_query("SELECT * FROM rooms WHERE admin_user_id = %s", (admin_user_id,))
-
+            return Room.from_rows(await self.custom_query(f"SELECT {Room.select()} FROM rooms WHERE admin_user_id = %s", (admin_user_id,)))
+
+    @cached("rooms", "users")
+    async def get_rooms_with_occupancy(self, admin_user_id, exclude_user_id=None, with_free_beds=False, include_room_id=None):
+        """admin_user_id's rooms in id order, with residents_count (and so free_beds) filled in by one grouped join.
+
+        exclude_user_id is left out of the counts. with_free_beds keeps only the rooms with a bed left, plus include_room_id if given.
+        """
+        query = f"""
+            SELECT {Room.select('r')}, COUNT(u.id) FROM rooms r
+            LEFT JOIN users u ON u.room_id = r.id AND u.role = 'resident'{" AND u.id <> %s" if exclude_user_id is not None else ""}
+            WHERE r.admin_user_id = %s
+            GROUP BY r.id
+        """
+        params = ([exclude_user_id] if exclude_user_id is not None else []) + [admin_user_id]
+        if with_free_beds:
+            query += " HAVING COUNT(u.id) < r.bed_count OR r.id = %s"
+            params.append(include_room_id)
+        return Room.from_rows(await self.custom_query(query + " ORDER BY r.id", params))
+
+    @cached("rooms")
     async def get_room_by_id(self, room_id):
-        return await self.custom_query("SELECT * FROM rooms WHERE id = %s", (room_id,))
+        return Room.from_rows(await self.custom_query(f"SELECT {Room.select()} FROM rooms WHERE id = %s", (room_id,)))
 
     async def create_request(self, room_id, title, desc, urgency, user_id):
-        async with self.pool.acquire() as conn:
-            issue = {"title": title, "desc": desc}
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "INSERT INTO requests (room_id, issue, current_status, urgency, user_id, date_created, date_updated) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                    (room_id, json.dumps(issue), "pending", urgency, user_id, int(datetime.now().timestamp()), int(datetime.now().timestamp()))
-                )
+        """Files a request as user_id. Returns False if that user doesn't exist."""
+        issue = {"title": title, "desc": desc}
+        now = int(datetime.now().timestamp())
+        async with self.transaction("requests") as cur:
+            # admin_user_id is the landlord the request belongs to: the filer's linked admin, or the filer if they are an admin
+            await cur.execute(
+                """
+                INSERT INTO requests (room_id, issue, current_status, urgency, user_id, admin_user_id, date_created, date_updated)
+                SELECT %s, %s, %s, %s, id, IF(role = 'admin', id, linked_admin_id), %s, %s FROM users WHERE id = %s
+                """,
+                (room_id, json.dumps(issue), "pending", urgency, now, now, user_id)
+            )
+            # The SELECT finds no row, and so inserts nothing, if the user was deleted meanwhile
+            return cur.rowcount == 1
 
     async def update_request_status(self, request_id, status):
-        async with self.pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    "UPDATE requests SET current_status=%s, date_updated=%s WHERE id=%s",
-                    (status, int(datetime.now().timestamp()), request_id)
-                )
+        async with self.transaction("requests") as cur:
+            await cur.execute(
+                "UPDATE requests SET current_status=%s, date_updated=%s WHERE id=%s",
+                (status, int(datetime.now().timestamp()), request_id)
+            )
 
+    @cached("requests")
     async def get_all_requests(self):
-        return await self.custom_query("SELECT * FROM requests")
+        return MaintenanceRequest.from_rows(await self.custom_query(f"SELECT {MaintenanceRequest.select()} FROM requests"))
+
+    @cached("requests")
+    async def get_requests_for_admin(self, admin_id, since=None, until=None):
+        """Returns the requests filed by admin_id's residents or by the admin themselves, in [since, until) if given."""
+        conditions, params = time_range_conditions("date_created", since, until)
+        query = f"SELECT {MaintenanceRequest.select()} FROM requests WHERE " + " AND ".join(["admin_user_id = %s"] + conditions)
+        return MaintenanceRequest.from_rows(await self.custom_query(query, [admin_id] + params))
+
+    @cached("requests", "users")
+    async def get_admin_requests_page(self, admin_id, status="all", urgency="all", before=None, limit=None):
+        """Requests filed by admin_id's residents, newest first, with the filer's username.
+
+        `status` and `urgency` are "all" or the value to keep. Pass (created_at, id) of the last request of the previous page as `before` to get the next one.
+        """
+        sql = f"SELECT {MaintenanceRequest.select('r')}, u.username FROM requests r LEFT JOIN users u ON u.id = r.user_id WHERE r.admin_user_id = %s AND r.user_id <> %s"
+        params = [admin_id, admin_id] # an admin's own requests carry their id as admin_user_id too
+        if status != "all":
+            sql += " AND r.current_status = %s"
+            params.append(status)
+        if urgency != "all":
+            sql += " AND r.urgency = %s"
+            params.append(urgency)
+        if before is not None:
+            # Keyset paging along idx_requests_admin_created / idx_requests_admin_status
+            sql += " AND (r.date_created < %s OR (r.date_created = %s AND r.id < %s))"
+            params += [before[0], before[0], before[1]]
+        sql += " ORDER BY r.date_created DESC, r.id DESC"
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return MaintenanceRequest.from_rows(await self.custom_query(sql, params))
+
+    @cached("requests")
+    async def get_request_status_counts(self, admin_id):
+        """{status: number of requests by admin_id's residents in it}."""
+        res = await self.custom_query(
+            "SELECT current_status, COUNT(*) FROM requests WHERE admin_user_id = %s AND user_id <> %s GROUP BY current_status", (admin_id, admin_id)
+        )
+        return {status: int(count) for status, count in res}
+
+    @cached("requests")
+    async def get_open_request_count(self, admin_id):
+        """Number of requests not yet completed that were filed by admin_id's residents."""
+        res = await self.custom_query(
+            "SELECT COUNT(*) FROM requests WHERE admin_user_id = %s AND user_id <> %s AND current_status <> 'completed'", (admin_id, admin_id)
+        )
+        return int(res[0][0]) if res else 0
 
+    @cached("requests")
     async def get_request_by_id(self, request_id):
-        return await self.custom_query("SELECT * FROM requests WHERE id = %s", (request_id,))
+        return MaintenanceRequest.from_rows(await self.custom_query(f"SELECT {MaintenanceRequest.select()} FROM requests WHERE id = %s", (request_id,)))
 
+    @cached("requests")
     async def get_request_by_room_id(self, room_id):
-        return await self.custom_query("SELECT * FROM requests WHERE room_id = %s", (room_id,))
+        return MaintenanceRequest.from_rows(await self.custom_query(f"SELECT {MaintenanceRequest.select()} FROM requests WHERE room_id = %s", (room_id,)))
 
-    async def create_announcement(self, title, content, admin_user_id):
-        await self.custom_query(
-            "INSERT INTO announcements (admin_user_id, title, content, date_created, likes) VALUES (%s, %s, %s, %s, %s)",
-            (admin_user_id, title, content, str(int(datetime.now().timestamp())), json.dumps([]))
-        )
+    @cached("requests")
+    async def get_requests_by_user(self, user_id, room_id):
+        return MaintenanceRequest.from_rows(await self.custom_query(
+            f"SELECT {MaintenanceRequest.select()} FROM requests WHERE room_id = %s AND user_id = %s", (room_id, user_id)
+        ))
 
-    async def get_announcements(self, admin_user_id=None):
-        if admin_user_id is None:
-            return await self.custom_query("SELECT * FROM announcements ORDER BY id DESC")
-        else:
-            return await self.custom_query(
-                "SELECT * FROM announcements WHERE admin_user_id = %s ORDER BY id DESC",
-                (admin_user_id,)
+    async def create_announcement(self, title, content, admin_user_id):
+        async with self.transaction("announcements") as cur:
+            await cur.execute(
+                "INSERT INTO announcements (admin_user_id, title, content, date_created) VALUES (%s, %s, %s, %s)",
+                (admin_user_id, title, content, int(datetime.now().timestamp()))
             )
 
+    @cached("announcements")
+    async def get_announcements(self, admin_user_id=None, before_id=None, limit=None, since=None, until=None):
+        """Announcements newest first. Pass the last id of the previous page as `before_id` to get the next one.
+
+        `since`/`until` (epoch seconds) keep the ones posted in [since, until).
+        """
+        query = f"SELECT {Announcement.select()} FROM announcements"
+        conditions, params = time_range_conditions("date_created", since, until)
+        if admin_user_id is not None:
+            conditions.append("admin_user_id = %s")
+            params.append(admin_user_id)
+        if before_id is not None:
+            conditions.append("id < %s")
+            params.append(before_id)
+        if conditions: query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id DESC"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return Announcement.from_rows(await self.custom_query(query, params))
+
+    @cached("announcements")
+    async def get_announcement_count(self, admin_user_id=None, since=None, until=None):
+        """Number of announcements posted in [since, until), counted on idx_announcements_admin_created."""
+        query = "SELECT COUNT(*) FROM announcements"
+        conditions, params = time_range_conditions("date_created", since, until)
+        if admin_user_id is not None:
+            conditions.append("admin_user_id = %s")
+            params.append(admin_user_id)
+        if conditions: query += " WHERE " + " AND ".join(conditions)
+        res = await self.custom_query(query, params)
+        return int(res[0][0]) if res else 0
+
+    @cached("announcements", "comments", "announcement_likes")
+    async def get_announcements_with_counts(self, admin_user_id=None, viewer_id=None, before_id=None, limit=None):
+        """Announcements newest first, with like_count, comment_count and liked_by_viewer filled in.
+
+        The counts come from indexed subqueries, so a page of the feed is one round-trip. Paged the same way as get_announcements.
+        """
+        query = f"""
+            SELECT {Announcement.select('a')},
+                (SELECT COUNT(*) FROM announcement_likes l WHERE l.announcement_id = a.id),
+                (SELECT COUNT(*) FROM comments c WHERE c.announcement_id = a.id),
+                EXISTS(SELECT 1 FROM announcement_likes l WHERE l.announcement_id = a.id AND l.user_id = %s)
+            FROM announcements a
+        """
+        params = [viewer_id]
+        conditions = []
+        if admin_user_id is not None:
+            conditions.append("a.admin_user_id = %s")
+            params.append(admin_user_id)
+        if before_id is not None:
+            conditions.append("a.id < %s")
+            params.append(before_id)
+        if conditions: query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY a.id DESC"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return Announcement.from_rows(await self.custom_query(query, params))
+
     async def delete_announcement(self, ann_id):
-        await self.custom_query("DELETE FROM announcements WHERE id=%s", (ann_id,))
-        await self.custom_query("DELETE FROM comments WHERE announcement_id=%s", (ann_id,))
+        async with self.transaction("announcements", "comments", "announcement_likes") as cur:
+            await cur.execute("DELETE FROM announcements WHERE id=%s", (ann_id,))
+            await cur.execute("DELETE FROM comments WHERE announcement_id=%s", (ann_id,))
+            await cur.execute("DELETE FROM announcement_likes WHERE announcement_id=%s", (ann_id,))
 
     async def toggle_like(self, ann_id, user_id):
-        res = await self.custom_query("SELECT likes FROM announcements WHERE id=%s", (ann_id,))
-        if not res: return
-        try: likes = json.loads(res[0][0])
-        except: likes = []
-        if user_id in likes: likes.remove(user_id)
-        else: likes.append(user_id)
-        await self.custom_query("UPDATE announcements SET likes=%s WHERE id=%s", (json.dumps(likes), ann_id))
+        """Likes the announcement, or unlikes it if the user already did. Returns True if it is now liked."""
+        async with self.transaction("announcement_likes") as cur:
+            await cur.execute("DELETE FROM announcement_likes WHERE announcement_id=%s AND user_id=%s", (ann_id, user_id))
+            if cur.rowcount: return False
+            await cur.execute("INSERT IGNORE INTO announcement_likes (announcement_id, user_id) VALUES (%s, %s)", (ann_id, user_id))
+            return True
 
     async def add_comment(self, ann_id, user_id, username, content, parent_id=None):
-        await self.custom_query(
-            "INSERT INTO comments (announcement_id, user_id, username, content, date_created, parent_id) VALUES (%s, %s, %s, %s, %s, %s)",
-            (ann_id, user_id, username, content, str(int(datetime.now().timestamp())), parent_id)
-        )
+        async with self.transaction("comments") as cur:
+            await cur.execute(
+                "INSERT INTO comments (announcement_id, user_id, username, content, date_created, parent_id) VALUES (%s, %s, %s, %s, %s, %s)",
+                (ann_id, user_id, username, content, int(datetime.now().timestamp()), parent_id)
+            )
 
-    async def get_comments(self, ann_id):
-        return await self.custom_query("SELECT * FROM comments WHERE announcement_id=%s ORDER BY id ASC", (ann_id,))
+    @cached("comments")
+    async def get_comments(self, ann_id, since=None, until=None):
+        """Comments on ann_id, oldest first; `since`/`until` keep the ones posted in [since, until)."""
+        conditions, params = time_range_conditions("date_created", since, until)
+        query = f"SELECT {Comment.select()} FROM comments WHERE " + " AND ".join(["announcement_id=%s"] + conditions)
+        return Comment.from_rows(await self.custom_query(query + " ORDER BY id ASC", [ann_id] + params))
 
     async def close(self):
+        await self.billing_scheduler.stop()
         if self.pool is not None:
             self.pool.close()
             await self.pool.wait_closed()
@@ -3,6 +3,7 @@ import flet as ft
 from database import Database
 from page_handler import PageHandler
 from utils.element_factory import close_active_banner
+from utils.profiling import RouteTimer, profile_route
 
 def main(page: ft.Page):
     page.title = "DormHub"
@@ -15,23 +16,26 @@ def main(page: ft.Page):
     ph = PageHandler(page)
 
     async def route_change(route):
+        timer = RouteTimer(page.route)
         try:
-            page.views.clear()
-            close_active_banner(page)
-
-            match page.route:
-                case '/':
-                    page.views.append(await ph.set_root_page())
-                case "/login-admin": 
-                    page.views.append(await ph.show_login_page(0))
-                case "/login-resident": 
-                    page.views.append(await ph.show_login_page(1))
-                case "/active-admin": 
-                    page.views.append(await ph.show_admin_page())
-                case "/active-resident": 
-                    page.views.append(await ph.show_resident_page())
-
-            page.update()
+            with timer.activate(), profile_route(page.route):
+                page.views.clear()
+                close_active_banner(page)
+
+                match page.route:
+                    case '/':
+                        page.views.append(await ph.set_root_page())
+                    case "/login-admin": 
+                        page.views.append(await ph.show_login_page(0))
+                    case "/login-resident": 
+                        page.views.append(await ph.show_login_page(1))
+                    case "/active-admin": 
+                        page.views.append(await ph.show_admin_page())
+                    case "/active-resident": 
+                        page.views.append(await ph.show_resident_page())
+
+                with timer.measure_update():
+                    page.update()
         except Exception as e: print("Error: ", e)
 
 
@@ -0,0 +1,345 @@
+import json
+import time
+
+import aiomysql
+
+# Every step is written so it can run against a database in any earlier state, since databases created
+# before schema_version existed were upgraded piecemeal by the old startup probes.
+
+LOCK_NAME = "dormhub_migrations"
+LOCK_TIMEOUT = 60 # seconds to wait for another instance that is already migrating
+ER_NO_SUCH_TABLE = 1146 # MySQL error for a missing table
+
+async def column_exists(db, table, column):
+    res = await db.custom_query(
+        "SELECT 1 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column)
+    )
+    return len(res) > 0
+
+async def index_exists(db, table, index):
+    res = await db.custom_query(
+        "SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1",
+        (table, index)
+    )
+    return len(res) > 0
+
+async def column_type(db, table, column):
+    res = await db.custom_query(
+        "SELECT DATA_TYPE FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column)
+    )
+    return res[0][0].lower() if res else None
+
+async def add_column(db, table, column, definition):
+    """Adds the column unless it is already there. Returns True if it was added."""
+    if await column_exists(db, table, column): return False
+    await db.custom_query(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+async def convert_to_epoch(db, table, column):
+    """Turns a TEXT column of epoch-second strings into BIGINT NOT NULL DEFAULT 0. Values that aren't numbers become 0 ("N/A")."""
+    if await column_type(db, table, column) == "bigint": return
+    await db.custom_query(f"UPDATE {table} SET {column} = '0' WHERE {column} IS NULL OR {column} NOT REGEXP '^[0-9]+$'")
+    await db.custom_query(f"ALTER TABLE {table} MODIFY {column} BIGINT NOT NULL DEFAULT 0")
+
+async def add_index(db, table, index, columns, unique=False):
+    """Adds the index unless it is already there. Returns True if it was added."""
+    if await index_exists(db, table, index): return False
+    await db.custom_query(f"ALTER TABLE {table} ADD {'UNIQUE ' if unique else ''}INDEX {index} ({columns})")
+    return True
+
+async def create_base_tables(db):
+    """The schema as it was before versioned migrations."""
+    await db.custom_query("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT,
+            username VARCHAR(24),
+            email TEXT,
+            password TEXT,
+            data TEXT,
+            PRIMARY KEY(id)
+        )
+    """)
+    await db.custom_query("""
+        CREATE TABLE IF NOT EXISTS rooms (
+            id INT AUTO_INCREMENT,
+            admin_user_id INT DEFAULT 0,
+            amenities TEXT,
+            residents TEXT,
+            bed_count INT DEFAULT 0,
+            monthly_rent INT,
+            current_status TEXT,
+            thumbnail TEXT,
+            PRIMARY KEY(id)
+        )
+    """)
+    await db.custom_query("""
+        CREATE TABLE IF NOT EXISTS requests (
+            id INT AUTO_INCREMENT,
+            room_id INT,
+            issue TEXT,
+            current_status TEXT,
+            urgency TEXT,
+            user_id INT,
+            date_created TEXT,
+            date_updated TEXT,
+            PRIMARY KEY(id)
+        )
+    """)
+    await db.custom_query("""
+        CREATE TABLE IF NOT EXISTS announcements (
+            id INT AUTO_INCREMENT,
+            admin_user_id INT DEFAULT 0,
+            title TEXT,
+            content TEXT,
+            date_created TEXT,
+            likes TEXT,
+            PRIMARY KEY(id)
+        )
+    """)
+    await db.custom_query("""
+        CREATE TABLE IF NOT EXISTS comments (
+            id INT AUTO_INCREMENT,
+            announcement_id INT,
+            user_id INT,
+            username TEXT,
+            content TEXT,
+            date_created TEXT,
+            parent_id INT DEFAULT NULL,
+            PRIMARY KEY(id)
+        )
+    """)
+
+async def add_owner_and_reply_columns(db):
+    await add_column(db, "announcements", "admin_user_id", "INT DEFAULT 0")
+    await add_column(db, "rooms", "admin_user_id", "INT DEFAULT 0")
+    await add_column(db, "comments", "parent_id", "INT DEFAULT NULL")
+
+async def create_table_versions(db):
+    await db.custom_query("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name VARCHAR(32),
+            version BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY(table_name)
+        )
+    """)
+
+async def normalize_user_data(db):
+    """Typed users columns plus the payments/unpaid_dues child tables, backfilled from users.data."""
+    await db.custom_query("""
+        CREATE TABLE IF NOT EXISTS payments (
+            id INT AUTO_INCREMENT,
+            user_id INT NOT NULL,
+            paid_at BIGINT,
+            amount INT,
+            remark VARCHAR(32),
+            PRIMARY KEY(id),
+            INDEX idx_payments_user (user_id, paid_at)
+        )
+    """)
+    await db.custom_query("""
+        CREATE TABLE IF NOT EXISTS unpaid_dues (
+            id INT AUTO_INCREMENT,
+            user_id INT NOT NULL,
+            due_at BIGINT,
+            amount INT,
+            remark VARCHAR(32),
+            PRIMARY KEY(id),
+            INDEX idx_unpaid_dues_user (user_id, due_at)
+        )
+    """)
+
+    await add_column(db, "users", "role", "VARCHAR(16) DEFAULT 'resident'")
+    await add_column(db, "users", "linked_admin_id", "INT DEFAULT NULL")
+    await add_column(db, "users", "room_id", "INT DEFAULT NULL")
+    await add_column(db, "users", "move_in_date", "BIGINT DEFAULT NULL")
+    await add_column(db, "users", "due_date", "BIGINT DEFAULT NULL")
+    await add_index(db, "users", "idx_users_admin_role", "linked_admin_id, role")
+    await add_index(db, "users", "idx_users_room", "room_id")
+    await add_index(db, "users", "idx_users_due_date", "due_date")
+
+    # Every time the step runs, not only when the columns were just added: ALTER TABLE commits on its own,
+    # so a run that died after it would otherwise leave the columns at their defaults for good
+    await backfill_user_tables(db)
+
+async def backfill_user_tables(db):
+    """Populates the typed users columns, payments and unpaid_dues from every existing users.data blob. Safe to re-run."""
+    users = await db.custom_query("SELECT id, data FROM users")
+    async with db.transaction("users") as cur:
+        for user_id, raw_data in users:
+            try: data = json.loads(raw_data)
+            except: continue
+            await db.sync_user_tables(cur, user_id, data)
+
+async def index_comments_by_announcement(db):
+    await add_index(db, "comments", "idx_comments_announcement", "announcement_id")
+
+async def move_likes_to_table(db):
+    """Copies every announcements.likes JSON array into announcement_likes, then drops the column."""
+    await db.custom_query("""
+        CREATE TABLE IF NOT EXISTS announcement_likes (
+            announcement_id INT NOT NULL,
+            user_id INT NOT NULL,
+            PRIMARY KEY(announcement_id, user_id),
+            INDEX idx_announcement_likes_user (user_id)
+        )
+    """)
+    if not await column_exists(db, "announcements", "likes"): return
+
+    announcements = await db.custom_query("SELECT id, likes FROM announcements")
+    likes = []
+    for ann_id, raw_likes in announcements:
+        try: user_ids = json.loads(raw_likes) if raw_likes else []
+        except: continue
+        likes += [(ann_id, user_id) for user_id in user_ids if isinstance(user_id, int)]
+
+    async with db.transaction("announcement_likes") as cur:
+        if likes:
+            await cur.executemany("INSERT IGNORE INTO announcement_likes (announcement_id, user_id) VALUES (%s, %s)", likes)
+
+    # Only dropped once every like has been copied over
+    await db.custom_query("ALTER TABLE announcements DROP COLUMN likes")
+
+async def add_access_keys(db):
+    """Copies each admin's access key from users.data into the uniquely indexed access_key column.
+
+    Missing keys, and keys already taken by another admin, are replaced with a fresh one.
+    """
+    await add_column(db, "users", "access_key", "VARCHAR(16) CHARACTER SET ascii COLLATE ascii_bin DEFAULT NULL")
+    await add_index(db, "users", "uq_users_access_key", "access_key", unique=True)
+
+    # Only the admins still without one, so a run that stopped halfway picks up where it left off
+    admins = await db.custom_query("SELECT id, data FROM users WHERE role='admin' AND access_key IS NULL")
+    for admin_id, raw_data in admins:
+        try: data = json.loads(raw_data)
+        except: continue
+
+        key = data.get("access_key") or None
+        while True:
+            try:
+                if key is not None:
+                    async with db.transaction("users") as cur:
+                        await cur.execute("UPDATE users SET access_key=%s WHERE id=%s", (key, admin_id))
+                        if data.get("access_key") != key:
+                            data["access_key"] = key
+                            await cur.execute("UPDATE users SET data=%s WHERE id=%s", (json.dumps(data), admin_id))
+                    break
+            except aiomysql.IntegrityError:
+                print(f"Access key of admin {admin_id} is already taken, generating a new one.")
+            key = db.generate_access_key()
+
+async def add_lookup_indexes(db):
+    """Indexes for the remaining lookups: sign-up/login by name and email, rooms and posts by owner, requests by room."""
+    await add_index(db, "requests", "idx_requests_room", "room_id")
+    await add_index(db, "rooms", "idx_rooms_admin", "admin_user_id")
+    await add_index(db, "announcements", "idx_announcements_admin", "admin_user_id, id")
+
+    # TEXT columns can't be indexed without a prefix, and no valid address is longer than 254 characters
+    await db.custom_query("ALTER TABLE users MODIFY email VARCHAR(255)")
+    await add_index(db, "users", "idx_users_email", "email")
+
+    duplicates = await db.custom_query("SELECT username FROM users GROUP BY username HAVING COUNT(*) > 1")
+    if duplicates:
+        print(f"Usernames are not unique ({', '.join(d[0] for d in duplicates)}), adding a non-unique index instead.")
+        await add_index(db, "users", "idx_users_username", "username")
+    else:
+        await add_index(db, "users", "uq_users_username", "username", unique=True)
+
+async def index_resident_search(db):
+    """Composite indexes for the Residents search: an admin's residents by username or email prefix."""
+    await add_index(db, "users", "idx_users_admin_username", "linked_admin_id, role, username")
+    await add_index(db, "users", "idx_users_admin_email", "linked_admin_id, role, email")
+
+async def index_requests_by_user(db):
+    await add_index(db, "requests", "idx_requests_user", "user_id")
+
+async def index_requests_by_admin(db):
+    """Owner column, integer timestamps and the composite indexes behind the Maintenance list's filters and paging."""
+    await add_column(db, "requests", "admin_user_id", "INT DEFAULT NULL")
+    # Rows still without an owner, so a run that stopped after the ALTER is finished on the next start
+    async with db.transaction("requests") as cur:
+        await cur.execute(
+            "UPDATE requests r JOIN users u ON u.id = r.user_id SET r.admin_user_id = IF(u.role = 'admin', u.id, u.linked_admin_id) WHERE r.admin_user_id IS NULL"
+        )
+
+    await convert_to_epoch(db, "requests", "date_created")
+    await convert_to_epoch(db, "requests", "date_updated")
+
+    # TEXT can't be indexed without a prefix, and a missing status has always been shown as pending
+    await db.custom_query("UPDATE requests SET current_status = 'pending' WHERE current_status IS NULL OR current_status = ''")
+    await db.custom_query("ALTER TABLE requests MODIFY current_status VARCHAR(16) DEFAULT 'pending', MODIFY urgency VARCHAR(16)")
+    await add_index(db, "requests", "idx_requests_admin_created", "admin_user_id, date_created, id")
+    await add_index(db, "requests", "idx_requests_admin_status", "admin_user_id, current_status, date_created, id")
+
+async def index_post_timestamps(db):
+    """Integer date_created for announcements and comments, indexed for time-range reads."""
+    await convert_to_epoch(db, "announcements", "date_created")
+    await convert_to_epoch(db, "comments", "date_created")
+    await add_index(db, "announcements", "idx_announcements_admin_created", "admin_user_id, date_created")
+
+    # Covers every lookup the single-column index served
+    await add_index(db, "comments", "idx_comments_announcement_created", "announcement_id, date_created")
+    if await index_exists(db, "comments", "idx_comments_announcement"):
+        await db.custom_query("ALTER TABLE comments DROP INDEX idx_comments_announcement")
+
+# (version, description, step). Append new steps at the end; never renumber or edit applied ones.
+MIGRATIONS = [
+    (1, "Creating base tables", create_base_tables),
+    (2, "Adding owner and reply columns", add_owner_and_reply_columns),
+    (3, "Creating table_versions", create_table_versions),
+    (4, "Normalizing users.data into typed columns", normalize_user_data),
+    (5, "Indexing comments by announcement", index_comments_by_announcement),
+    (6, "Moving announcement likes into the announcement_likes table", move_likes_to_table),
+    (7, "Moving admin access keys into a unique 'access_key' column", add_access_keys),
+    (8, "Adding lookup indexes and unique usernames", add_lookup_indexes),
+    (9, "Indexing resident search", index_resident_search),
+    (10, "Indexing requests by user", index_requests_by_user),
+    (11, "Adding request owners, integer request timestamps and their indexes", index_requests_by_admin),
+    (12, "Converting announcement and comment timestamps to integers", index_post_timestamps),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+async def get_schema_version(db):
+    try:
+        res = await db.custom_query("SELECT MAX(version) FROM schema_version")
+    except aiomysql.ProgrammingError as e:
+        if e.args[0] == ER_NO_SUCH_TABLE: return None # Table doesn't exist yet
+        raise
+    return res[0][0] or 0
+
+async def migrate(db):
+    """Brings the schema up to LATEST_VERSION. Costs a single query when it is already current."""
+    if await get_schema_version(db) == LATEST_VERSION: return
+
+    async with db.named_lock(LOCK_NAME, timeout=LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            # The schema may still be old or half-upgraded, so startup must stop just as for a failed step
+            raise RuntimeError("Another instance is still migrating the database; try again once it has finished.")
+
+        await db.custom_query("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT,
+                description VARCHAR(128),
+                applied_at BIGINT,
+                PRIMARY KEY(version)
+            )
+        """)
+        current = await get_schema_version(db) # Re-read, another instance may have migrated while we waited
+
+        for version, description, step in MIGRATIONS:
+            if version <= current: continue
+
+            print(f"Migrating Database: {description}...")
+            try:
+                await step(db)
+                await db.custom_query(
+                    "INSERT INTO schema_version (version, description, applied_at) VALUES (%s, %s, %s)",
+                    (version, description, int(time.time()))
+                )
+                print("Migration successful.")
+            except Exception as e:
+                # Later steps and the app build on this one: stop startup here and retry on the next start
+                print(f"Migration failed: {e}")
+                raise
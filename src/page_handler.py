@@ -106,15 +106,17 @@ class PageHandler:
             self.page.go("/")
             return
 
-        self.active_portal = ResidentPage(self.page, self.page.data.get_active_user())
-        await self.active_portal.update_data()
+        # Reuse the portal (and its cached sections) when the same resident comes back to it
+        if not (isinstance(self.active_portal, ResidentPage) and self.active_portal.id == active_user):
+            self.active_portal = ResidentPage(self.page, active_user)
         return await self.active_portal.show()
 
     
     async def show_admin_page(self, section=None):
         if self.page.data.connected == False: return
 
-        self.active_portal = AdminPage(self.page)
-        await self.active_portal.update_data()
+        active_user = self.page.data.get_active_user()
+        if not (isinstance(self.active_portal, AdminPage) and self.active_portal.user_id == active_user):
+            self.active_portal = AdminPage(self.page)
         return await self.active_portal.show()
 
@@ -6,21 +6,25 @@ from pages.sections.admin_payment import AdminPayment
 from pages.sections.maintenance import Maintenance
 from pages.sections.admin_announcements import AdminAnnouncements
 from pages.sections.access_key import AccessKeySection 
+from pages.sections.diagnostics import Diagnostics
+from utils.instrumentation import DIAGNOSTICS_ENABLED
+from pages.portal import Portal
 from pages.components.navbar import NavBar
 from pages.components.navbar_button import NavBarButton
-import json
+from data_context import DataContext
+
+class AdminPage(Portal):
+    DATA_TABLES = ("users", "requests")
 
-class AdminPage:
     def __init__(self, page: ft.Page):
-        self.page = page
+        super().__init__(page)
         self.page.theme_mode = ft.ThemeMode.LIGHT
-        self.view = None
-        self.data = {}
-        self.navbar = None
         self.username = "Administrator"
         self.email = None 
         self.admin_access_key = ""
         self.maintenance_count = 0 
+        self.user_id = page.data.get_active_user()
+        self.context = DataContext(page.data, self.user_id) # replaced on every navigation, see new_context()
 
     def update_maintenance_badge(self):
         if self.navbar and self.navbar.buttons:
@@ -35,70 +39,48 @@ class AdminPage:
         active_user_id = self.page.data.get_active_user()
         if active_user_id is None: return 
 
-        user_res = await self.page.data.get_user_by_id(active_user_id)
-        if user_res:
-            user_record = user_res[0]
-            self.username = user_record[1]
-            self.email = user_record[2]
-            try:
-                user_data = json.loads(user_record[4])
-                self.admin_access_key = user_data.get("access_key", "") # Retrieve the key
-            except:
-                self.admin_access_key = ""
-
-        # Update other data lists
-        self.data.update({"residents": await self.page.data.get_all_users()})
-        self.data.update({"rooms": await self.page.data.get_all_rooms()})
-        all_requests = await self.page.data.get_all_requests()
-        self.data.update({"requests": all_requests})
-        
-        all_users = await self.page.data.get_all_users()
-        current_admin_id = active_user_id
-        
-        linked_user_ids = {current_admin_id} 
-        for user in all_users:
-            user_id = user[0]
-            try:
-                u_data = json.loads(user[4])
-                if u_data.get("role") == "resident" and u_data.get("linked_admin_id") == current_admin_id:
-                    linked_user_ids.add(user_id)
-            except:
-                continue
+        user_record = await self.context.admin()
+        if user_record:
+            self.username = user_record.username
+            self.email = user_record.email
+            self.admin_access_key = user_record.access_key or user_record.data.get("access_key", "")
 
-        # Count non-completed requests from linked users
-        maintenance_count = 0
-        for req in all_requests:
-            # req: (id, room_id, issue, current_status, urgency, user_id, date_created, date_updated)
-            req_user_id = req[5]
-            status = req[3]
-            
-            # Count if the request is from a linked user AND is not completed
-            if req_user_id in linked_user_ids and status != "completed":
-                maintenance_count += 1
-                
-        self.maintenance_count = maintenance_count
+        # Non-completed requests from this admin's residents, counted by the database
+        self.maintenance_count = await self.page.data.get_open_request_count(self.user_id)
         
         # After recalculating the count, update the badge only if the navbar is built.
         if self.navbar:
             self.update_maintenance_badge()
 
+    def new_context(self):
+        """Starts a fresh DataContext; called once per navigation so each table is read at most once per render."""
+        self.context = DataContext(self.page.data, self.user_id)
+        return self.context
+
     async def show(self):
-        await self.update_data()
+        if self.view is not None: return self.resume()
+
+        self.new_context()
+        versions = await self.page.data.get_table_versions()
+        await self.refresh_data(versions)
         
-        self.navbar = NavBar(
-            isAdmin=True, current_page=self,
-            buttons=[
-                NavBarButton(ft.Icons.INSERT_CHART_OUTLINED_ROUNDED, "Overview", lambda e: self.change_tab(Overview(self), "Overview"), True),
-                NavBarButton(ft.Icons.HOME_ROUNDED, "Rooms", lambda e: self.change_tab(Rooms(self), "Rooms")),
-                NavBarButton(ft.Icons.PEOPLE_OUTLINE_ROUNDED, "Residents", lambda e: self.change_tab(Residents(self), "Residents")),
-                NavBarButton(ft.Icons.PAYMENTS_OUTLINED, "Payments", lambda e: self.change_tab(AdminPayment(self), "Payments")),
-                NavBarButton(ft.Icons.BUILD_CIRCLE_OUTLINED, "Maintenance", lambda e: self.change_tab(Maintenance(self), "Maintenance"), badge_count=self.maintenance_count),
-                NavBarButton(ft.Icons.CAMPAIGN_OUTLINED, "Announcements", lambda e: self.change_tab(AdminAnnouncements(self), "Announcements")),
-                NavBarButton(ft.Icons.KEY_OUTLINED, "Access Key", lambda e: self.change_tab(AccessKeySection(self), "Access Key")),
-            ]
-        )
+        buttons = [
+            NavBarButton(ft.Icons.INSERT_CHART_OUTLINED_ROUNDED, "Overview", lambda e: self.change_tab(Overview, "Overview"), True),
+            NavBarButton(ft.Icons.HOME_ROUNDED, "Rooms", lambda e: self.change_tab(Rooms, "Rooms")),
+            NavBarButton(ft.Icons.PEOPLE_OUTLINE_ROUNDED, "Residents", lambda e: self.change_tab(Residents, "Residents")),
+            NavBarButton(ft.Icons.PAYMENTS_OUTLINED, "Payments", lambda e: self.change_tab(AdminPayment, "Payments")),
+            NavBarButton(ft.Icons.BUILD_CIRCLE_OUTLINED, "Maintenance", lambda e: self.change_tab(Maintenance, "Maintenance"), badge_count=self.maintenance_count),
+            NavBarButton(ft.Icons.CAMPAIGN_OUTLINED, "Announcements", lambda e: self.change_tab(AdminAnnouncements, "Announcements")),
+            NavBarButton(ft.Icons.KEY_OUTLINED, "Access Key", lambda e: self.change_tab(AccessKeySection, "Access Key")),
+        ]
+        if DIAGNOSTICS_ENABLED:
+            buttons.append(NavBarButton(ft.Icons.SPEED_ROUNDED, "Diagnostics", lambda e: self.change_tab(Diagnostics, "Diagnostics")))
+        self.navbar = NavBar(isAdmin=True, current_page=self, buttons=buttons)
         
         initial_section = Overview(self)
+        initial_section.loaded_versions = versions
+        self.sections[Overview] = initial_section
+        self.current_section = initial_section
         
         self.view = ft.View(
             "/active-admin", 
@@ -115,13 +97,10 @@ class AdminPage:
         )
         return self.view
 
-    def change_tab(self, section, button_text):
+    def change_tab(self, section_class, button_text):
         """Switches the content section and updates navbar highlighting."""
         self.navbar.highlight_tab(button_text)
-        self.page.run_task(self.show_section, section)
+        self.open_tab(section_class)
 
-    async def show_section(self, section):
-        if len(self.view.controls[0].controls) > 1: self.view.controls[0].controls[1] = section
-        else: self.view.controls[0].controls.append(section)
-        await self.update_data()
-        self.view.update()
\ No newline at end of file
+    async def before_open(self, versions):
+        self.new_context() # each tab switch reads every table at most once
@@ -2,7 +2,6 @@ import flet as ft
 import re
 import asyncio
 import math
-import json 
 
 from utils.element_factory import *
 
@@ -380,7 +379,7 @@ class LoginPage:
             return
 
         # User found, check password
-        if user_data[0][3] != password:
+        if user_data[0].password != password:
             create_banner(self.page, ft.Colors.RED_100, ft.Icon(ft.Icons.PERSON_OFF_OUTLINED, color=ft.Colors.RED), "Incorrect password.", ft.Colors.RED)
             emailTF.error_text = ""
             passwordTF.error_text = "Incorrect password!"
@@ -390,7 +389,7 @@ class LoginPage:
 
         emailTF.error_text = ""
         passwordTF.error_text = ""
-        self.page.data.set_active_user(user_data[0][0])
+        self.page.data.set_active_user(user_data[0].id)
         self.page.go("/active-admin")
         self.page.update()
         return
@@ -462,14 +461,9 @@ class LoginPage:
         if self.type == 1:
             user_data = await self.page.data.get_user_by_name(login_val)
             
-            is_admin = False
-            if len(user_data) > 0:
-                try:
-                    u_data = json.loads(user_data[0][4])
-                    if u_data.get("role") == "admin": is_admin = True
-                except: pass
-
-            if len(user_data) == 0 or user_data[0][3] != password or is_admin:
+            is_admin = len(user_data) > 0 and user_data[0].is_admin
+
+            if len(user_data) == 0 or user_data[0].password != password or is_admin:
                 create_banner(self.page, ft.Colors.RED_100, ft.Icon(ft.Icons.PERSON_OFF_OUTLINED, color=ft.Colors.RED), "No user found! Double check your username or password.", ft.Colors.RED)
                 loginTF.error_text = "No user found!"
                 passwordTF.error_text = "Incorrect username or password!"
@@ -480,7 +474,7 @@ class LoginPage:
             loginTF.error_text = ""
             passwordTF.error_text = ""
 
-            self.page.data.set_active_user(user_data[0][0])
+            self.page.data.set_active_user(user_data[0].id)
             self.page.go("/active-resident")
             self.page.update()
 
@@ -0,0 +1,77 @@
+import flet as ft
+
+from pages.sections.section import tables_changed
+from utils.profiling import timed, measure_update
+
+class Portal:
+    """What the admin and resident portals share: one cached instance per tab, reloaded only when its tables changed.
+
+    Subclasses build `view` (a Row of the navbar and the current section) in show(), and read their
+    own data in update_data(), which depends on DATA_TABLES.
+    """
+
+    DATA_TABLES = () # what update_data reads
+
+    def __init__(self, page: ft.Page):
+        self.page = page
+        self.view = None
+        self.navbar = None
+        self.sections = {} # section class -> instance, kept across tab switches and navigations
+        self.current_section = None
+        self.data_versions = {} # table versions update_data last loaded
+
+    async def update_data(self):
+        pass
+
+    async def refresh_data(self, versions):
+        """Re-runs update_data only if one of the tables it reads changed since the last run."""
+        if not tables_changed(self.DATA_TABLES, self.data_versions, versions): return
+        self.data_versions = versions
+        await self.update_data()
+
+    def resume(self):
+        """The already built view, if any, with the current tab refreshed once the view is back on the page.
+
+        Returning to a portal keeps its controls and only reloads what changed.
+        """
+        if self.view is not None: self.open_tab(type(self.current_section))
+        return self.view
+
+    def open_tab(self, section_class):
+        self.page.run_task(timed, f"{self.view.route} {section_class.__name__}", self.open_section, section_class)
+
+    async def before_open(self, versions):
+        """Called by open_section before it decides whether the cached section is stale."""
+        pass
+
+    async def open_section(self, section_class):
+        """Shows the cached instance of a section, refreshing or rebuilding it only if its tables changed."""
+        versions = await self.page.data.get_table_versions()
+        await self.before_open(versions)
+
+        section = self.sections.get(section_class)
+        if section is not None and section.is_stale(versions):
+            # Back on the page first: a detached control has no page, so its refresh could neither query nor update()
+            self.attach_section(section)
+            self.view.update()
+            if not await section.refresh(): section = None
+        if section is None:
+            section = section_class(self)
+        section.loaded_versions = versions
+
+        await self.show_section(section, versions)
+
+    def attach_section(self, section):
+        """Makes `section` the content next to the navbar. Takes effect on the next view.update()."""
+        self.sections[type(section)] = section
+        self.current_section = section
+
+        if len(self.view.controls[0].controls) > 1: self.view.controls[0].controls[1] = section
+        else: self.view.controls[0].controls.append(section)
+
+    async def show_section(self, section, versions=None):
+        self.attach_section(section)
+
+        if versions is None: versions = await self.page.data.get_table_versions()
+        await self.refresh_data(versions)
+        with measure_update(): self.view.update()
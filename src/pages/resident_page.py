@@ -1,5 +1,4 @@
 import flet as ft
-import json
 import time 
 from pages.sections.my_room import MyRoom
 from pages.sections.payment import Payment
@@ -8,11 +7,13 @@ from pages.sections.resident_announcements import ResidentAnnouncements
 from pages.sections.settings import Settings 
 from pages.components.navbar import NavBar
 from pages.components.navbar_button import NavBarButton
+from pages.portal import Portal
+
+class ResidentPage(Portal):
+    DATA_TABLES = ("users", "rooms", "requests", "announcements")
 
-class ResidentPage:
     def __init__(self, page: ft.Page, user_id):
-        super().__init__()
-        self.page = page
+        super().__init__(page)
         self.id = user_id
         self.username = None; self.email = None; self.password = None; self.data = None
         self.unread_count = 0 
@@ -21,14 +22,17 @@ class ResidentPage:
     async def update_data(self):
         res = await self.page.data.get_user_by_id(self.id)
         if not res: return
-        self.username = res[0][1]; self.email = res[0][2]; self.password = res[0][3]
-        try: self.data = json.loads(res[0][4])
-        except: self.data = {"room_id": "N/A", "move_in_date": "N/A", "due_date": "N/A", "payment_history": [], "unpaid_dues": [], "phone_number": "N/A", "linked_admin_id": "N/A", "roommate_data": []}
+        user = res[0]
+        self.username = user.username; self.email = user.email; self.password = user.password
+        self.data = user.copy_data() # ours to change; the record itself may be shared through the query cache
+        if not self.data: self.data = {"room_id": "N/A", "move_in_date": "N/A", "due_date": "N/A", "payment_history": [], "unpaid_dues": [], "phone_number": "N/A", "linked_admin_id": "N/A", "roommate_data": []}
         
         for k in ["room_id", "move_in_date", "due_date", "phone_number", "linked_admin_id"]: 
             if k not in self.data: self.data[k] = "N/A"
-        for k in ["payment_history", "unpaid_dues"]:
-            if k not in self.data: self.data[k] = []
+        # The ledger lives in its own tables; copies, since the cached lists may be shared
+        self.data["payment_history"] = [dict(p) for p in await self.page.data.get_payments(self.id)]
+        self.data["unpaid_dues"] = [dict(d) for d in await self.page.data.get_unpaid_dues(self.id)]
+        self.data["due_date"] = str(user.due_date) if user.due_date is not None else "N/A"
         if "last_checked_announcements" not in self.data:
             self.data["last_checked_announcements"] = 0
         if "roommate_data" not in self.data:
@@ -38,38 +42,28 @@ class ResidentPage:
         try:
             # Pass the linked_admin_id to filter announcements
             admin_id = self.data.get("linked_admin_id")
-            posts = await self.page.data.get_announcements(admin_user_id=admin_id)
-            
-            self.unread_count = 0
-            if posts:
-                last_checked = self.data.get("last_checked_announcements", 0)
-                for p in posts:
-                    if int(p[4]) > last_checked:
-                        self.unread_count += 1
+            last_checked = self.data.get("last_checked_announcements", 0)
+            self.unread_count = await self.page.data.get_announcement_count(admin_user_id=admin_id, since=int(last_checked) + 1)
         except Exception as e:
             print(f"Error checking unread: {e}")
             self.unread_count = 0
 
         if self.data["room_id"] != "N/A":
-            reqs = await self.page.data.custom_query("SELECT * FROM requests WHERE room_id=%s AND user_id=%s", (self.data["room_id"], self.id))
-            self.data["requests_data"] = [{"id": r[0], "issue": json.loads(r[2]), "status": r[3], "urgency": r[4], "date_created": r[6]} for r in reqs]
+            reqs = await self.page.data.get_requests_by_user(self.id, self.data["room_id"])
+            self.data["requests_data"] = [{"id": r.id, "issue": r.issue, "status": r.current_status, "urgency": r.urgency, "date_created": r.created_at} for r in reqs]
             
-            room = await self.page.data.custom_query("SELECT residents, monthly_rent, bed_count, current_status, thumbnail FROM rooms WHERE id=%s", (self.data["room_id"],))
+            room = await self.page.data.get_room_by_id(self.data["room_id"])
             if room:
-                self.data.update({"monthly_rent": room[0][1], "bed_count": room[0][2], "room_status": room[0][3], "thumbnail": room[0][4]})
+                room = room[0]
+                self.data.update({"monthly_rent": room.monthly_rent, "bed_count": room.bed_count, "room_status": room.current_status, "thumbnail": room.thumbnail})
                 try:
-                    all_users = await self.page.data.get_all_users()
+                    roommates = await self.page.data.get_residents_by_room(self.data["room_id"], exclude_user_id=self.id)
                     roommates_list = []
                     roommate_data_list = [] # List to store full user data for MyRoom
 
-                    for u in all_users:
-                        if u[0] == self.id: continue
-                        
-                        u_data = json.loads(u[4])
-                        # Only include users with the same room_id
-                        if str(u_data.get("room_id")) == str(self.data["room_id"]):
-                            roommates_list.append(u[1]) # Username
-                            roommate_data_list.append(u_data) # Full data for phone, etc.
+                    for u in roommates:
+                        roommates_list.append(u.username)
+                        roommate_data_list.append(u.data) # Full data for phone, etc.
 
                     self.data["roommates"] = roommates_list
                     self.data["roommate_data"] = roommate_data_list 
@@ -78,25 +72,31 @@ class ResidentPage:
             self.data.update({"requests_data": [], "monthly_rent": 0, "thumbnail": "placeholder.jpg", "roommates": [], "roommate_data": []})
 
     async def show(self):
-        await self.update_data()
+        if self.view is not None: return self.resume()
+
+        versions = await self.page.data.get_table_versions()
+        await self.refresh_data(versions)
 
         # Create Announcements Button
         self.announcements_btn = NavBarButton(
             ft.Icons.CAMPAIGN_OUTLINED, 
             "Announcements", 
-            lambda e: self.change_tab(ResidentAnnouncements(self), "Announcements"),
+            lambda e: self.change_tab(ResidentAnnouncements, "Announcements"),
             badge_count=self.unread_count
         )
 
         self.navbar = NavBar(isAdmin=False, current_page=self, buttons=[
-            NavBarButton(ft.Icons.BED, "My Room", lambda e: self.change_tab(MyRoom(self), "My Room"), True),
+            NavBarButton(ft.Icons.BED, "My Room", lambda e: self.change_tab(MyRoom, "My Room"), True),
             self.announcements_btn, 
-            NavBarButton(ft.Icons.CREDIT_CARD_ROUNDED, "Payments", lambda e: self.change_tab(Payment(self), "Payments")),
-            NavBarButton(ft.Icons.CHAT_BUBBLE_OUTLINE_ROUNDED, "Requests", lambda e: self.change_tab(Requests(self), "Requests")),
-            NavBarButton(ft.Icons.SETTINGS_OUTLINED, "Settings", lambda e: self.change_tab(Settings(self), "Settings")) # Added Button
+            NavBarButton(ft.Icons.CREDIT_CARD_ROUNDED, "Payments", lambda e: self.change_tab(Payment, "Payments")),
+            NavBarButton(ft.Icons.CHAT_BUBBLE_OUTLINE_ROUNDED, "Requests", lambda e: self.change_tab(Requests, "Requests")),
+            NavBarButton(ft.Icons.SETTINGS_OUTLINED, "Settings", lambda e: self.change_tab(Settings, "Settings")) # Added Button
         ])
         
         initial_section = MyRoom(self)
+        initial_section.loaded_versions = versions
+        self.sections[MyRoom] = initial_section
+        self.current_section = initial_section
         
         self.view = ft.View(
             "/active-resident",
@@ -113,24 +113,20 @@ class ResidentPage:
         )
         return self.view
 
-    def change_tab(self, section, button_text):
+    def change_tab(self, section_class, button_text):
         self.navbar.highlight_tab(button_text)
         
         if button_text == "Announcements":
             self.page.run_task(self.mark_announcements_read)
             
-        self.page.run_task(self.show_section, section)
+        self.open_tab(section_class)
+
+    async def before_open(self, versions):
+        # Most resident sections are built from self.data, so bring it up to date before deciding
+        await self.refresh_data(versions)
 
     async def mark_announcements_read(self):
         self.announcements_btn.set_badge_count(0)
         self.unread_count = 0
         self.data["last_checked_announcements"] = int(time.time())
-        await self.page.data.update_user(self.id, self.username, self.email, self.password, self.data)
-
-    async def show_section(self, section):
-        if len(self.view.controls[0].controls) > 1: 
-            self.view.controls[0].controls[1] = section
-        else: 
-            self.view.controls[0].controls.append(section)
-        await self.update_data()
-        self.view.update()
\ No newline at end of file
+        await self.page.data.update_user_fields(self.id, {"last_checked_announcements": self.data["last_checked_announcements"]})
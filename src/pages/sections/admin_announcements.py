@@ -1,10 +1,15 @@
 import flet as ft
 from datetime import datetime
-import json
 
 from pages.sections.section import Section
+from utils.paged_list import PagedList
+
+PAGE_SIZE = 20 # posts fetched per page of the feed
+LOAD_MORE_THRESHOLD = 300 # pixels from the bottom at which the next page of posts is fetched
 
 class AdminAnnouncements(Section):
+    TABLES = ("announcements", "comments", "announcement_likes")
+
     def __init__(self, admin_page):
         super().__init__()
         self.admin_page = admin_page
@@ -19,73 +24,69 @@ class AdminAnnouncements(Section):
             ft.FilledButton("New Post", icon=ft.Icons.ADD, bgcolor="#FF6900", on_click=self.show_add_dialog)
         ])
 
-        self.posts_list = ft.ListView(spacing=15, expand=True)
+        self.posts_list = ft.ListView(spacing=15, expand=True, scroll_interval=100)
+        # Newest first; a post's id is the cursor for the page after it
+        self.post_rows = PagedList(
+            self.admin_page.page, self.posts_list, self.create_post_card, self.fetch_posts,
+            page_size=PAGE_SIZE, threshold=LOAD_MORE_THRESHOLD,
+            signature=lambda p: p.values(),
+            placeholder=lambda: ft.Container(ft.Text("No announcements yet.", color="grey"), alignment=ft.alignment.center, padding=50)
+        )
 
         self.content = ft.Container(
             ft.Column([header, self.posts_list], spacing=20, expand=True),
             padding=20, expand=True
         )
 
-        self.admin_page.page.run_task(self.load_data)
+        self.start_load(self.admin_page.page, self.load_data)
+
+    async def refresh(self):
+        await self.load_data()
+        return True
 
     async def load_data(self):
-        self.posts_list.controls.clear()
+        """Reloads the feed from the newest post."""
         self.admin_id = self.admin_page.page.data.get_active_user()
-        posts = await self.admin_page.page.data.get_announcements(admin_user_id=self.admin_id)
-        
-        if not posts:
-            self.posts_list.controls.append(ft.Container(ft.Text("No announcements yet.", color="grey"), alignment=ft.alignment.center, padding=50))
-        else:
-            for p in posts:
-                pid = p[0]
-                
-                likes_raw = p[5]
-                likes = []
-                if isinstance(likes_raw, str):
-                    try:
-                        likes = json.loads(likes_raw)
-                    except json.JSONDecodeError:
-                        likes = []
-                
-                likes_count = len(likes)
-                
-                date_raw = p[4]
-                try:
-                    dt = datetime.fromtimestamp(int(date_raw)).strftime("%b %d, %Y")
-                except (ValueError, TypeError):
-                    dt = "N/A"
-                
-                comments = await self.admin_page.page.data.get_comments(pid)
-                comment_count = len(comments)
-                
-                card = ft.Container(
-                    ft.Column([
-                        ft.Row([
-                            ft.Text(p[2], weight="bold", size=16, expand=True),
-                            ft.IconButton(
-                                ft.Icons.DELETE_OUTLINE, 
-                                icon_color="red", 
-                                on_click=lambda e, pid=pid: self.admin_page.page.run_task(self.show_delete_confirmation, pid)
-                            )
-                        ]),
-                        ft.Text(p[3], size=13, color="#444444"), 
-                        ft.Divider(),
-                        ft.Row([
-                            ft.Text(dt, size=11, color="grey"),
-                            ft.Row([
-                                ft.Icon(ft.Icons.FAVORITE, size=14, color="red"),
-                                ft.Text(f"{likes_count}", size=11),
-                                ft.Container(width=10),
-                                ft.Icon(ft.Icons.CHAT_BUBBLE, size=14, color="blue"),
-                                ft.Text(f"{comment_count}", size=11),
-                                ft.TextButton("View Comments", style=ft.ButtonStyle(color="blue"), on_click=lambda e, i=pid: self.admin_page.page.run_task(self.show_comments, i))
-                            ], spacing=3, vertical_alignment=ft.CrossAxisAlignment.CENTER)
-                        ], alignment="spaceBetween")
-                    ]),
-                    padding=15, bgcolor="white", border_radius=10, border=ft.border.all(1, "#eee")
-                )
-                self.posts_list.controls.append(card)
-        self.admin_page.page.update()
+        await self.post_rows.reload()
+
+    async def fetch_posts(self, before_id, limit):
+        return await self.admin_page.page.data.get_announcements_with_counts(
+            admin_user_id=self.admin_id, before_id=before_id, limit=limit
+        )
+
+    def create_post_card(self, p):
+        pid = p.id
+        likes_count = p.like_count
+        comment_count = p.comment_count
+
+        dt = datetime.fromtimestamp(p.created_at).strftime("%b %d, %Y") if p.created_at else "N/A"
+
+        return ft.Container(
+            ft.Column([
+                ft.Row([
+                    ft.Text(p.title, weight="bold", size=16, expand=True),
+                    ft.IconButton(
+                        ft.Icons.DELETE_OUTLINE, 
+                        icon_color="red", 
+                        on_click=lambda e, pid=pid: self.admin_page.page.run_task(self.show_delete_confirmation, pid)
+                    )
+                ]),
+                ft.Text(p.content, size=13, color="#444444"), 
+                ft.Divider(),
+                ft.Row([
+                    ft.Text(dt, size=11, color="grey"),
+                    ft.Row([
+                        ft.Icon(ft.Icons.FAVORITE, size=14, color="red"),
+                        ft.Text(f"{likes_count}", size=11),
+                        ft.Container(width=10),
+                        ft.Icon(ft.Icons.CHAT_BUBBLE, size=14, color="blue"),
+                        ft.Text(f"{comment_count}", size=11),
+                        ft.TextButton("View Comments", style=ft.ButtonStyle(color="blue"), on_click=lambda e, i=pid: self.admin_page.page.run_task(self.show_comments, i))
+                    ], spacing=3, vertical_alignment=ft.CrossAxisAlignment.CENTER)
+                ], alignment="spaceBetween")
+            ]),
+            padding=15, bgcolor="white", border_radius=10, border=ft.border.all(1, "#eee")
+        )
 
     async def show_add_dialog(self, e):
         title = ft.TextField(label="Title")
@@ -130,8 +131,8 @@ class AdminAnnouncements(Section):
         self.reply_parent_id = None # Reset
         comments_data = await self.admin_page.page.data.get_comments(pid)
         
-        parents = [c for c in comments_data if c[6] is None] 
-        replies = [c for c in comments_data if c[6] is not None]
+        parents = [c for c in comments_data if c.parent_id is None] 
+        replies = [c for c in comments_data if c.parent_id is not None]
 
         comment_list = ft.ListView(expand=True, spacing=10)
 
@@ -153,17 +154,17 @@ class AdminAnnouncements(Section):
             comment_list.controls.append(ft.Text("No comments yet.", color="grey", italic=True))
         else:
             for p in parents:
-                p_dt = datetime.fromtimestamp(int(p[5])).strftime("%b %d %H:%M")
-                p_id = p[0]
+                p_dt = datetime.fromtimestamp(p.created_at).strftime("%b %d %H:%M")
+                p_id = p.id
                 
-                comment_list.controls.append(self.create_comment_bubble(p[3], p[4], p_dt, p_id, new_comment_tf))
+                comment_list.controls.append(self.create_comment_bubble(p.username, p.content, p_dt, p_id, new_comment_tf))
 
-                p_replies = [r for r in replies if r[6] == p_id]
+                p_replies = [r for r in replies if r.parent_id == p_id]
                 for r in p_replies:
-                    r_dt = datetime.fromtimestamp(int(r[5])).strftime("%b %d %H:%M")
+                    r_dt = datetime.fromtimestamp(r.created_at).strftime("%b %d %H:%M")
                     comment_list.controls.append(
                         ft.Container(
-                            self.create_comment_bubble(r[3], r[4], r_dt, p_id, new_comment_tf),
+                            self.create_comment_bubble(r.username, r.content, r_dt, p_id, new_comment_tf),
                             padding=ft.padding.only(left=20)
                         )
                     )
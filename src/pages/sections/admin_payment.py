@@ -1,18 +1,29 @@
 import flet as ft
-import json
 from datetime import datetime
+import asyncio
 import math
-import calendar
 
 from pages.sections.section import Section
 from utils.element_factory import create_info_card, create_remark, create_banner
+from utils.keyed_list import KeyedList
+
+RENDER_BATCH = 25 # rows added to the list at a time; more are appended as it scrolls
+LOAD_MORE_THRESHOLD = 200 # pixels from the bottom at which the next batch is rendered
+SEARCH_DEBOUNCE = 0.3 # seconds the search field has to be idle before the list is filtered
 
 class AdminPayment(Section):
+    TABLES = ("users", "rooms")
+
     def __init__(self, admin_page):
         super().__init__()
 
         self.admin_page = admin_page
         self.all_payment_records = [] 
+        self.records_by_id = {}
+        self.filtered_records = [] # sorted, in display order
+        self.last_query = None # search and filter that produced filtered_records
+        self.last_filter = None
+        self.search_generation = 0
 
         # Search & Filter Controls
         self.search_field = ft.TextField(
@@ -109,7 +120,14 @@ class AdminPayment(Section):
         )
 
         # --- List Area ---
-        self.payment_list = ft.ListView(spacing=8, expand=True)
+        self.payment_list = ft.ListView(spacing=8, expand=True, on_scroll=self.on_list_scroll, scroll_interval=100)
+        self.payment_rows = KeyedList(
+            self.payment_list, self.create_row,
+            key=lambda item: item['id'],
+            signature=lambda item: (item['username'], item['email'], item['room_id'], item['outstanding'], item['due_date_display'], item['days_remaining']),
+            batch_size=RENDER_BATCH,
+            placeholder=self.create_empty_placeholder
+        )
 
         list_container = ft.Container(
             ft.Column(
@@ -150,133 +168,79 @@ class AdminPayment(Section):
             expand=True
         )
 
-        self.admin_page.page.run_task(self.load_data)
+        self.start_load(self.admin_page.page, self.load_data)
 
     def on_search_change(self, e):
+        self.search_generation += 1
+        self.admin_page.page.run_task(self.debounced_filter, self.search_generation)
+
+    async def debounced_filter(self, generation):
+        """Filters once typing has paused; superseded keystrokes give up here."""
+        await asyncio.sleep(SEARCH_DEBOUNCE)
+        if generation != self.search_generation: return
         self.filter_data()
 
+    def on_list_scroll(self, e):
+        if e.pixels >= e.max_scroll_extent - LOAD_MORE_THRESHOLD:
+            if self.payment_rows.render_more(): self.admin_page.page.update()
+
     def on_filter_change(self, e):
         self.filter_data()
 
+    async def refresh(self):
+        await self.load_data()
+        return True
+
     async def load_data(self):
         try:
-            all_users = await self.admin_page.page.data.get_all_users()
+            all_users = await self.admin_page.context.residents()
             self.all_payment_records = []
             
-            total_collected_month = 0
-            total_outstanding_amount = 0
-            
             now = datetime.now()
             start_of_month = datetime(now.year, now.month, 1).timestamp()
             current_ts = now.timestamp()
             
-            current_admin_id = self.admin_page.page.data.get_active_user() # GET ADMIN ID
-            
-            all_rooms = await self.admin_page.page.data.get_all_rooms(admin_user_id=current_admin_id)
-            room_rent_lookup = {str(r[0]): r[5] for r in all_rooms} 
-            
-            did_update_due = False
-            for user in all_users: 
-                try:
-                    user_id = user[0]
-                    user_data = json.loads(user[4])
-                    
-                    if user_data.get("role") != "resident" or user_data.get("linked_admin_id") != current_admin_id:
-                        continue
-                        
-                    room_id = user_data.get("room_id", "N/A")
-                    monthly_rent = room_rent_lookup.get(room_id, 0)
-                    
-                    if room_id == "N/A" or monthly_rent is None or monthly_rent <= 0: continue
-                        
-                    unpaid_dues = user_data.get("unpaid_dues", [])
-                    user_outstanding = sum(item.get('amount', 0) for item in unpaid_dues)
-                    due_date_str = user_data.get("due_date", "N/A")
-                    
-                    if due_date_str != "N/A":
-                        try:
-                            due_ts = int(due_date_str)
-                            
-                            if due_ts < current_ts and user_outstanding == 0:
-                                
-                                unpaid_dues.append({"date": due_ts, "amount": monthly_rent, "remark": "overdue"})
-                                user_data["unpaid_dues"] = unpaid_dues
-                                
-                                current_due_dt = datetime.fromtimestamp(due_ts)
-                                new_due_dt = self.add_months(current_due_dt, 1)
-                                user_data["due_date"] = str(int(new_due_dt.timestamp()))
-                                
-                                await self.admin_page.page.data.update_user(user[0], user[1], user[2], user[3], user_data)
-                                
-                                did_update_due = True
-                                break 
-                                
-                        except (ValueError, TypeError): 
-                            pass 
-                            
-                except:
-                    continue
-            
-            if did_update_due:
-                return await self.load_data()
+            # Totals come from the payments/unpaid_dues tables rather than every resident's users.data
+            total_collected_month = await self.admin_page.page.data.get_payment_total_since(self.admin_page.user_id, start_of_month)
+            outstanding_by_user = await self.admin_page.page.data.get_outstanding_by_user(self.admin_page.user_id)
+            total_outstanding_amount = 0
+
+            all_rooms = await self.admin_page.context.rooms()
+            room_rent_lookup = {r.id: r.monthly_rent for r in all_rooms} 
             
-            linked_residents = []
+            # all_users only holds the residents linked to this admin
             for user in all_users:
                 try:
-                    user_data = json.loads(user[4])
-                    if user_data.get("role") == "resident" and user_data.get("linked_admin_id") == current_admin_id:
-                        linked_residents.append(user)
-                except:
-                    continue
-
-            # Iterate over only the linked residents
-            for user in linked_residents:
-                try:
-                    user_data = json.loads(user[4])
-                    room_id = user_data.get("room_id", "N/A")
-                    
-                    if room_id == "N/A": continue
+                    if user.room_id is None: continue
 
-                    monthly_rent = room_rent_lookup.get(room_id, 0)
+                    monthly_rent = room_rent_lookup.get(user.room_id, 0)
                     if monthly_rent is None: monthly_rent = 0 
 
-                    unpaid_dues = user_data.get("unpaid_dues", [])
-                    user_outstanding = sum(item.get('amount', 0) for item in unpaid_dues)
+                    user_outstanding = outstanding_by_user.get(user.id, 0)
                     total_outstanding_amount += user_outstanding
 
-                    payment_history = user_data.get("payment_history", [])
-                    for pay in payment_history:
-                        if pay.get('date', 0) >= start_of_month:
-                            total_collected_month += pay.get('amount', 0)
-
-                    due_date_str = user_data.get("due_date", "N/A")
                     days_remaining = 9999
                     due_date_display = "Not Set"
                     
-                    if due_date_str != "N/A":
-                        try:
-                            due_ts = int(due_date_str)
-                            dt = datetime.fromtimestamp(due_ts)
-                            due_date_display = dt.strftime("%b %d, %Y")
-                            diff_seconds = due_ts - current_ts
-                            days_remaining = math.ceil(diff_seconds / (24 * 3600))
-                        except (ValueError, TypeError): 
-                            pass
+                    if user.due_date is not None:
+                        dt = datetime.fromtimestamp(user.due_date)
+                        due_date_display = dt.strftime("%b %d, %Y")
+                        diff_seconds = user.due_date - current_ts
+                        days_remaining = math.ceil(diff_seconds / (24 * 3600))
 
                     self.all_payment_records.append({
-                        "id": user[0],
-                        "username": user[1],
-                        "email": user[2],
-                        "room_id": room_id,
+                        "id": user.id,
+                        "username": user.username,
+                        "email": user.email,
+                        "room_id": user.room_id,
                         "outstanding": user_outstanding,
                         "due_date_display": due_date_display,
                         "days_remaining": days_remaining,
-                        "payment_history": payment_history,
                         "monthly_rent": monthly_rent
                     })
 
                 except Exception as e:
-                    print(f"Error parsing user {user[0]}: {e}")
+                    print(f"Error parsing user {user.id}: {e}")
                     continue
 
             # Update Stats UI
@@ -289,17 +253,23 @@ class AdminPayment(Section):
             # Explicitly update page here to ensure containers are visible before list rendering
             self.admin_page.page.update()
 
-            self.filter_data() 
+            self.records_by_id = {item["id"]: item for item in self.all_payment_records}
+            self.last_query = None # the records changed, so filter from scratch
+            self.filter_data(keep_position=True) 
 
         except Exception as e:
             print(f"Error loading payment data: {e}")
 
-    def filter_data(self):
+    def filter_data(self, keep_position=False):
         search_query = self.search_field.value.lower() if self.search_field.value else ""
         filter_type = self.filter_dropdown.value
 
+        # Typing more of the same search only narrows it, so only the rows that matched last time need checking
+        narrowing = self.last_query is not None and filter_type == self.last_filter and search_query.startswith(self.last_query)
+        candidates = self.filtered_records if narrowing else self.all_payment_records
+
         filtered_list = []
-        for item in self.all_payment_records:
+        for item in candidates:
             # Search Filter
             if search_query and search_query not in item['username'].lower() and search_query not in f"room {item['room_id']}".lower():
                 continue
@@ -312,133 +282,127 @@ class AdminPayment(Section):
             
             filtered_list.append(item)
 
-        # Sort: Residents with outstanding dues FIRST, then by due date urgency
-        filtered_list.sort(key=lambda x: (-x['outstanding'], x['days_remaining']))
+        # Sort: Residents with outstanding dues FIRST, then by due date urgency (a narrowed list is already sorted)
+        if not narrowing: filtered_list.sort(key=lambda x: (-x['outstanding'], x['days_remaining']))
 
-        self.display_list(filtered_list)
+        self.filtered_records = filtered_list
+        self.last_query = search_query
+        self.last_filter = filter_type
+        self.payment_rows.set_items(filtered_list, keep_position=keep_position)
+        self.admin_page.page.update()
 
-    def display_list(self, records):
-        self.payment_list.controls.clear()
-        
-        if not records:
-            self.payment_list.controls.append(
-                ft.Container(
-                    ft.Column([
-                        ft.Icon(ft.Icons.SEARCH_OFF_ROUNDED, size=48, color=ft.Colors.GREY_300),
-                        ft.Text("No records found.", color=ft.Colors.GREEY_400)
-                    ], horizontal_alignment=ft.CrossAxisAlignment.CENTER),
-                    alignment=ft.alignment.center,
-                    expand=True,
-                    margin=ft.margin.only(top=50)
-                )
-            )
-            self.admin_page.page.update()
-            return
+    def create_empty_placeholder(self):
+        return ft.Container(
+            ft.Column([
+                ft.Icon(ft.Icons.SEARCH_OFF_ROUNDED, size=48, color=ft.Colors.GREY_300),
+                ft.Text("No records found.", color=ft.Colors.GREY_400)
+            ], horizontal_alignment=ft.CrossAxisAlignment.CENTER),
+            alignment=ft.alignment.center,
+            expand=True,
+            margin=ft.margin.only(top=50)
+        )
 
-        for item in records:
-            days = item['days_remaining']
-            outstanding = item['outstanding']
-            
-            if outstanding > 0:
-                status_text = "Overdue Balance"
-                status_color = "#D66875" 
-                icon_bg = "#D66875"
-                card_border_color = "#ffc2c2"
-            else:
-                status_color = ft.Colors.GREY_500
-                icon_bg = "#FF6900"
-                card_border_color = "#FEF3C6"
-                
-            # --- Due Date Text Logic ---
-            due_text_color = ft.Colors.GREY_600
-            due_icon = ft.Icons.CALENDAR_MONTH
+    def create_row(self, item):
+        days = item['days_remaining']
+        outstanding = item['outstanding']
+        
+        if outstanding > 0:
+            status_text = "Overdue Balance"
+            status_color = "#D66875" 
+            icon_bg = "#D66875"
+            card_border_color = "#ffc2c2"
+        else:
+            status_color = ft.Colors.GREY_500
+            icon_bg = "#FF6900"
+            card_border_color = "#FEF3C6"
             
-            if item['due_date_display'] == "Not Set":
-                time_status = "Date Not Set"
-            elif outstanding > 0:
-                 if days < 0:
-                    time_status = f"Overdue by {abs(days)} day(s)"
-                    due_text_color = "#D66875"
-                 else:
-                     time_status = "Payment Due Now"
-            elif days == 0:
-                time_status = "Due Today"
-                due_text_color = "#E18526"
-                due_icon = ft.Icons.ACCESS_TIME_FILLED
-            elif days <= 7:
-                time_status = f"Due in {days} day(s)"
-                due_text_color = "#E18526"
-                due_icon = ft.Icons.ACCESS_TIME
-            else:
-                time_status = f"Due in {days} days"
-                due_text_color = "#00cc0a"
-
-            # --- Card Construction ---
-            card = ft.Container(
-                ft.Row(
-                    [
-                        # Left: Icon & User Info
-                        ft.Row([
-                            ft.Container(
-                                ft.Icon(ft.Icons.PERSON, color=ft.Colors.WHITE, size=24),
-                                bgcolor=icon_bg,
-                                border_radius=10,
-                                width=45, height=45,
-                                alignment=ft.alignment.center
-                            ),
-                            ft.Column([
-                                ft.Text(item['username'], size=15, weight=ft.FontWeight.BOLD),
-                                ft.Text(f"Room {item['room_id']}", size=12, color=ft.Colors.GREY_600),
-                            ], spacing=2)
-                        ]),
-
-                        # Right: Financials & Actions
-                        ft.Row([
-                             # Outstanding Amount (if any)
-                            ft.Column(
-                                [
-                                    ft.Text(f"₱ {outstanding:,}", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.RED) if outstanding > 0 else ft.Container(),
-                                ],
-                                alignment=ft.MainAxisAlignment.CENTER
-                            ),
-                            
-                            # Due Date
-                            ft.Column([
-                                ft.Row([ft.Text(time_status, size=11, color=due_text_color, weight=ft.FontWeight.W_600)], alignment=ft.MainAxisAlignment.END),
-                                ft.Row([ft.Icon(due_icon, size=12, color=ft.Colors.GREY_500), ft.Text(f"Due: {item['due_date_display']}", size=11, color=ft.Colors.GREY_500)], alignment=ft.MainAxisAlignment.END, spacing=3)
-                            ], spacing=2, horizontal_alignment=ft.CrossAxisAlignment.END),
-                            
-                            # Buttons
-                            ft.IconButton(
-                                icon=ft.Icons.EMAIL_OUTLINED,
-                                tooltip="Email Reminder",
-                                icon_color=ft.Colors.BLUE_600,
-                                on_click=lambda e, email=item['email']: self.page.launch_url(f"mailto:{email}")
-                            ),
-                            ft.IconButton(
-                                icon=ft.Icons.HISTORY,
-                                tooltip="View History",
-                                icon_color=ft.Colors.GREY_700,
-                                on_click=lambda e, r=item: self.admin_page.page.run_task(self.show_history_dialog, r)
-                            )
-                        
-                        ], spacing=15, alignment=ft.MainAxisAlignment.END, expand=True)
-                    ],
-                    alignment=ft.MainAxisAlignment.SPACE_BETWEEN
-                ),
-                padding=12,
-                border=ft.border.all(1, card_border_color),
-                border_radius=10,
-                bgcolor=ft.Colors.WHITE
-            )
-            self.payment_list.controls.append(card)
+        # --- Due Date Text Logic ---
+        due_text_color = ft.Colors.GREY_600
+        due_icon = ft.Icons.CALENDAR_MONTH
+        
+        if item['due_date_display'] == "Not Set":
+            time_status = "Date Not Set"
+        elif outstanding > 0:
+             if days < 0:
+                time_status = f"Overdue by {abs(days)} day(s)"
+                due_text_color = "#D66875"
+             else:
+                 time_status = "Payment Due Now"
+        elif days == 0:
+            time_status = "Due Today"
+            due_text_color = "#E18526"
+            due_icon = ft.Icons.ACCESS_TIME_FILLED
+        elif days <= 7:
+            time_status = f"Due in {days} day(s)"
+            due_text_color = "#E18526"
+            due_icon = ft.Icons.ACCESS_TIME
+        else:
+            time_status = f"Due in {days} days"
+            due_text_color = "#00cc0a"
 
-        self.admin_page.page.update()
+        # --- Card Construction ---
+        return ft.Container(
+            ft.Row(
+                [
+                    # Left: Icon & User Info
+                    ft.Row([
+                        ft.Container(
+                            ft.Icon(ft.Icons.PERSON, color=ft.Colors.WHITE, size=24),
+                            bgcolor=icon_bg,
+                            border_radius=10,
+                            width=45, height=45,
+                            alignment=ft.alignment.center
+                        ),
+                        ft.Column([
+                            ft.Text(item['username'], size=15, weight=ft.FontWeight.BOLD),
+                            ft.Text(f"Room {item['room_id']}", size=12, color=ft.Colors.GREY_600),
+                        ], spacing=2)
+                    ]),
+
+                    # Right: Financials & Actions
+                    ft.Row([
+                         # Outstanding Amount (if any)
+                        ft.Column(
+                            [
+                                ft.Text(f"₱ {outstanding:,}", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.RED) if outstanding > 0 else ft.Container(),
+                            ],
+                            alignment=ft.MainAxisAlignment.CENTER
+                        ),
+                        
+                        # Due Date
+                        ft.Column([
+                            ft.Row([ft.Text(time_status, size=11, color=due_text_color, weight=ft.FontWeight.W_600)], alignment=ft.MainAxisAlignment.END),
+                            ft.Row([ft.Icon(due_icon, size=12, color=ft.Colors.GREY_500), ft.Text(f"Due: {item['due_date_display']}", size=11, color=ft.Colors.GREY_500)], alignment=ft.MainAxisAlignment.END, spacing=3)
+                        ], spacing=2, horizontal_alignment=ft.CrossAxisAlignment.END),
+                        
+                        # Buttons
+                        ft.IconButton(
+                            icon=ft.Icons.EMAIL_OUTLINED,
+                            tooltip="Email Reminder",
+                            icon_color=ft.Colors.BLUE_600,
+                            on_click=lambda e, email=item['email']: self.page.launch_url(f"mailto:{email}")
+                        ),
+                        ft.IconButton(
+                            icon=ft.Icons.HISTORY,
+                            tooltip="View History",
+                            icon_color=ft.Colors.GREY_700,
+                            on_click=lambda e, uid=item['id']: self.admin_page.page.run_task(self.show_history_dialog, self.records_by_id[uid])
+                        )
+                    
+                    ], spacing=15, alignment=ft.MainAxisAlignment.END, expand=True)
+                ],
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN
+            ),
+            padding=12,
+            border=ft.border.all(1, card_border_color),
+            border_radius=10,
+            bgcolor=ft.Colors.WHITE
+        )
 
     async def show_history_dialog(self, record):
         history_items = []
         
-        sorted_history = sorted(record['payment_history'], key=lambda x: x.get('date', 0), reverse=True)
+        sorted_history = (await self.admin_page.page.data.get_payments(record['id']))[::-1]
         total_paid_lifetime = sum(p.get('amount', 0) for p in sorted_history)
 
         if not sorted_history:
@@ -490,17 +454,13 @@ class AdminPayment(Section):
         self.admin_page.page.open(dlg)
 
     async def show_record_payment_dialog(self, e):
-        users = await self.admin_page.page.data.get_all_users()
-        current_admin_id = self.admin_page.page.data.get_active_user() # GET ADMIN ID
+        users = await self.admin_page.context.residents()
         
         resident_options = []
         for user in users:
-            try:
-                data = json.loads(user[4])
-                # Filter to only include residents linked to this admin AND assigned a room
-                if data.get("role") == "resident" and data.get("linked_admin_id") == current_admin_id and data.get("room_id", "N/A") != "N/A":
-                    resident_options.append(ft.dropdown.Option(key=str(user[0]), text=f"{user[1]} (Room {data['room_id']})"))
-            except: pass
+            # Filter to only include residents assigned a room
+            if user.room_id is not None:
+                resident_options.append(ft.dropdown.Option(key=str(user.id), text=f"{user.username} (Room {user.room_id})"))
             
         if not resident_options:
             create_banner(self.admin_page.page, ft.Colors.RED_100, ft.Icon(ft.Icons.ERROR, color="red"), "No residents with assigned rooms found.", ft.Colors.RED)
@@ -522,13 +482,6 @@ class AdminPayment(Section):
         )
         self.admin_page.page.open(popup)
 
-    def add_months(self, sourcedate, months):
-        month = sourcedate.month - 1 + months
-        year = sourcedate.year + month // 12
-        month = month % 12 + 1
-        day = min(sourcedate.day, calendar.monthrange(year,month)[1])
-        return datetime(year, month, day, sourcedate.hour, sourcedate.minute, sourcedate.second)
-
     async def process_payment(self, resident_dd, amount_tf, popup):
         if not resident_dd.value:
             resident_dd.error_text = "Required"; resident_dd.update(); return
@@ -546,51 +499,11 @@ class AdminPayment(Section):
             if not user_res: self.admin_page.page.close(popup); return
             
             user = user_res[0]
-            data = json.loads(user[4])
-            payment_history = data.get("payment_history", [])
-            unpaid_dues = data.get("unpaid_dues", [])
-            
-            room_id = data.get("room_id")
-            monthly_rent = 0
-            if room_id != "N/A":
-                room_res = await self.admin_page.page.data.get_room_by_id(room_id)
-                if room_res and room_res[0][5] is not None:
-                    try:
-                        monthly_rent = int(room_res[0][5])
-                    except (ValueError, TypeError):
-                        monthly_rent = 0
-
-            # Record Payment
-            new_payment = {"date": int(datetime.now().timestamp()), "amount": amount, "remark": "Admin Recorded"}
-            payment_history.append(new_payment)
-            
-            # Clear Dues
-            if unpaid_dues:
-                unpaid_dues.sort(key=lambda x: x.get("date", 0))
-                remaining = amount
-                new_unpaid = []
-                for due in unpaid_dues:
-                    if remaining <= 0: new_unpaid.append(due); continue
-                    due_amt = due.get("amount", 0)
-                    if remaining >= due_amt: remaining -= due_amt
-                    else: due["amount"] = due_amt - remaining; remaining = 0; new_unpaid.append(due)
-                data["unpaid_dues"] = new_unpaid
-            
-            # Advance Due Date
-            if monthly_rent > 0:
-                months_paid = amount // monthly_rent
-                if months_paid >= 1 and data.get("due_date") != "N/A":
-                    try:
-                        current_due_dt = datetime.fromtimestamp(int(data["due_date"]))
-                        new_due_dt = self.add_months(current_due_dt, months_paid)
-                        data["due_date"] = str(int(new_due_dt.timestamp()))
-                    except: pass
-
-            data["payment_history"] = payment_history
-            await self.admin_page.page.data.update_user(user[0], user[1], user[2], user[3], data)
+            if not await self.admin_page.page.data.record_payment(user.id, amount, "Admin Recorded"):
+                self.admin_page.page.close(popup); return
             
             self.admin_page.page.close(popup)
-            create_banner(self.admin_page.page, ft.Colors.GREEN_100, ft.Icon(ft.Icons.CHECK, color="green"), f"Payment recorded for {user[1]}!", ft.Colors.GREEN)
+            create_banner(self.admin_page.page, ft.Colors.GREEN_100, ft.Icon(ft.Icons.CHECK, color="green"), f"Payment recorded for {user.username}!", ft.Colors.GREEN)
             await self.load_data()
             
         except Exception as e:
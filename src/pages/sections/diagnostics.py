@@ -0,0 +1,145 @@
+import flet as ft
+from datetime import datetime
+
+from pages.sections.section import Section
+from utils.element_factory import create_info_card, create_banner
+
+TOP_METHODS = 15 # rows shown in the method table, by total time
+
+class Diagnostics(Section):
+    TABLES = None
+
+    def __init__(self, admin_page):
+        super().__init__()
+        self.admin_page = admin_page
+        self.page = admin_page.page
+
+        header = ft.Row([
+            ft.Column([
+                ft.Row([
+                    ft.Text("Diagnostics", color="#E78B28", size=16, weight=ft.FontWeight.W_500),
+                    ft.Icon(ft.Icons.SPEED_ROUNDED, size=24, color=ft.Colors.GREY_500)
+                ], spacing=3.5),
+                ft.Text("Database timing, connection pool and cache statistics", size=12, weight=ft.FontWeight.W_500)
+            ], spacing=1, expand=True),
+            ft.IconButton(ft.Icons.REFRESH_ROUNDED, tooltip="Refresh", on_click=lambda e: self.load_data()),
+            ft.OutlinedButton("Reset", icon=ft.Icons.RESTART_ALT_ROUNDED, on_click=self.reset_counters),
+            ft.FilledButton("Export JSON", icon=ft.Icons.DOWNLOAD_ROUNDED, bgcolor="#FF6900", on_click=self.export)
+        ])
+
+        self.pool_text = ft.Text("-", size=20, weight=ft.FontWeight.BOLD)
+        self.wait_text = ft.Text("-", size=20, weight=ft.FontWeight.BOLD)
+        self.cache_text = ft.Text("-", size=20, weight=ft.FontWeight.BOLD)
+        self.billing_text = ft.Text("-", size=20, weight=ft.FontWeight.BOLD)
+
+        stats = ft.ResponsiveRow(
+            [
+                create_info_card("Connections (active / idle)", [self.pool_text], ft.Icon(ft.Icons.LAN_OUTLINED, color="#4D84FC", size=28), "left", "#DBEAFE", None, 87, col={"xs": 6, "md": 3}),
+                create_info_card("Avg / max wait", [self.wait_text], ft.Icon(ft.Icons.HOURGLASS_EMPTY_ROUNDED, color="#C28239", size=28), "left", "#FEF9C3", None, 87, col={"xs": 6, "md": 3}),
+                create_info_card("Cache hit rate", [self.cache_text], ft.Icon(ft.Icons.BOLT_ROUNDED, color="#00cc0a", size=28), "left", "#b3ffb6", None, 87, col={"xs": 6, "md": 3}),
+                create_info_card("Last billing run", [self.billing_text], ft.Icon(ft.Icons.RECEIPT_LONG_OUTLINED, color="#D66875", size=28), "left", "#FFE2E2", None, 87, col={"xs": 6, "md": 3}),
+            ]
+        )
+
+        self.methods_table = ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("Method")),
+                ft.DataColumn(ft.Text("Calls"), numeric=True),
+                ft.DataColumn(ft.Text("Avg ms"), numeric=True),
+                ft.DataColumn(ft.Text("Max ms"), numeric=True),
+                ft.DataColumn(ft.Text("Rows"), numeric=True),
+                ft.DataColumn(ft.Text("Top caller")),
+            ],
+            column_spacing=20,
+            heading_text_style=ft.TextStyle(size=12, weight=ft.FontWeight.W_500, color=ft.Colors.GREY_700),
+            data_text_style=ft.TextStyle(size=12, color=ft.Colors.BLACK)
+        )
+        self.slow_list = ft.Column(spacing=6)
+        self.routes_list = ft.Column(spacing=6)
+
+        self.content = ft.Container(
+            ft.Column([
+                header,
+                ft.ListView([
+                    stats,
+                    self.create_panel("Slowest Database methods (by total time)", ft.Row([self.methods_table], scroll=ft.ScrollMode.AUTO)),
+                    self.create_panel("Recent navigations", self.routes_list),
+                    self.create_panel("Slow queries", self.slow_list)
+                ], spacing=20, padding=ft.padding.only(bottom=20), expand=True)
+            ], spacing=15, expand=True),
+            expand=True
+        )
+
+        self.load_data(update=False)
+
+    def create_panel(self, title, body):
+        return ft.Container(
+            ft.Column([ft.Text(title, color="#E78B28", size=14, weight=ft.FontWeight.W_500), body], spacing=10),
+            bgcolor=ft.Colors.WHITE,
+            border_radius=15,
+            padding=ft.padding.only(left=20, top=17, right=20, bottom=20),
+            border=ft.border.all(2, "#FEF3C6")
+        )
+
+    async def refresh(self):
+        self.load_data(update=False)
+        return True
+
+    def load_data(self, update=True):
+        report = self.page.data.get_diagnostics()
+        pool, cache, billing = report["pool"], report["cache"], report["billing"]
+
+        self.pool_text.value = f"{pool['active']} / {pool['idle']}"
+        self.wait_text.value = f"{pool['avg_wait_ms']} / {pool['max_wait_ms']} ms"
+        self.cache_text.value = f"{round(cache['hit_rate'] * 100)}%"
+        if billing is None: self.billing_text.value = "Not run yet"
+        elif billing["skipped"]: self.billing_text.value = "Skipped"
+        else: self.billing_text.value = f"{billing['dues_created']} dues, {billing['duration_ms']} ms"
+
+        methods = sorted(report["database"]["methods"].items(), key=lambda m: m[1]["total_ms"], reverse=True)[:TOP_METHODS]
+        self.methods_table.rows = [
+            ft.DataRow(cells=[
+                ft.DataCell(ft.Text(name)),
+                ft.DataCell(ft.Text(str(stats["calls"]))),
+                ft.DataCell(ft.Text(str(stats["avg_ms"]))),
+                ft.DataCell(ft.Text(str(stats["max_ms"]))),
+                ft.DataCell(ft.Text(str(stats["rows"]))),
+                ft.DataCell(ft.Text(max(stats["callers"], key=stats["callers"].get) if stats["callers"] else "-")),
+            ])
+            for name, stats in methods
+        ]
+
+        slow_queries = report["database"]["slow_queries"]
+        self.slow_list.controls = [ft.Text(f"No queries slower than {report['database']['slow_query_ms']:g} ms.", color=ft.Colors.GREY_400)]
+        if slow_queries:
+            self.slow_list.controls = [
+                ft.Column([
+                    ft.Text(f"{q['duration_ms']} ms • {q['caller']} • {datetime.fromtimestamp(q['at']).strftime('%H:%M:%S')}", size=11, color=ft.Colors.GREY_600),
+                    ft.Text(q["sql"], size=12, selectable=True, max_lines=3, overflow=ft.TextOverflow.ELLIPSIS)
+                ], spacing=0)
+                for q in reversed(slow_queries)
+            ]
+
+        self.routes_list.controls = [ft.Text("No navigations recorded yet.", color=ft.Colors.GREY_400)]
+        if report["routes"]:
+            self.routes_list.controls = [
+                ft.Text(
+                    f"{datetime.fromtimestamp(r['at']).strftime('%H:%M:%S')}  {r['route']}  {r['total_ms']} ms  "
+                    f"(db {r['db_ms']} ms / {r['db_calls']} calls, build {r['build_ms']} ms, update {r['update_ms']} ms)",
+                    size=12
+                )
+                for r in reversed(report["routes"])
+            ]
+
+        if update: self.page.update()
+
+    def reset_counters(self, e):
+        self.page.data.instrumentation.reset()
+        self.load_data()
+
+    async def export(self, e):
+        try:
+            path = await self.page.data.dump_diagnostics()
+            create_banner(self.page, ft.Colors.BLUE_100, ft.Icon(ft.Icons.CHECK, color=ft.Colors.BLUE), f"Diagnostics written to {path}", ft.Colors.BLUE)
+        except Exception as ex:
+            create_banner(self.page, ft.Colors.RED_100, ft.Icon(ft.Icons.WARNING_AMBER_OUTLINED, color=ft.Colors.RED), f"Could not write diagnostics: {ex}", ft.Colors.RED)
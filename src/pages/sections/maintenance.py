@@ -1,18 +1,21 @@
 import flet as ft
-import json
 from datetime import datetime
 import traceback
 
 from pages.sections.section import Section
 from utils.element_factory import create_info_card, create_remark, create_banner
+from utils.paged_list import PagedList
+
+PAGE_SIZE = 25 # requests fetched per page of the list
 
 class Maintenance(Section):
+    TABLES = ("requests", "users")
+
     def __init__(self, admin_page):
         super().__init__()
 
         self.admin_page = admin_page
         self.page = admin_page.page
-        self.all_requests = []
 
         # Header
         header = ft.Row(
@@ -50,6 +53,22 @@ class Maintenance(Section):
             on_change=self.on_filter_change
         )
 
+        # Urgency Filter
+        self.urgency_filter = ft.Dropdown(
+            options=[
+                ft.dropdown.Option("all", "Any Urgency"),
+                ft.dropdown.Option("low", "Low"),
+                ft.dropdown.Option("medium", "Medium"),
+                ft.dropdown.Option("high", "High"),
+            ],
+            value="all",
+            border_radius=10,
+            bgcolor="#F3F3F5",
+            border_width=0,
+            width=150,
+            on_change=self.on_filter_change
+        )
+
         # Stats placeholders
         self.total_pending = ft.Text("0", size=20, weight=ft.FontWeight.BOLD)
         self.total_inprogress = ft.Text("0", size=20, weight=ft.FontWeight.BOLD)
@@ -90,7 +109,14 @@ class Maintenance(Section):
         )
 
         # Requests list
-        self.requests_list = ft.ListView(spacing=7, expand=True)
+        self.requests_list = ft.ListView(spacing=7, expand=True, scroll_interval=100)
+        # Newest first; (date_created, id) of a request is the cursor for the page after it
+        self.request_rows = PagedList(
+            self.page, self.requests_list, self.create_request_card, self.fetch_requests,
+            cursor=lambda r: (r.date_created, r.id), page_size=PAGE_SIZE,
+            signature=lambda r: r.values(),
+            placeholder=self.create_empty_placeholder
+        )
 
         list_container = ft.Container(
             ft.Column(
@@ -98,7 +124,7 @@ class Maintenance(Section):
                     ft.Row(
                         [
                             ft.Text("All Requests", color="#E78B28", size=14, weight=ft.FontWeight.W_500),
-                            self.status_filter
+                            ft.Row([self.urgency_filter, self.status_filter], spacing=10)
                         ],
                         alignment=ft.MainAxisAlignment.SPACE_BETWEEN
                     ),
@@ -132,199 +158,126 @@ class Maintenance(Section):
         )
 
         # Load data
-        self.page.run_task(self.load_data)
+        self.start_load(self.page, self.load_data)
 
     def on_filter_change(self, e):
         self.page.run_task(self.filter_requests)
 
-    async def load_data(self):
-        try:
-            # Fetch all requests and ALL users
-            all_requests = await self.page.data.get_all_requests()
-            all_users = await self.page.data.get_all_users()
-            
-            current_admin_id = self.admin_page.page.data.get_active_user() # GET ADMIN ID
-            
-            linked_user_ids = {current_admin_id}
-            linked_user_map = {}
-            
-            for user in all_users:
-                user_id = user[0]
-                try:
-                    u_data = json.loads(user[4])
-                    # If user is a resident linked to this admin
-                    if u_data.get("role") == "resident" and u_data.get("linked_admin_id") == current_admin_id:
-                        linked_user_ids.add(user_id)
-                        linked_user_map[user_id] = user[1]
-                    # If user is the Admin themselves
-                    elif user_id == current_admin_id:
-                        linked_user_map[user_id] = user[1]
-                except:
-                    continue
-            
-            requests = [req for req in all_requests if req[5] in linked_user_ids]
-            
-            self.all_requests = []
-            pending_count = 0
-            inprogress_count = 0
-            completed_count = 0
-
-            if requests:
-                for req in requests:
-                    try:
-                        issue_str = req[2]
-                        issue = json.loads(issue_str) if issue_str else {}
-                        
-                        status = req[3] or "pending"
-                        urgency = req[4] or "low"
-                        
-                        if status == "pending": pending_count += 1
-                        elif status == "in-progress": inprogress_count += 1
-                        elif status == "completed": completed_count += 1
-
-                        self.all_requests.append({
-                            "id": req[0],
-                            "room_id": req[1],
-                            "title": issue.get("title", "No Title"),
-                            "desc": issue.get("desc", "No Description"),
-                            "status": status,
-                            "urgency": urgency,
-                            "username": linked_user_map.get(req[5], "Unknown User"), 
-                            "date_created": req[6]
-                        })
-                    except Exception as e:
-                        print(f"Error parsing request {req[0]}: {e}")
-                        traceback.print_exc()
+    async def refresh(self):
+        await self.load_data(keep_position=True)
+        return True
 
-            # Update stats
-            self.total_pending.value = str(pending_count)
-            self.total_inprogress.value = str(inprogress_count)
-            self.total_completed.value = str(completed_count)
-            
-            # Initial display
-            await self.filter_requests()
-            
+    async def load_data(self, keep_position=False):
+        try:
+            await self.update_stats()
+            await self.filter_requests(keep_position)
         except Exception as e:
             print(f"Error loading maintenance data: {e}")
             traceback.print_exc()
 
-    async def filter_requests(self):
-        filter_val = self.status_filter.value
-        filtered = []
-        
-        # Sort by date (newest first)
-        try:
-            def get_timestamp_safe(date_str):
-                try:
-                    return int(date_str)
-                except (ValueError, TypeError):
-                    return 0
-                    
-            sorted_requests = sorted(self.all_requests, key=lambda x: get_timestamp_safe(x["date_created"]), reverse=True)
-        except:
-            sorted_requests = self.all_requests
+    async def update_stats(self):
+        counts = await self.page.data.get_request_status_counts(self.admin_page.user_id)
 
-        for r in sorted_requests:
-            if filter_val != "all" and r["status"] != filter_val:
-                continue
-            filtered.append(r)
+        self.total_pending.value = str(counts.get("pending", 0))
+        self.total_inprogress.value = str(counts.get("in-progress", 0))
+        self.total_completed.value = str(counts.get("completed", 0))
 
-        self.display_requests(filtered)
+    async def filter_requests(self, keep_position=False):
+        """Restarts the list from the newest request matching the filters, keeping its length with keep_position."""
+        await self.request_rows.reload(keep_position)
 
-    def display_requests(self, requests):
-        self.requests_list.controls.clear()
+    async def fetch_requests(self, before, limit):
+        return await self.page.data.get_admin_requests_page(
+            self.admin_page.user_id,
+            status=self.status_filter.value,
+            urgency=self.urgency_filter.value,
+            before=before,
+            limit=limit
+        )
 
-        if not requests:
-            self.requests_list.controls.append(
-                ft.Container(
-                    ft.Text("No requests found", color=ft.Colors.GREY_400),
-                    alignment=ft.alignment.center,
-                    expand=True,
-                    margin=ft.margin.only(top=20)
-                )
-            )
-        else:
-            for r in requests:
-                # Define styles based on urgency
-                ur_color = "#808899"
-                ur_bgcolor = "#F3F4F6"
-                if r["urgency"] == "medium":
-                    ur_color = "#E18526"
-                    ur_bgcolor = "#FFEDD4"
-                elif r["urgency"] == "high":
-                    ur_color = "#D66875"
-                    ur_bgcolor = "#FFE2E2"
+    def create_empty_placeholder(self):
+        return ft.Container(
+            ft.Text("No requests found", color=ft.Colors.GREY_400),
+            alignment=ft.alignment.center,
+            expand=True,
+            margin=ft.margin.only(top=20)
+        )
 
-                # Define styles based on status
-                st_color = "#C28239"
-                if r["status"] == "in-progress": st_color = "#4D84FC"
-                elif r["status"] == "completed": st_color = "#00cc0a"
+    def create_request_card(self, r):
+        # Define styles based on urgency
+        ur_color = "#808899"
+        ur_bgcolor = "#F3F4F6"
+        urgency = r.urgency or "low"
+        if urgency == "medium":
+            ur_color = "#E18526"
+            ur_bgcolor = "#FFEDD4"
+        elif urgency == "high":
+            ur_color = "#D66875"
+            ur_bgcolor = "#FFE2E2"
 
-                # Date formatting
-                try:
-                    dt = datetime.fromtimestamp(int(r["date_created"]))
-                    date_str = dt.strftime("%b %d, %Y")
-                except:
-                    date_str = "N/A"
+        # Define styles based on status
+        st_color = "#C28239"
+        if r.status == "in-progress": st_color = "#4D84FC"
+        elif r.status == "completed": st_color = "#00cc0a"
 
-                # Dropdown for status update
-                status_dd = ft.Dropdown(
-                    value=r["status"],
-                    options=[
-                        ft.dropdown.Option("pending", "Pending"),
-                        ft.dropdown.Option("in-progress", "In Progress"),
-                        ft.dropdown.Option("completed", "Completed"),
-                    ],
-                    text_size=12,
-                    dense=True, 
-                    width=130,
-                    content_padding=10,
-                    border_radius=8,
-                    color=st_color,
-                    border_color=ft.Colors.TRANSPARENT,
-                    bgcolor="#F3F3F5",
-                    on_change=lambda e, req_id=r["id"]: self.page.run_task(self.update_status, req_id, e.control.value)
-                )
+        # Date formatting
+        date_str = datetime.fromtimestamp(r.created_at).strftime("%b %d, %Y") if r.created_at else "N/A"
 
-                card = ft.Container(
-                    ft.Row(
+        # Dropdown for status update
+        status_dd = ft.Dropdown(
+            value=r.status,
+            options=[
+                ft.dropdown.Option("pending", "Pending"),
+                ft.dropdown.Option("in-progress", "In Progress"),
+                ft.dropdown.Option("completed", "Completed"),
+            ],
+            text_size=12,
+            dense=True, 
+            width=130,
+            content_padding=10,
+            border_radius=8,
+            color=st_color,
+            border_color=ft.Colors.TRANSPARENT,
+            bgcolor="#F3F3F5",
+            on_change=lambda e, req_id=r.id: self.page.run_task(self.update_status, req_id, e.control.value)
+        )
+
+        return ft.Container(
+            ft.Row(
+                [
+                    ft.Container(
+                        ft.Icon(ft.Icons.BUILD, color=ft.Colors.WHITE, size=20),
+                        bgcolor=st_color,
+                        border_radius=7,
+                        width=36,
+                        height=36,
+                        padding=5
+                    ),
+                    ft.Column(
                         [
-                            ft.Container(
-                                ft.Icon(ft.Icons.BUILD, color=ft.Colors.WHITE, size=20),
-                                bgcolor=st_color,
-                                border_radius=7,
-                                width=36,
-                                height=36,
-                                padding=5
-                            ),
-                            ft.Column(
-                                [
-                                    ft.Text(r["title"], size=14, weight=ft.FontWeight.W_500),
-                                    ft.Text(f"Room {r['room_id']} • {r['username']}", size=11, color=ft.Colors.GREY_600),
-                                ],
-                                spacing=0,
-                                expand=True
-                            ),
-                            ft.Column(
-                                [
-                                    create_remark(r["urgency"].upper(), ur_color, ur_bgcolor),
-                                    ft.Text(date_str, size=10, color=ft.Colors.GREY_400)
-                                ],
-                                spacing=2,
-                                horizontal_alignment=ft.CrossAxisAlignment.END
-                            ),
-                            status_dd
+                            ft.Text(r.title, size=14, weight=ft.FontWeight.W_500),
+                            ft.Text(f"Room {r.room_id} • {r.username or 'Unknown User'}", size=11, color=ft.Colors.GREY_600),
                         ],
-                        alignment=ft.MainAxisAlignment.START,
-                        vertical_alignment=ft.CrossAxisAlignment.CENTER
+                        spacing=0,
+                        expand=True
                     ),
-                    padding=10,
-                    border=ft.border.all(1.5, "#FEF3C6"),
-                    border_radius=10
-                )
-                self.requests_list.controls.append(card)
-
-        self.page.update()
+                    ft.Column(
+                        [
+                            create_remark(urgency.upper(), ur_color, ur_bgcolor),
+                            ft.Text(date_str, size=10, color=ft.Colors.GREY_400)
+                        ],
+                        spacing=2,
+                        horizontal_alignment=ft.CrossAxisAlignment.END
+                    ),
+                    status_dd
+                ],
+                alignment=ft.MainAxisAlignment.START,
+                vertical_alignment=ft.CrossAxisAlignment.CENTER
+            ),
+            padding=10,
+            border=ft.border.all(1.5, "#FEF3C6"),
+            border_radius=10
+        )
 
     async def update_status(self, request_id, new_status):
         try:
@@ -335,6 +288,6 @@ class Maintenance(Section):
             
             self.admin_page.view.update()
             
-            await self.load_data() 
+            await self.load_data(keep_position=True)
         except Exception as e:
             print(f"Error updating status: {e}")
\ No newline at end of file
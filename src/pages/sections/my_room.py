@@ -3,8 +3,11 @@ from datetime import datetime
 
 from pages.sections.section import Section
 from utils.element_factory import create_info_card
+from utils.thumbnails import thumbnail_name
 
 class MyRoom(Section):
+    TABLES = ("users", "rooms", "requests")
+
     def __init__(self, resident_page):
         super().__init__()
 
@@ -89,7 +92,8 @@ class MyRoom(Section):
                 move_in_date = "Not Set"
 
             thumbnail = self.resident_page.data.get("thumbnail", "placeholder.jpg")
-            image_src = f"../assets/room_thumbnails/{thumbnail}"
+            image_src = f"../assets/room_thumbnails/{thumbnail_name(thumbnail, 'dialog') or thumbnail}"
+            full_src = f"../assets/room_thumbnails/{thumbnail_name(thumbnail, 'full') or thumbnail}"
 
             room_info = ft.Container(
                 ft.Column(
@@ -104,7 +108,7 @@ class MyRoom(Section):
                                     fit=ft.ImageFit.COVER, 
                                     border_radius=10
                                 ),
-                                on_tap=lambda e, src=image_src: self.resident_page.page.run_task(self.show_full_image_dialog, src)
+                                on_tap=lambda e, src=full_src: self.resident_page.page.run_task(self.show_full_image_dialog, src)
                             )
                         ], height=300, expand=True),
                         ft.Divider(2, color="#FEF3C6"),
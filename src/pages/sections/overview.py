@@ -1,12 +1,27 @@
 import flet as ft
 from datetime import datetime, timedelta
-import json
 import calendar
 import asyncio
 import random
+import time
 
 from pages.sections.section import Section
 from utils.element_factory import create_info_card, create_remark
+from utils.profiling import detach_timer, timed
+
+POLL_INTERVAL = 5 # seconds between table version checks
+FULL_REFRESH_INTERVAL = 60 # seconds before everything is reloaded even without changes
+RECENT_ACTIVITY_LIMIT = 5 # entries shown in the recent activity feed
+
+TRACKED_TABLES = ("rooms", "users", "requests", "announcements")
+
+# Which tables each part of the overview is built from
+PART_DEPENDENCIES = {
+    "stats": {"rooms", "users", "requests"},
+    "charts": {"rooms", "users"},
+    "activity": {"users", "requests", "announcements"},
+    "maintenance": {"users", "requests"},
+}
 
 class Overview(Section):
     def __init__(self, admin_page):
@@ -15,6 +30,17 @@ class Overview(Section):
         self.padding = ft.padding.all(10)
         self.admin_page = admin_page
         self.running = False 
+        self.poll_generation = 0 # bumped on every mount so a loop left over from an earlier mount exits
+
+        # Last fetched rows and table versions, so polls only reload what changed
+        self.rooms_data = []
+        self.requests_data = []
+        self.users_data = []
+        self.income_this_month = 0
+        self.recent_payments = [] # (username, paid_at, amount), newest first
+        self.announcements_data = []
+        self.table_versions = {}
+        self.last_full_refresh = 0
 
         self.activity_items_column = ft.Column(spacing=10) # For Recent Activity
         self.maintenance_items_column = ft.Column(spacing=10) # For Urgent Maintenance
@@ -85,365 +111,349 @@ class Overview(Section):
     def did_mount(self):
         """Called when the control is added to the page."""
         self.running = True
-        self.admin_page.page.run_task(self.update_data_loop)
+        self.poll_generation += 1
+        self.admin_page.page.run_task(self.update_data_loop, self.poll_generation)
 
     def will_unmount(self):
         """Called when the control is removed from the page."""
         self.running = False
 
-    async def update_data_loop(self):
-        """Background task to refresh data periodically."""
-        while self.running:
-            await self.load_overview_data()
+    async def update_data_loop(self, generation):
+        """Background task that polls the table versions and only reloads what changed."""
+        detach_timer() # started from did_mount, inside the navigation that showed the Overview
+        first = True
+        while self.running and generation == self.poll_generation:
+            if first:
+                # The load that follows showing the tab, reported like a navigation
+                await timed(f"{self.admin_page.page.route} Overview", self.refresh_if_changed)
+                first = False
+            else:
+                await self.refresh_if_changed()
             try:
-                await asyncio.sleep(5)
+                await asyncio.sleep(POLL_INTERVAL)
             except Exception:
                 break
 
-    async def load_overview_data(self):
-        """Load all data from database and update the overview"""
+    async def refresh_if_changed(self):
+        """Reloads the tables whose version moved since the last poll (or everything once FULL_REFRESH_INTERVAL passes)."""
         if not self.running: return
 
         try:
-            all_rooms_data = await self.admin_page.page.data.get_all_rooms()
-            requests_data = await self.admin_page.page.data.get_all_requests()
-            all_users_data = await self.admin_page.page.data.get_all_users()
-            
-            current_admin_id = self.admin_page.page.data.get_active_user()
-            
-            users_data = []
-            admin_resident_map = {} 
-            
-            for user in all_users_data:
-                user_id = user[0]
-                try:
-                    user_record_data = json.loads(user[4])
-                    role = user_record_data.get("role", "resident")
-                    linked_admin_id = user_record_data.get("linked_admin_id")
-                except:
-                    continue 
-
-                is_current_admin = user_id == current_admin_id and role == "admin"
-                is_linked_resident = role == "resident" and linked_admin_id == current_admin_id
-                
-                if is_current_admin or is_linked_resident:
-                    users_data.append(user)
-                    admin_resident_map[user_id] = user[1]
+            versions = await self.admin_page.page.data.get_table_versions()
+        except Exception as e:
+            print(f"Error checking overview versions: {e}")
+            return
 
-            rooms_data = [r for r in all_rooms_data if r[1] == current_admin_id]
+        changed = {t for t in TRACKED_TABLES if versions.get(t, 0) != self.table_versions.get(t)}
+        if time.monotonic() - self.last_full_refresh >= FULL_REFRESH_INTERVAL:
+            changed = set(TRACKED_TABLES) # keeps "Xm ago" labels and month boundaries current
 
-            room_rents = {str(r[0]): r[5] for r in rooms_data} 
+        if not changed: return
 
-            total_beds = 0
-            for room in rooms_data:
-                total_beds += room[4] 
+        self.table_versions = {t: versions.get(t, 0) for t in TRACKED_TABLES}
+        await self.load_overview_data(changed)
 
-            residents_count = 0
-            projected_income = 0
-            actual_income_this_month = 0
-            
-            now = datetime.now()
-            start_of_month = datetime(now.year, now.month, 1).timestamp()
-            
-            thirty_days_ago_ts = (now - timedelta(days=30)).timestamp() 
+    async def load_overview_data(self, changed=None):
+        """Load the changed tables from the database and rebuild the overview parts that depend on them"""
+        if not self.running: return
+        if changed is None: changed = set(TRACKED_TABLES)
 
-            activities = []
-            
-            for user in users_data:
-                user_id = user[0]
-                user_name = user[1]
+        try:
+            current_admin_id = self.admin_page.page.data.get_active_user()
 
-                if user_id == current_admin_id and json.loads(user[4]).get("role") == "admin":
-                    continue
-                    
-                try:
-                    u_data = json.loads(user[4])
-                    room_id = str(u_data.get("room_id", "N/A"))
-                    
-                    if room_id != "N/A":
-                        residents_count += 1
-                        projected_income += room_rents.get(room_id, 0)
-                    
-                    for pay in u_data.get("payment_history", []):
-                        p_date = pay.get("date", 0)
-                        p_amount = pay.get("amount", 0)
-                        
-                        if p_date >= start_of_month:
-                            actual_income_this_month += p_amount
-                        
-                        activities.append({
-                            "type": "payment",
-                            "title": f"Payment received from {user_name}",
-                            "desc": f"₱ {p_amount:,}",
-                            "timestamp": p_date,
-                            "icon": ft.Icons.ATTACH_MONEY,
-                            "color": ft.Colors.GREEN_700
-                        })
-
-                except Exception as ex:
-                    print(f"Error parsing user {user[0]}: {ex}")
-
-            requests_count = 0
-            urgent_count = 0
-            urgent_maintenance_list = []
-            
-            admin_resident_room_user_ids = {u[0] for u in users_data if json.loads(u[4]).get("role") == "resident" and json.loads(u[4]).get("room_id") != "N/A"}
+            if "rooms" in changed or "users" in changed:
+                self.rooms_data = await self.admin_page.page.data.get_rooms_with_occupancy(current_admin_id)
+            if "requests" in changed:
+                self.requests_data = await self.admin_page.page.data.get_requests_for_admin(current_admin_id)
+            if "users" in changed:
+                self.users_data = await self.admin_page.page.data.get_residents_for_admin(current_admin_id)
+                # Payments are kept in their own table, written under the users version
+                now = datetime.now()
+                self.income_this_month = await self.admin_page.page.data.get_payment_total_since(current_admin_id, datetime(now.year, now.month, 1).timestamp())
+                self.recent_payments = await self.admin_page.page.data.get_recent_payments(current_admin_id, RECENT_ACTIVITY_LIMIT)
+            if "announcements" in changed:
+                self.announcements_data = await self.admin_page.page.data.get_announcements(admin_user_id=current_admin_id, limit=RECENT_ACTIVITY_LIMIT)
+
+            if changed == set(TRACKED_TABLES):
+                self.last_full_refresh = time.monotonic()
+
+            stale_parts = {part for part, tables in PART_DEPENDENCIES.items() if changed & tables}
+
+            if "stats" in stale_parts: self.update_stat_cards()
+            if "charts" in stale_parts: self.update_charts()
+            if "activity" in stale_parts: self.update_recent_activity()
+            if "maintenance" in stale_parts: self.update_urgent_maintenance()
+
+            if self.running:
+                self.admin_page.page.update()
             
-            for req in requests_data:
-                req_user_id = req[5]
-                if req_user_id not in admin_resident_room_user_ids:
-                    continue
-                    
-                status = req[3]
-                urgency = req[4]
-                date_created = req[6] 
-                
-                if status != "completed":
-                    requests_count += 1
-                    if urgency in ["high", "urgent"]:
-                        urgent_count += 1
-                        try:
-                            title = json.loads(req[2]).get("title", "Maintenance Issue")
-                        except: title = "Issue"
-                        
-                        urgent_maintenance_list.append({
-                            "title": title,
-                            "room": f"Room {req[1]}",
-                            "urgency": urgency
-                        })
-                
-                request_username = admin_resident_map.get(req_user_id, "Unknown Resident")
-                
-                date_raw = req[6]
-                try:
-                    timestamp = int(date_raw)
-                except (ValueError, TypeError):
-                    timestamp = 0 
-                    
-                activities.append({
-                    "type": "request",
-                    "title": "Maintenance Request Filed",
-                    "desc": f"Room {req[1]} - Status: {status.title()}",
-                    "timestamp": timestamp,
-                    "icon": ft.Icons.BUILD_CIRCLE_OUTLINED,
-                    "color": ft.Colors.ORANGE_700
+        except Exception as e:
+            print(f"Error loading overview data: {e}")
+            import traceback
+            traceback.print_exc()
+
+    # --- Derived Values ---
+
+    def get_occupancy_totals(self):
+        """Returns (total_beds, residents_count, projected_income) from the rooms and their resident counts."""
+        total_beds = 0
+        residents_count = 0
+        projected_income = 0
+        for room in self.rooms_data:
+            total_beds += room.bed_count
+            residents_count += room.residents_count
+            projected_income += room.residents_count * (room.monthly_rent or 0)
+
+        return total_beds, residents_count, projected_income
+
+    def get_room_request_data(self):
+        """Returns (open requests, urgent maintenance items) for residents that are assigned a room."""
+        admin_resident_room_user_ids = {u.id for u in self.users_data if u.room_id is not None}
+
+        open_requests = []
+        urgent_maintenance_list = []
+        for req in self.requests_data:
+            if req.user_id not in admin_resident_room_user_ids or req.current_status == "completed":
+                continue
+
+            open_requests.append(req)
+            urgency = req.urgency
+            if urgency in ["high", "urgent"]:
+                urgent_maintenance_list.append({
+                    "title": req.issue.get("title", "Maintenance Issue"),
+                    "room": f"Room {req.room_id}",
+                    "urgency": urgency
                 })
 
-            admin_announcements = await self.admin_page.page.data.get_announcements(admin_user_id=current_admin_id)
+        return open_requests, urgent_maintenance_list
 
-            for ann in admin_announcements:
-                date_raw = ann[4]
-                try:
-                    timestamp = int(date_raw)
-                except (ValueError, TypeError):
-                    timestamp = 0
-                    
-                activities.append({
-                    "type": "announcement",
-                    "title": f"New Announcement Posted",
-                    "desc": ann[2], 
-                    "timestamp": timestamp,
-                    "icon": ft.Icons.CAMPAIGN_OUTLINED,
-                    "color": ft.Colors.RED_ACCENT_700
-                })
+    # --- Part Updates ---
 
+    def update_stat_cards(self):
+        total_beds, residents_count, projected_income = self.get_occupancy_totals()
+        open_requests, urgent_maintenance_list = self.get_room_request_data()
 
-            activities.sort(key=lambda x: x["timestamp"], reverse=True)
-            recent_activities = activities[:5]
+        bed_count_safe = max(total_beds, 1) 
+        percent = (residents_count / bed_count_safe) * 100
 
-            bed_count_safe = max(total_beds, 1) 
-            percent = (residents_count / bed_count_safe) * 100
+        card_col = {"xs": 12, "sm": 6, "md": 3}
 
-            # --- Top Stats Cards ---
-            card_col = {"xs": 12, "sm": 6, "md": 3}
+        self.info_cards_container.controls = [
+            self.create_stat_card("Total Beds", str(total_beds), "Capacity", ft.Icon(ft.Icons.HOME_OUTLINED), "#FFEDD4", "#FF6900", col=card_col),
+            self.create_stat_card("Residents", str(residents_count), f"{percent:.0f}% Occupancy", ft.Icon(ft.Icons.PEOPLE_OUTLINE), "#FEF3C6", "#E68C2A", col=card_col),
+            self.create_stat_card("Est. Monthly Income", f"₱ {projected_income:,}", "Based on occupancy", ft.Icon(ft.Icons.ATTACH_MONEY), "#DBFCE7", "#14AD4E", col=card_col),
+            self.create_stat_card("Pending Tasks", str(len(open_requests)), f"{len(urgent_maintenance_list)} Urgent", ft.Icon(ft.Icons.ERROR_OUTLINE), "#FFE2E2", "#EC2C33", col=card_col),
+        ]
 
-            self.info_cards_container.controls = [
-                self.create_stat_card("Total Beds", str(total_beds), "Capacity", ft.Icon(ft.Icons.HOME_OUTLINED), "#FFEDD4", "#FF6900", col=card_col),
-                self.create_stat_card("Residents", str(residents_count), f"{percent:.0f}% Occupancy", ft.Icon(ft.Icons.PEOPLE_OUTLINE), "#FEF3C6", "#E68C2A", col=card_col),
-                self.create_stat_card("Est. Monthly Income", f"₱ {projected_income:,}", "Based on occupancy", ft.Icon(ft.Icons.ATTACH_MONEY), "#DBFCE7", "#14AD4E", col=card_col),
-                self.create_stat_card("Pending Tasks", str(requests_count), f"{urgent_count} Urgent", ft.Icon(ft.Icons.ERROR_OUTLINE), "#FFE2E2", "#EC2C33", col=card_col),
-            ]
+    def update_charts(self):
+        total_beds, _, projected_income = self.get_occupancy_totals()
+        actual_income_this_month = self.income_this_month
 
-            # --- Charts ---
+        resident_move_ins = []
+        for user in self.users_data:
+            # Ensure it has a move-in date and is assigned a room
+            if user.move_in_date is not None and user.room_id is not None:
+                resident_move_ins.append(user.move_in_date)
+
+        trend_points = []
+        trend_labels = []
+        now = datetime.now()
+        
+        # Calculates historical occupancy for the LAST 12 MONTHS
+        for i in range(11, -1, -1): 
+            target_month = now.month - i
+            target_year = now.year
+            while target_month <= 0:
+                target_month += 12
+                target_year -= 1
             
-            resident_move_ins = []
-            for user in users_data:
-                try:
-                    user_data = json.loads(user[4])
-                    move_in_date = user_data.get("move_in_date")
-                    # Ensure it's a resident, has a move-in date, and is assigned a room
-                    if user_data.get("role") == "resident" and move_in_date != "N/A" and user_data.get("room_id") != "N/A":
-                        resident_move_ins.append(int(move_in_date))
-                except:
-                    continue
-
-            trend_points = []
-            trend_labels = []
-            now = datetime.now()
+            _, last_day = calendar.monthrange(target_year, target_month)
+            month_end_ts = datetime(target_year, target_month, last_day, 23, 59, 59).timestamp()
             
-            # Calculates historical occupancy for the LAST 12 MONTHS
-            for i in range(11, -1, -1): 
-                target_month = now.month - i
-                target_year = now.year
-                while target_month <= 0:
-                    target_month += 12
-                    target_year -= 1
-                
-                _, last_day = calendar.monthrange(target_year, target_month)
-                month_end_ts = datetime(target_year, target_month, last_day, 23, 59, 59).timestamp()
-                
-                count = sum(1 for mid in resident_move_ins if mid <= month_end_ts)
-                
-                trend_points.append(count)
-                trend_labels.append(datetime(target_year, target_month, 1).strftime("%b"))
-
-            line_data_points = [ft.LineChartDataPoint(i, val) for i, val in enumerate(trend_points)]
-            max_occ = max(max(trend_points) if trend_points else 0, total_beds, 1) + 2
+            count = sum(1 for mid in resident_move_ins if mid <= month_end_ts)
             
-            bottom_axis_labels = [ft.ChartAxisLabel(value=i, label=ft.Text(label, size=10, weight=ft.FontWeight.BOLD)) for i, label in enumerate(trend_labels)]
-
-            chart_col = {"xs": 12, "md": 6}
-
-            occupancy_chart = self.create_chart_container(
-                "Occupancy Trend",
-                ft.LineChart(
-                    data_series=[
-                        ft.LineChartData(
-                            data_points=line_data_points,
-                            stroke_width=3,
-                            color="#FF6900",
-                            curved=True,
-                            stroke_cap_round=True,
-                            below_line_bgcolor=ft.Colors.with_opacity(0.1, "#FF6900")
-                        )
-                    ],
-                    bottom_axis=ft.ChartAxis(labels=bottom_axis_labels, labels_size=20),
-                    left_axis=ft.ChartAxis(labels_size=25),
-                    border=ft.border.all(0, ft.Colors.TRANSPARENT),
-                    horizontal_grid_lines=ft.ChartGridLines(
-                        interval=1, color=ft.Colors.with_opacity(0.2, ft.Colors.GREY), width=1
-                    ),
-                    min_y=0,
-                    max_y=max_occ,
-                    expand=True,
-                    tooltip_bgcolor=ft.Colors.with_opacity(0.8, ft.Colors.BLACK)
+            trend_points.append(count)
+            trend_labels.append(datetime(target_year, target_month, 1).strftime("%b"))
+
+        line_data_points = [ft.LineChartDataPoint(i, val) for i, val in enumerate(trend_points)]
+        max_occ = max(max(trend_points) if trend_points else 0, total_beds, 1) + 2
+        
+        bottom_axis_labels = [ft.ChartAxisLabel(value=i, label=ft.Text(label, size=10, weight=ft.FontWeight.BOLD)) for i, label in enumerate(trend_labels)]
+
+        chart_col = {"xs": 12, "md": 6}
+
+        occupancy_chart = self.create_chart_container(
+            "Occupancy Trend",
+            ft.LineChart(
+                data_series=[
+                    ft.LineChartData(
+                        data_points=line_data_points,
+                        stroke_width=3,
+                        color="#FF6900",
+                        curved=True,
+                        stroke_cap_round=True,
+                        below_line_bgcolor=ft.Colors.with_opacity(0.1, "#FF6900")
+                    )
+                ],
+                bottom_axis=ft.ChartAxis(labels=bottom_axis_labels, labels_size=20),
+                left_axis=ft.ChartAxis(labels_size=25),
+                border=ft.border.all(0, ft.Colors.TRANSPARENT),
+                horizontal_grid_lines=ft.ChartGridLines(
+                    interval=1, color=ft.Colors.with_opacity(0.2, ft.Colors.GREY), width=1
                 ),
-                col=chart_col
-            )
-
-            # 2. Revenue (Bar Chart)
-            max_rev = max(projected_income, actual_income_this_month, 1)
-            step_rev = max(1000, int(max_rev // 4))
-            labels_rev = [ft.ChartAxisLabel(i, ft.Text(f"{i//1000}k", size=10)) for i in range(0, int(max_rev * 1.2), step_rev)]
-
-            revenue_chart = self.create_chart_container(
-                "Financial Overview (This Month)",
-                ft.BarChart(
-                    bar_groups=[
-                        ft.BarChartGroup(
-                            x=0,
-                            bar_rods=[ft.BarChartRod(from_y=0, to_y=actual_income_this_month, width=40, color="#0099FF", border_radius=0, tooltip=f"Collected: {actual_income_this_month}")]
-                        ),
-                        ft.BarChartGroup(
-                            x=1,
-                            bar_rods=[ft.BarChartRod(from_y=0, to_y=projected_income, width=40, color="#7C3AED", border_radius=0, tooltip=f"Projected: {projected_income}")]
-                        ),
-                    ],
-                    bottom_axis=ft.ChartAxis(
-                        labels=[
-                            ft.ChartAxisLabel(0, ft.Text("Collected")),
-                            ft.ChartAxisLabel(1, ft.Text("Projected")),
-                        ]
+                min_y=0,
+                max_y=max_occ,
+                expand=True,
+                tooltip_bgcolor=ft.Colors.with_opacity(0.8, ft.Colors.BLACK)
+            ),
+            col=chart_col
+        )
+
+        # 2. Revenue (Bar Chart)
+        max_rev = max(projected_income, actual_income_this_month, 1)
+        step_rev = max(1000, int(max_rev // 4))
+        labels_rev = [ft.ChartAxisLabel(i, ft.Text(f"{i//1000}k", size=10)) for i in range(0, int(max_rev * 1.2), step_rev)]
+
+        revenue_chart = self.create_chart_container(
+            "Financial Overview (This Month)",
+            ft.BarChart(
+                bar_groups=[
+                    ft.BarChartGroup(
+                        x=0,
+                        bar_rods=[ft.BarChartRod(from_y=0, to_y=actual_income_this_month, width=40, color="#0099FF", border_radius=0, tooltip=f"Collected: {actual_income_this_month}")]
                     ),
-                    left_axis=ft.ChartAxis(labels=labels_rev, labels_size=40),
-                    border=ft.border.all(0, ft.Colors.TRANSPARENT),
-                    horizontal_grid_lines=ft.ChartGridLines(
-                        color=ft.Colors.with_opacity(0.2, ft.Colors.GREY), width=1, dash_pattern=[3, 3]
+                    ft.BarChartGroup(
+                        x=1,
+                        bar_rods=[ft.BarChartRod(from_y=0, to_y=projected_income, width=40, color="#7C3AED", border_radius=0, tooltip=f"Projected: {projected_income}")]
                     ),
-                    tooltip_bgcolor=ft.Colors.with_opacity(0.8, ft.Colors.BLACK),
-                    max_y=max_rev * 1.2,
-                    expand=True
+                ],
+                bottom_axis=ft.ChartAxis(
+                    labels=[
+                        ft.ChartAxisLabel(0, ft.Text("Collected")),
+                        ft.ChartAxisLabel(1, ft.Text("Projected")),
+                    ]
                 ),
-                col=chart_col
-            )
-
-            self.charts_container.controls = [occupancy_chart, revenue_chart]
+                left_axis=ft.ChartAxis(labels=labels_rev, labels_size=40),
+                border=ft.border.all(0, ft.Colors.TRANSPARENT),
+                horizontal_grid_lines=ft.ChartGridLines(
+                    color=ft.Colors.with_opacity(0.2, ft.Colors.GREY), width=1, dash_pattern=[3, 3]
+                ),
+                tooltip_bgcolor=ft.Colors.with_opacity(0.8, ft.Colors.BLACK),
+                max_y=max_rev * 1.2,
+                expand=True
+            ),
+            col=chart_col
+        )
 
-            # --- Bottom Section Update ---
-            activity_col = {"xs": 12, "md": 6}
-            
-            activity_display_items = []
-            if not recent_activities:
-                activity_display_items.append(ft.Text("No recent activity", color=ft.Colors.GREY_400))
-            else:
-                for act in recent_activities:
-                    now_ts = int(datetime.now().timestamp())
-                    event_ts = int(act["timestamp"])
-                    diff = now_ts - event_ts
-                    
-                    time_str = ""
+        self.charts_container.controls = [occupancy_chart, revenue_chart]
+
+    def update_recent_activity(self):
+        activities = []
+
+        for username, paid_at, p_amount in self.recent_payments:
+            activities.append({
+                "type": "payment",
+                "title": f"Payment received from {username}",
+                "desc": f"₱ {p_amount:,}",
+                "timestamp": paid_at or 0,
+                "icon": ft.Icons.ATTACH_MONEY,
+                "color": ft.Colors.GREEN_700
+            })
+
+        admin_resident_room_user_ids = {u.id for u in self.users_data if u.room_id is not None}
+
+        for req in self.requests_data:
+            if req.user_id not in admin_resident_room_user_ids:
+                continue
+
+            activities.append({
+                "type": "request",
+                "title": "Maintenance Request Filed",
+                "desc": f"Room {req.room_id} - Status: {req.status.title()}",
+                "timestamp": req.created_at,
+                "icon": ft.Icons.BUILD_CIRCLE_OUTLINED,
+                "color": ft.Colors.ORANGE_700
+            })
+
+        for ann in self.announcements_data:
+            activities.append({
+                "type": "announcement",
+                "title": f"New Announcement Posted",
+                "desc": ann.title, 
+                "timestamp": ann.created_at,
+                "icon": ft.Icons.CAMPAIGN_OUTLINED,
+                "color": ft.Colors.RED_ACCENT_700
+            })
+
+        activities.sort(key=lambda x: x["timestamp"], reverse=True)
+        recent_activities = activities[:RECENT_ACTIVITY_LIMIT]
+
+        activity_display_items = []
+        if not recent_activities:
+            activity_display_items.append(ft.Text("No recent activity", color=ft.Colors.GREY_400))
+        else:
+            for act in recent_activities:
+                now_ts = int(datetime.now().timestamp())
+                event_ts = int(act["timestamp"])
+                diff = now_ts - event_ts
+                
+                time_str = ""
+                
+                if diff < 60: 
+                    time_str = "Just now"
+                else:
+                    dt = datetime.fromtimestamp(event_ts)
                     
-                    if diff < 60: 
-                        time_str = "Just now"
+                    if diff < 3600: 
+                        time_str = f"{int(diff/60)}m ago"
+                    elif diff < 86400: 
+                        time_str = f"{int(diff/3600)}h ago"
                     else:
-                        dt = datetime.fromtimestamp(event_ts)
-                        
-                        if diff < 3600: 
-                            time_str = f"{int(diff/60)}m ago"
-                        elif diff < 86400: 
-                            time_str = f"{int(diff/3600)}h ago"
-                        else:
-                            time_str = dt.strftime("%b %d")
-                            if diff >= 86400 * 365:
-                                time_str = dt.strftime("%b %d, %Y")
-                    
-                    # Refactored: Call helper function for creating the activity item UI
-                    activity_display_items.append(self.create_activity_item(act, time_str))
+                        time_str = dt.strftime("%b %d")
+                        if diff >= 86400 * 365:
+                            time_str = dt.strftime("%b %d, %Y")
+                
+                activity_display_items.append(self.create_activity_item(act, time_str))
 
-            self.activity_items_column.controls = activity_display_items
-            
-            maintenance_display_items = []
-            if not urgent_maintenance_list:
-                maintenance_display_items.append(ft.Text("No urgent issues! Good job.", size=12, color=ft.Colors.GREY_400))
-            else:
-                for item in urgent_maintenance_list:
-                    tag_color = "#FF3333" if item["urgency"] == "urgent" else "#FF9800"
-                    maintenance_display_items.append(
-                        ft.Container(
-                            ft.Row(
-                                [
-                                    ft.Column(
-                                        [
-                                            ft.Text(item["title"], size=12, weight=ft.FontWeight.W_600),
-                                            ft.Text(item["room"], size=10, color=ft.Colors.GREY_500)
-                                        ],
-                                        spacing=2,
-                                        expand=True
-                                    ),
-                                    ft.Container(
-                                        ft.Text(item["urgency"].upper(), color=ft.Colors.WHITE, size=10, weight=ft.FontWeight.BOLD),
-                                        bgcolor=tag_color,
-                                        padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                                        border_radius=12
-                                    )
-                                ],
-                                alignment=ft.MainAxisAlignment.SPACE_BETWEEN
-                            ),
-                            bgcolor="#FFF5E5",
-                            padding=10,
-                            border_radius=8
-                        )
-                    )
+        self.activity_items_column.controls = activity_display_items
 
-            self.maintenance_items_column.controls = maintenance_display_items
+    def update_urgent_maintenance(self):
+        _, urgent_maintenance_list = self.get_room_request_data()
 
-            if self.running:
-                self.admin_page.page.update()
-            
-        except Exception as e:
-            print(f"Error loading overview data: {e}")
-            import traceback
-            traceback.print_exc()
+        maintenance_display_items = []
+        if not urgent_maintenance_list:
+            maintenance_display_items.append(ft.Text("No urgent issues! Good job.", size=12, color=ft.Colors.GREY_400))
+        else:
+            for item in urgent_maintenance_list:
+                tag_color = "#FF3333" if item["urgency"] == "urgent" else "#FF9800"
+                maintenance_display_items.append(
+                    ft.Container(
+                        ft.Row(
+                            [
+                                ft.Column(
+                                    [
+                                        ft.Text(item["title"], size=12, weight=ft.FontWeight.W_600),
+                                        ft.Text(item["room"], size=10, color=ft.Colors.GREY_500)
+                                    ],
+                                    spacing=2,
+                                    expand=True
+                                ),
+                                ft.Container(
+                                    ft.Text(item["urgency"].upper(), color=ft.Colors.WHITE, size=10, weight=ft.FontWeight.BOLD),
+                                    bgcolor=tag_color,
+                                    padding=ft.padding.symmetric(horizontal=8, vertical=4),
+                                    border_radius=12
+                                )
+                            ],
+                            alignment=ft.MainAxisAlignment.SPACE_BETWEEN
+                        ),
+                        bgcolor="#FFF5E5",
+                        padding=10,
+                        border_radius=8
+                    )
+                )
+
+        self.maintenance_items_column.controls = maintenance_display_items
 
     # --- New Helper for Activity Item UI ---
     def create_activity_item(self, act, time_str):
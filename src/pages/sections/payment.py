@@ -1,12 +1,13 @@
 import flet as ft
 from datetime import datetime
 import json
-import calendar
 
 from pages.sections.section import Section
 from utils.element_factory import create_info_card, create_remark, create_banner
 
 class Payment(Section):
+    TABLES = ("users", "rooms")
+
     def __init__(self, resident_page):
         super().__init__()
 
@@ -345,14 +346,6 @@ class Payment(Section):
             expand=True
         )
 
-    def add_months(self, sourcedate, months):
-        """Adds months to a date, preserving day of month where possible."""
-        month = sourcedate.month - 1 + months
-        year = sourcedate.year + month // 12
-        month = month % 12 + 1
-        day = min(sourcedate.day, calendar.monthrange(year,month)[1])
-        return datetime(year, month, day, sourcedate.hour, sourcedate.minute, sourcedate.second)
-
     async def show_add_payment(self, e):
         amount_tf = ft.TextField(
             label="Amount", 
@@ -389,63 +382,9 @@ class Payment(Section):
                 amount_tf.update()
                 return
             
-            # Fetch fresh data
-            data = self.resident_page.data
-            payment_history = data.get("payment_history", [])
-            unpaid_dues = data.get("unpaid_dues", [])
-            monthly_rent = data.get("monthly_rent", 0)
-            
-            # Add to history
-            new_payment = {
-                "date": int(datetime.now().timestamp()),
-                "amount": amount,
-                "remark": "on time"
-            }
-            payment_history.append(new_payment)
-            
-            # Pay off dues (oldest first)
-            if unpaid_dues:
-                new_payment["remark"] = "late"
-                unpaid_dues.sort(key=lambda x: x.get("date", 0))
-                remaining = amount
-                new_unpaid = []
-                for due in unpaid_dues:
-                    if remaining <= 0:
-                        new_unpaid.append(due)
-                        continue
-                    due_amt = due.get("amount", 0)
-                    if remaining >= due_amt:
-                        remaining -= due_amt
-                    else:
-                        due["amount"] = due_amt - remaining
-                        remaining = 0
-                        new_unpaid.append(due)
-                data["unpaid_dues"] = new_unpaid
-
-            if monthly_rent > 0:
-                months_paid = amount // monthly_rent
-                
-                if months_paid >= 1 and data.get("due_date") != "N/A":
-                    try:
-                        current_due_ts = int(data["due_date"])
-                        current_due_dt = datetime.fromtimestamp(current_due_ts)
-                        
-                        new_due_dt = self.add_months(current_due_dt, months_paid)
-                        
-                        data["due_date"] = str(int(new_due_dt.timestamp()))
-                    except Exception as e:
-                        print(f"Error updating due date: {e}")
-
-            data["payment_history"] = payment_history
-            
-            # Save to DB
-            await self.resident_page.page.data.update_user(
-                self.resident_page.id, 
-                self.resident_page.username, 
-                self.resident_page.email, 
-                self.resident_page.password, 
-                data
-            )
+            # Settles dues and moves the due date against the stored ledger, not our possibly stale copy
+            await self.resident_page.page.data.record_payment(self.resident_page.id, amount)
+            await self.resident_page.refresh_data(await self.resident_page.page.data.get_table_versions()) # before the new tab reads it
             
             self.resident_page.page.close(popup)
             create_banner(self.resident_page.page, ft.Colors.GREEN_100, ft.Icon(ft.Icons.CHECK, color=ft.Colors.GREEN), "Payment added successfully!", ft.Colors.GREEN)
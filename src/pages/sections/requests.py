@@ -3,9 +3,11 @@ from datetime import datetime
 import json
 
 from pages.sections.section import Section
-from utils.element_factory import create_info_card, create_remark
+from utils.element_factory import create_info_card, create_remark, create_banner
 
 class Requests(Section):
+    TABLES = ("requests",)
+
     def __init__(self, resident_page):
         super().__init__()
         self.resident_page = resident_page
@@ -184,7 +186,7 @@ class Requests(Section):
             if not title.value: 
                 title.error_text = "Required"; title.update(); return
             
-            await self.resident_page.page.data.create_request(
+            created = await self.resident_page.page.data.create_request(
                 self.resident_page.data["room_id"],
                 title.value,
                 desc.value,
@@ -192,6 +194,9 @@ class Requests(Section):
                 self.resident_page.id
             )
             self.resident_page.page.close(dlg)
+            if not created:
+                create_banner(self.resident_page.page, ft.Colors.RED_100, ft.Icon(ft.Icons.ERROR, color=ft.Colors.RED), "Could not submit the request: your account no longer exists.", ft.Colors.RED)
+                return
             
             self.resident_page.page.run_task(self.resident_page.show_section, Requests(self.resident_page))
         
@@ -1,10 +1,15 @@
 import flet as ft
 from datetime import datetime
-import json
 
 from pages.sections.section import Section
+from utils.paged_list import PagedList
+
+PAGE_SIZE = 20 # posts fetched per page of the feed
+LOAD_MORE_THRESHOLD = 300 # pixels from the bottom at which the next page of posts is fetched
 
 class ResidentAnnouncements(Section):
+    TABLES = ("announcements", "comments", "announcement_likes")
+
     def __init__(self, resident_page):
         super().__init__()
         self.resident_page = resident_page
@@ -19,81 +24,89 @@ class ResidentAnnouncements(Section):
             ], spacing=1)
         ])
 
-        self.posts_list = ft.ListView(spacing=15, expand=True)
+        self.posts_list = ft.ListView(spacing=15, expand=True, scroll_interval=100)
+        # Newest first; a post's id is the cursor for the page after it
+        self.post_rows = PagedList(
+            self.resident_page.page, self.posts_list, self.create_post_card, self.fetch_posts,
+            page_size=PAGE_SIZE, threshold=LOAD_MORE_THRESHOLD,
+            signature=lambda p: p.values(),
+            placeholder=lambda: ft.Container(ft.Text("No announcements yet.", color="grey"), alignment=ft.alignment.center, padding=50)
+        )
 
         self.content = ft.Container(
             ft.Column([header, self.posts_list], spacing=20, expand=True),
             padding=20, expand=True
         )
 
-        self.resident_page.page.run_task(self.load_data)
+        self.start_load(self.resident_page.page, self.load_data)
+
+    async def refresh(self):
+        await self.load_data()
+        return True
 
     async def load_data(self):
-        self.posts_list.controls.clear()
-        
-        posts = await self.resident_page.page.data.get_announcements(admin_user_id=self.admin_id)
-        
-        if not posts:
-            self.posts_list.controls.append(ft.Container(ft.Text("No announcements yet.", color="grey"), alignment=ft.alignment.center, padding=50))
-        else:
-            for p in posts:
-               
-                pid = p[0]
-                
-                likes_raw = p[5]
-                likes = []
-                if isinstance(likes_raw, str):
-                    try:
-                        likes = json.loads(likes_raw)
-                    except json.JSONDecodeError:
-                        likes = []
-                
-                is_liked = self.user_id in likes
-                
-                try:
-                    dt = datetime.fromtimestamp(int(p[4])).strftime("%b %d, %Y")
-                except (ValueError, TypeError):
-                    dt = "N/A"
-                
-                comments = await self.resident_page.page.data.get_comments(pid)
-                comment_count = len(comments)
-
-                card = ft.Container(
-                    ft.Column([
-                        ft.Text(p[2], weight="bold", size=16), 
-                        ft.Text(p[3], size=13, color="#444444"), 
-                        ft.Container(height=5),
-                        ft.Row([
-                            ft.Text(dt, size=11, color="grey"),
-                            ft.Row([
-                                ft.IconButton(
-                                    icon=ft.Icons.FAVORITE if is_liked else ft.Icons.FAVORITE_BORDER,
-                                    icon_color="red" if is_liked else "grey",
-                                    icon_size=20,
-                                    on_click=lambda e, i=pid: self.resident_page.page.run_task(self.toggle_like, i)
-                                ),
-                                ft.Text(str(len(likes)), size=12),
-                                ft.Container(width=10),
-                                ft.IconButton(ft.Icons.CHAT_BUBBLE_OUTLINE, icon_size=20, icon_color="blue", on_click=lambda e, i=pid: self.resident_page.page.run_task(self.show_comments, i)),
-                                ft.Text(str(comment_count), size=12),
-                            ], spacing=0)
-                        ], alignment="spaceBetween", vertical_alignment="center")
-                    ]),
-                    padding=15, bgcolor="white", border_radius=10, border=ft.border.all(1, "#eee")
-                )
-                self.posts_list.controls.append(card)
-        self.resident_page.page.update()
+        """Reloads the feed from the newest post."""
+        await self.post_rows.reload()
+
+    async def fetch_posts(self, before_id, limit):
+        return await self.resident_page.page.data.get_announcements_with_counts(
+            admin_user_id=self.admin_id, viewer_id=self.user_id, before_id=before_id, limit=limit
+        )
+
+    def create_post_card(self, p):
+        pid = p.id
+        likes_count = p.like_count
+        comment_count = p.comment_count
+        is_liked = p.liked_by_viewer
+
+        dt = datetime.fromtimestamp(p.created_at).strftime("%b %d, %Y") if p.created_at else "N/A"
+
+        like_button = ft.IconButton(
+            icon=ft.Icons.FAVORITE if is_liked else ft.Icons.FAVORITE_BORDER,
+            icon_color="red" if is_liked else "grey",
+            icon_size=20,
+            on_click=lambda e, i=pid: self.resident_page.page.run_task(self.toggle_like, i)
+        )
+        like_count_text = ft.Text(str(likes_count), size=12)
+
+        return ft.Container(
+            ft.Column([
+                ft.Text(p.title, weight="bold", size=16), 
+                ft.Text(p.content, size=13, color="#444444"), 
+                ft.Container(height=5),
+                ft.Row([
+                    ft.Text(dt, size=11, color="grey"),
+                    ft.Row([
+                        like_button,
+                        like_count_text,
+                        ft.Container(width=10),
+                        ft.IconButton(ft.Icons.CHAT_BUBBLE_OUTLINE, icon_size=20, icon_color="blue", on_click=lambda e, i=pid: self.resident_page.page.run_task(self.show_comments, i)),
+                        ft.Text(str(comment_count), size=12),
+                    ], spacing=0)
+                ], alignment="spaceBetween", vertical_alignment="center")
+            ]),
+            padding=15, bgcolor="white", border_radius=10, border=ft.border.all(1, "#eee"),
+            data=(like_button, like_count_text) # kept on the card, so they go when its row is dropped
+        )
 
     async def toggle_like(self, pid):
-        await self.resident_page.page.data.toggle_like(pid, self.user_id)
-        await self.load_data()
+        """Toggles the like and updates just that post's card, so the loaded pages are kept."""
+        liked = await self.resident_page.page.data.toggle_like(pid, self.user_id)
+        card = self.post_rows.control(pid)
+        if card is None: return
+
+        like_button, like_count_text = card.data
+        like_button.icon = ft.Icons.FAVORITE if liked else ft.Icons.FAVORITE_BORDER
+        like_button.icon_color = "red" if liked else "grey"
+        like_count_text.value = str(max(0, int(like_count_text.value) + (1 if liked else -1)))
+        self.resident_page.page.update()
 
     async def show_comments(self, pid):
         self.reply_parent_id = None
         comments_data = await self.resident_page.page.data.get_comments(pid)
         
-        parents = [c for c in comments_data if c[6] is None]
-        replies = [c for c in comments_data if c[6] is not None]
+        parents = [c for c in comments_data if c.parent_id is None]
+        replies = [c for c in comments_data if c.parent_id is not None]
 
         comment_list = ft.ListView(expand=True, spacing=10)
         
@@ -106,16 +119,16 @@ class ResidentAnnouncements(Section):
             comment_list.controls.append(ft.Text("No comments yet.", color="grey", italic=True))
         else:
             for p in parents:
-                p_dt = datetime.fromtimestamp(int(p[5])).strftime("%b %d %H:%M")
-                p_id = p[0]
-                comment_list.controls.append(self.create_comment_bubble(p[3], p[4], p_dt, p_id, new_comment_tf))
+                p_dt = datetime.fromtimestamp(p.created_at).strftime("%b %d %H:%M")
+                p_id = p.id
+                comment_list.controls.append(self.create_comment_bubble(p.username, p.content, p_dt, p_id, new_comment_tf))
                 
-                p_replies = [r for r in replies if r[6] == p_id]
+                p_replies = [r for r in replies if r.parent_id == p_id]
                 for r in p_replies:
-                    r_dt = datetime.fromtimestamp(int(r[5])).strftime("%b %d %H:%M")
+                    r_dt = datetime.fromtimestamp(r.created_at).strftime("%b %d %H:%M")
                     comment_list.controls.append(
                         ft.Container(
-                            self.create_comment_bubble(r[3], r[4], r_dt, p_id, new_comment_tf),
+                            self.create_comment_bubble(r.username, r.content, r_dt, p_id, new_comment_tf),
                             padding=ft.padding.only(left=30)
                         )
                     )
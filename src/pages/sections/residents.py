@@ -1,19 +1,26 @@
 import flet as ft
-import json
+import aiomysql
+import asyncio
 import calendar
 from datetime import datetime
 import math
 
 from pages.sections.section import Section
 from utils.element_factory import create_info_card, create_remark, create_banner
+from utils.paged_list import PagedList
+
+PAGE_SIZE = 30 # residents fetched per page of the list
+SEARCH_DEBOUNCE = 0.3 # seconds the search field has to be idle before it queries
 
 class Residents(Section):
+    TABLES = ("users", "rooms")
+
     def __init__(self, admin_page):
         super().__init__()
 
         self.admin_page = admin_page
         self.page = admin_page.page
-        self.all_residents = []
+        self.search_generation = 0
 
         # Search field
         self.search_field = ft.TextField(
@@ -103,7 +110,18 @@ class Residents(Section):
         )
 
         # Residents list
-        self.residents_list = ft.ListView(spacing=7, expand=True)
+        self.residents_list = ft.ListView(spacing=7, expand=True, scroll_interval=100)
+        # By id; a resident's id is the cursor for the page after it
+        self.resident_rows = PagedList(
+            self.page, self.residents_list, self.create_resident_card, self.fetch_residents,
+            page_size=PAGE_SIZE,
+            signature=lambda r: r.values(),
+            placeholder=lambda: ft.Container(
+                ft.Text("No residents found", color=ft.Colors.GREY_400),
+                alignment=ft.alignment.center,
+                expand=True
+            )
+        )
 
         residents_container = ft.Container(
             ft.Column(
@@ -144,10 +162,17 @@ class Residents(Section):
         )
 
         # Load data
-        self.page.run_task(self.load_data)
+        self.start_load(self.page, self.load_data)
 
     def on_search_change(self, e):
-        self.page.run_task(self.filter_residents)
+        self.search_generation += 1
+        self.page.run_task(self.debounced_search, self.search_generation)
+
+    async def debounced_search(self, generation):
+        """Runs the search once typing has paused; superseded keystrokes give up here."""
+        await asyncio.sleep(SEARCH_DEBOUNCE)
+        if generation != self.search_generation: return
+        await self.filter_residents()
 
     def on_filter_change(self, e):
         self.page.run_task(self.filter_residents)
@@ -163,140 +188,96 @@ class Residents(Section):
         day = min(sourcedate.day, calendar.monthrange(year,month)[1])
         return datetime(year, month, day, sourcedate.hour, sourcedate.minute, sourcedate.second)
 
+    async def refresh(self):
+        await self.load_data()
+        return True
+
     async def load_data(self):
         try:
-            users = await self.page.data.get_all_users()
-            self.all_residents = []
-            
-            current_admin_id = self.page.data.get_active_user() # Get the logged-in admin's ID
-            
-            for user in users:
-                user_id = user[0]
-                
-                if user_id == current_admin_id:
-                    continue 
-                
-                try:
-                    user_data = json.loads(user[4])
-
-                    if user_data.get("role") == "resident" and user_data.get("linked_admin_id") == current_admin_id:
-                        self.all_residents.append({
-                            "id": user_id,
-                            "username": user[1],
-                            "email": user[2],
-                            "password": user[3],
-                            "room_id": user_data.get("room_id", "N/A"),
-                            "phone": user_data.get("phone_number", "N/A"),
-                            "due_date": user_data.get("due_date", "N/A"),
-                            "data": user_data 
-                        })
-                except Exception as e:
-                    continue
-
             await self.update_stats()
-            # Initial sort and display
             await self.filter_residents()
         except Exception as e:
             print(f"Error: {e}")
 
     async def update_stats(self):
-        total = len(self.all_residents)
-        assigned = sum(1 for r in self.all_residents if r["room_id"] != "N/A")
+        total, assigned = await self.page.data.get_resident_counts(self.admin_page.user_id)
         
         self.total_text.value = str(total)
         self.assigned_text.value = str(assigned)
         self.unassigned_text.value = str(total - assigned)
         self.page.update()
 
-    async def display_residents(self, residents):
-        self.residents_list.controls.clear()
-
-        if not residents:
-            self.residents_list.controls.append(
-                ft.Container(
-                    ft.Text("No residents found", color=ft.Colors.GREY_400),
-                    alignment=ft.alignment.center,
-                    expand=True
-                )
-            )
-        else:
-            for r in residents:
-                # Room Badge
-                badge = create_remark(
-                    f"Room {r['room_id']}" if r['room_id'] != "N/A" else "Unassigned",
-                    "#00cc0a" if r['room_id'] != "N/A" else "#808899",
-                    "#b3ffb6" if r['room_id'] != "N/A" else "#F3F4F6"
-                )
-
-                card = ft.Container(
-                    ft.Row(
-                        [
-                            ft.Container(
-                                ft.Icon(ft.Icons.PERSON_OUTLINE_ROUNDED, color=ft.Colors.WHITE, size=24),
-                                bgcolor="#FF6900",
-                                border_radius=7,
-                                width=36,
-                                height=36
-                            ),
-                            ft.Column(
-                                [
-                                    ft.Text(r['username'], size=14, weight=ft.FontWeight.W_500),
-                                    ft.Text(r['email'], size=11, color=ft.Colors.GREY_600),
-                                ],
-                                spacing=0,
-                                expand=True
-                            ),
-                            badge,
-                            # Phone Button
-                            ft.IconButton(
-                                icon=ft.Icons.PHONE_OUTLINED,
-                                icon_color=ft.Colors.GREEN_600,
-                                tooltip="Call/Text" if r['phone'] != "N/A" else "No phone number",
-                                disabled=r['phone'] == "N/A",
-                                on_click=lambda e, phone=r['phone']: self.page.launch_url(f"tel:{phone}")
-                            ),
-                            # Email Button
-                            ft.IconButton(
-                                icon=ft.Icons.EMAIL_OUTLINED,
-                                icon_color=ft.Colors.BLUE_600,
-                                tooltip="Send Email",
-                                on_click=lambda e, email=r['email']: self.page.launch_url(f"mailto:{email}")
-                            ),
-                            ft.IconButton(
-                                icon=ft.Icons.EDIT_OUTLINED,
-                                icon_color="#4D84FC",
-                                on_click=lambda e, res=r: self.page.run_task(self.show_edit_dialog, res)
-                            ),
-                            ft.IconButton(
-                                icon=ft.Icons.DELETE_OUTLINE_ROUNDED,
-                                icon_color="#D66875",
-                                on_click=lambda e, res=r: self.page.run_task(self.show_delete_dialog, res)
-                            ),
-                        ]
-                    ),
-                    padding=10,
-                    border=ft.border.all(1.5, "#FEF3C6"),
-                    border_radius=10
-                )
-                self.residents_list.controls.append(card)
-
-        self.page.update()
-
     async def filter_residents(self):
-        query = (self.search_field.value or "").lower()
-        filter_val = self.room_filter.value
+        """Restarts the list from the first page of residents matching the search field and room filter."""
+        await self.resident_rows.reload()
+
+    async def fetch_residents(self, after_id, limit):
+        return await self.page.data.search_residents(
+            self.admin_page.user_id,
+            query=(self.search_field.value or "").strip(),
+            assignment=self.room_filter.value,
+            after_id=after_id,
+            limit=limit
+        )
 
-        filtered = []
-        for r in self.all_residents:
-            if query and query not in r['username'].lower() and query not in r['email'].lower():
-                continue
-            if filter_val == "assigned" and r['room_id'] == "N/A":
-                continue
-            if filter_val == "unassigned" and r['room_id'] != "N/A":
-                continue
-            filtered.append(r)
+    def create_resident_card(self, r):
+        # Room Badge
+        badge = create_remark(
+            f"Room {r.room_id}" if r.room_id is not None else "Unassigned",
+            "#00cc0a" if r.room_id is not None else "#808899",
+            "#b3ffb6" if r.room_id is not None else "#F3F4F6"
+        )
 
-        await self.display_residents(filtered)
+        return ft.Container(
+            ft.Row(
+                [
+                    ft.Container(
+                        ft.Icon(ft.Icons.PERSON_OUTLINE_ROUNDED, color=ft.Colors.WHITE, size=24),
+                        bgcolor="#FF6900",
+                        border_radius=7,
+                        width=36,
+                        height=36
+                    ),
+                    ft.Column(
+                        [
+                            ft.Text(r.username, size=14, weight=ft.FontWeight.W_500),
+                            ft.Text(r.email, size=11, color=ft.Colors.GREY_600),
+                        ],
+                        spacing=0,
+                        expand=True
+                    ),
+                    badge,
+                    # Phone Button
+                    ft.IconButton(
+                        icon=ft.Icons.PHONE_OUTLINED,
+                        icon_color=ft.Colors.GREEN_600,
+                        tooltip="Call/Text" if r.phone_number != "N/A" else "No phone number",
+                        disabled=r.phone_number == "N/A",
+                        on_click=lambda e, phone=r.phone_number: self.page.launch_url(f"tel:{phone}")
+                    ),
+                    # Email Button
+                    ft.IconButton(
+                        icon=ft.Icons.EMAIL_OUTLINED,
+                        icon_color=ft.Colors.BLUE_600,
+                        tooltip="Send Email",
+                        on_click=lambda e, email=r.email: self.page.launch_url(f"mailto:{email}")
+                    ),
+                    ft.IconButton(
+                        icon=ft.Icons.EDIT_OUTLINED,
+                        icon_color="#4D84FC",
+                        on_click=lambda e, res=r: self.page.run_task(self.show_edit_dialog, res)
+                    ),
+                    ft.IconButton(
+                        icon=ft.Icons.DELETE_OUTLINE_ROUNDED,
+                        icon_color="#D66875",
+                        on_click=lambda e, res=r: self.page.run_task(self.show_delete_dialog, res)
+                    ),
+                ]
+            ),
+            padding=10,
+            border=ft.border.all(1.5, "#FEF3C6"),
+            border_radius=10
+        )
 
     async def show_add_dialog(self):
         username_f = ft.TextField(label="Username", border_radius=10)
@@ -336,28 +317,28 @@ class Residents(Section):
                 if not username_f.value or not email_f.value or not password_f.value:
                     return
 
-                await self.page.data.create_user(
-                    username_f.value.strip(),
-                    email_f.value.strip(),
-                    password_f.value,
-                    phone_f.value.strip() if phone_f.value else "N/A"
-                )
+                try:
+                    await self.page.data.create_user(
+                        username_f.value.strip(),
+                        email_f.value.strip(),
+                        password_f.value,
+                        phone_f.value.strip() if phone_f.value else "N/A"
+                    )
+                except aiomysql.IntegrityError as ex:
+                    if "uq_users_username" not in str(ex): raise
+                    username_f.error_text = "Username is already taken"
+                    username_f.update()
+                    return
 
                 # Update phone and dates if provided
                 user = await self.page.data.get_user_by_email(email_f.value.strip())
-                if user:
-                    data = json.loads(user[0][4])
+                if user and selected_date[0]:
+                    move_in_dt = selected_date[0]
+                    ts = int(move_in_dt.timestamp())
                     
-                    if selected_date[0]:
-                        move_in_dt = selected_date[0]
-                        ts = int(move_in_dt.timestamp())
-                        data["move_in_date"] = str(ts)
-                        
-                        # Calculate exact one month later for first payment
-                        new_due_dt = self.add_months(move_in_dt, 1)
-                        data["due_date"] = str(int(new_due_dt.timestamp()))
-
-                    await self.page.data.update_user(user[0][0], user[0][1], user[0][2], user[0][3], data)
+                    # Calculate exact one month later for first payment
+                    new_due_dt = self.add_months(move_in_dt, 1)
+                    await self.page.data.update_user_fields(user[0].id, {"move_in_date": str(ts)}, due_date=int(new_due_dt.timestamp()))
 
                 self.page.close(dlg)
                 create_banner(self.page, ft.Colors.GREEN_100, ft.Icon(ft.Icons.CHECK, color=ft.Colors.GREEN), "Resident added!", ft.Colors.GREEN)
@@ -387,48 +368,21 @@ class Residents(Section):
         self.page.open(dlg)
 
     async def show_edit_dialog(self, resident):
-        username_f = ft.TextField(label="Username", value=resident['username'], border_radius=10)
-        email_f = ft.TextField(label="Email", value=resident['email'], border_radius=10)
-        phone_f = ft.TextField(label="Phone", value=resident['phone'], border_radius=10)
-
-        current_admin_id = self.admin_page.page.data.get_active_user()
-
-        rooms = await self.page.data.get_all_rooms(admin_user_id=current_admin_id)
+        username_f = ft.TextField(label="Username", value=resident.username, border_radius=10)
+        email_f = ft.TextField(label="Email", value=resident.email, border_radius=10)
+        phone_f = ft.TextField(label="Phone", value=resident.phone_number, border_radius=10)
 
-        all_users = await self.page.data.get_all_users() 
-
-        # Calculate current occupancy for all rooms (excluding the resident being edited)
-        room_occupancy_map = {}
-        current_resident_id = resident['id']
-        
-        for user in all_users:
-            user_id = user[0]
-            if user_id == current_resident_id:
-                continue 
-            
-            try:
-                u_data = json.loads(user[4])
-                room_id = str(u_data.get("room_id", "N/A"))
-                if room_id != "N/A":
-                    room_occupancy_map[room_id] = room_occupancy_map.get(room_id, 0) + 1
-            except:
-                continue
+        # Rooms with a free bed (not counting the resident being edited), plus their current one
+        rooms = await self.page.data.get_rooms_with_occupancy(
+            self.admin_page.user_id, exclude_user_id=resident.id, with_free_beds=True, include_room_id=resident.room_id
+        )
 
         room_opts = [ft.dropdown.Option("N/A", "No Room")]
-        current_resident_room_id = str(resident['room_id'])
-        
-        # Build options, filtering out full rooms
+        current_resident_room_id = str(resident.room_id) if resident.room_id is not None else "N/A"
+
         for room in rooms:
-            room_id_str = str(room[0])
-            max_capacity = room[4]
-            current_occupancy = room_occupancy_map.get(room_id_str, 0)
-            
-            is_current_room = room_id_str == current_resident_room_id
-            is_available = current_occupancy < max_capacity
-            
-            if is_current_room or is_available:
-                 room_opts.append(ft.dropdown.Option(room_id_str, f"Room {room_id_str} ({current_occupancy}/{max_capacity})"))
-            
+            room_opts.append(ft.dropdown.Option(str(room.id), f"Room {room.id} ({room.residents_count}/{room.bed_count})"))
+
         
         room_dd = ft.Dropdown(
             label="Room",
@@ -438,7 +392,7 @@ class Residents(Section):
         )
 
         # Date Picker for Move-in Date
-        current_ts = resident['data'].get("move_in_date", "N/A")
+        current_ts = resident.data.get("move_in_date", "N/A")
         initial_date = None
         button_text = "Select Move-in Date"
         selected_date = [None]
@@ -482,9 +436,11 @@ class Residents(Section):
             new_room_id = room_dd.value
             
             try:
-                data = resident['data'].copy()
+                # Only the fields this dialog edits; anything else may have changed since it was opened
+                data = {}
                 data['phone_number'] = phone_f.value.strip() if phone_f.value else "N/A"
                 data['room_id'] = new_room_id if new_room_id != "N/A" else "N/A"
+                due_date = None
                 
                 if selected_date[0]:
                     move_in_dt = selected_date[0]
@@ -492,15 +448,21 @@ class Residents(Section):
                     data['move_in_date'] = str(ts)
                     # Set Next Due Date to 1 month after move-in
                     new_due_dt = self.add_months(move_in_dt, 1)
-                    data['due_date'] = str(int(new_due_dt.timestamp()))
+                    due_date = int(new_due_dt.timestamp())
 
-                await self.page.data.update_user(
-                    resident['id'],
-                    username_f.value.strip(),
-                    email_f.value.strip(),
-                    resident['password'],
-                    data
-                )
+                try:
+                    await self.page.data.update_user_fields(
+                        resident.id,
+                        data,
+                        due_date=due_date,
+                        username=username_f.value.strip(),
+                        email=email_f.value.strip()
+                    )
+                except aiomysql.IntegrityError as ex:
+                    if "uq_users_username" not in str(ex): raise
+                    username_f.error_text = "Username is already taken"
+                    username_f.update()
+                    return
 
                 self.page.close(dlg)
                 create_banner(self.page, ft.Colors.GREEN_100, ft.Icon(ft.Icons.CHECK, color=ft.Colors.GREEN), "Resident updated!", ft.Colors.GREEN)
@@ -535,7 +497,7 @@ class Residents(Section):
     async def show_delete_dialog(self, resident):
         async def delete_action(e):
             try:
-                await self.page.data.delete_user(resident['id'])
+                await self.page.data.delete_user(resident.id)
                 self.page.close(dlg)
                 create_banner(self.page, ft.Colors.GREEN_100, ft.Icon(ft.Icons.CHECK, color=ft.Colors.GREEN), "Resident deleted!", ft.Colors.GREEN)
                 await self.load_data()
@@ -544,7 +506,7 @@ class Residents(Section):
 
         dlg = ft.AlertDialog(
             title=ft.Text("Delete Resident"),
-            content=ft.Text(f"Delete {resident['username']}?"),
+            content=ft.Text(f"Delete {resident.username}?"),
             actions=[
                 ft.TextButton("Cancel", on_click=lambda e: self.page.close(dlg)),
                 ft.FilledButton("Delete", bgcolor="#D66875", on_click=lambda e: self.page.run_task(delete_action, e))
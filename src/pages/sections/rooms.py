@@ -1,17 +1,22 @@
 import flet as ft
 from flet import FilePickerUploadFile
 import json
-import os, shutil
+import asyncio
 
 from pages.sections.section import Section
 from utils.element_factory import create_info_card, create_banner
+from utils.keyed_list import KeyedList
+from utils.thumbnails import store_thumbnail, thumbnail_name
 
 class Rooms(Section):
+    TABLES = ("rooms", "users")
+
     def __init__(self, admin_page):
         super().__init__()
         self.admin_page = admin_page
         
         self.rooms_list = ft.Column(spacing=15, expand=True)
+        self.room_rows = KeyedList(self.rooms_list, self.create_room_card, key=lambda room: room['id'], placeholder=self.create_empty_placeholder)
 
         header = ft.Row(
             [
@@ -28,74 +33,61 @@ class Rooms(Section):
             expand=True, padding=10
         )
 
-        self.admin_page.page.run_task(self.load_rooms)
+        self.start_load(self.admin_page.page, self.load_rooms)
+
+    async def refresh(self):
+        await self.load_rooms()
+        return True
 
     async def load_rooms(self):
         try:
-            self.rooms_list.controls.clear()
-        
-            current_admin_id = self.admin_page.page.data.get_active_user()
-
-            rooms_data = await self.admin_page.page.data.get_all_rooms(admin_user_id=current_admin_id)
-    
-            users_data = await self.admin_page.page.data.get_all_users()
-            
-            # Count residents per room
-            room_occupancy = {}
-            for user in users_data:
-                try:
-                    u_data = json.loads(user[4])
-                    room_id = str(u_data.get("room_id", "N/A"))
-                    if room_id != "N/A":
-                        room_occupancy[room_id] = room_occupancy.get(room_id, 0) + 1
-                except:
-                    pass
-
-            if not rooms_data:
-                self.rooms_list.controls.append(
-                    ft.Container(
-                        ft.Column([
-                            ft.Icon(ft.Icons.BED_OUTLINED, size=64, color="grey"),
-                            ft.Text("No rooms available", color="grey")
-                        ], horizontal_alignment="center"),
-                        alignment=ft.alignment.center, padding=50
-                    )
-                )
-            else:
-                for r in rooms_data:
-                    # Calculate dynamic status
-                    room_id_str = str(r[0])
-                    current_residents = room_occupancy.get(room_id_str, 0)
-                    bed_count = r[4] # Index 4 is bed_count
-                    db_status = r[6] # Index 6 is current_status
-                    
-                    if db_status == "maintenance":
-                        status = "maintenance"
-                    elif current_residents >= bed_count:
-                        status = "occupied"
-                    else:
-                        status = "available"
-
-                    room = {
-                        'id': r[0], 
-                        'bed_count': bed_count, 
-                        'monthly_rent': r[5], 
-                        'status': status, 
-                        'thumbnail': r[7], 
-                        'current_residents': current_residents 
-                    }
-                    self.rooms_list.controls.append(self.create_room_card(room))
-            
+            # Residents per room come counted with the rooms
+            rooms_data = await self.admin_page.context.rooms()
+
+            rooms = []
+            for r in rooms_data:
+                # Calculate dynamic status
+                current_residents = r.residents_count
+                bed_count = r.bed_count
+                db_status = r.current_status
+                
+                if db_status == "maintenance":
+                    status = "maintenance"
+                elif current_residents >= bed_count:
+                    status = "occupied"
+                else:
+                    status = "available"
+
+                rooms.append({
+                    'id': r.id, 
+                    'bed_count': bed_count, 
+                    'monthly_rent': r.monthly_rent, 
+                    'status': status, 
+                    'thumbnail': r.thumbnail, 
+                    'current_residents': current_residents 
+                })
+
+            # Only rooms whose values changed get a new card
+            self.room_rows.set_items(rooms)
             self.admin_page.page.update()
         except Exception as e: 
             print(f"Error loading rooms: {e}")
 
+    def create_empty_placeholder(self):
+        return ft.Container(
+            ft.Column([
+                ft.Icon(ft.Icons.BED_OUTLINED, size=64, color="grey"),
+                ft.Text("No rooms available", color="grey")
+            ], horizontal_alignment="center"),
+            alignment=ft.alignment.center, padding=50
+        )
+
     def create_room_card(self, room):
         status_colors = {"available": "green", "occupied": "red", "maintenance": "orange"}
         color = status_colors.get(room['status'], "grey")
         
-        thumb = f"assets/room_thumbnails/{room['thumbnail']}"
-        if not os.path.exists(thumb): thumb = "assets/placeholder.jpg"
+        card_thumb = thumbnail_name(room['thumbnail'], "card")
+        thumb = f"assets/room_thumbnails/{card_thumb}" if card_thumb else "assets/placeholder.jpg"
         
         occupancy_text = f"{room['current_residents']}/{room['bed_count']} Beds"
 
@@ -157,15 +149,9 @@ class Rooms(Section):
 
         file_name = current_thumbnail
         if file_picker.result and file_picker.result.files:
-            f = file_picker.result.files[0]
-            file_name = f.name
-            os.makedirs("assets/room_thumbnails", exist_ok=True)
-            shutil.copy2(f.path, f"assets/room_thumbnails/{file_name}")
-
-        await self.admin_page.page.data.custom_query(
-            "UPDATE rooms SET bed_count=%s, monthly_rent=%s, current_status=%s, thumbnail=%s WHERE id=%s",
-            (int(bed_count.value), int(monthly_rent.value), status.value, file_name, room_id)
-        )
+            file_name = await asyncio.to_thread(store_thumbnail, file_picker.result.files[0].path)
+
+        await self.admin_page.page.data.update_room(room_id, int(bed_count.value), int(monthly_rent.value), status.value, file_name)
         
         self.admin_page.page.close(popup)
         create_banner(self.admin_page.page, ft.Colors.BLUE_100, ft.Icon(ft.Icons.EDIT, color="blue"), f"Room #{room_id} updated!", "blue")
@@ -199,10 +185,7 @@ class Rooms(Section):
 
         file_name = "placeholder.jpg"
         if file_picker.result and file_picker.result.files:
-            f = file_picker.result.files[0]
-            file_name = f.name
-            os.makedirs("assets/room_thumbnails", exist_ok=True)
-            shutil.copy2(f.path, f"assets/room_thumbnails/{file_name}")
+            file_name = await asyncio.to_thread(store_thumbnail, file_picker.result.files[0].path)
 
         # Get Admin ID for room creation
         admin_id = self.admin_page.page.data.get_active_user()
@@ -228,7 +211,7 @@ class Rooms(Section):
 
     async def process_delete(self, rid, dlg):
         try:
-            await self.admin_page.page.data.custom_query("DELETE FROM rooms WHERE id=%s", (rid,))
+            await self.admin_page.page.data.delete_room(rid)
             self.admin_page.page.close(dlg)
             create_banner(self.admin_page.page, ft.Colors.RED_100, ft.Icon(ft.Icons.DELETE, color="red"), "Room deleted!", "red")
             await self.load_rooms()
@@ -1,9 +1,37 @@
 import flet as ft
 
+from utils.profiling import timed
+
+def tables_changed(tables, loaded_versions, versions):
+    """True if any of `tables` has a different table_versions entry than when `loaded_versions` was taken."""
+    if tables is None: return True
+    return any(versions.get(t, 0) != loaded_versions.get(t, 0) for t in tables)
+
 class Section(ft.Container):
+    # Tables the section reads. Portals keep one instance per tab and, on revisit, only refresh it when
+    # one of these changed since it last loaded. None refreshes on every visit, () never does.
+    TABLES = ()
+
     def __init__(self):
         super().__init__()
         
         self.margin = ft.margin.only(top=10)
         self.padding = ft.padding.all(10)
-        self.expand = True
\ No newline at end of file
+        self.expand = True
+
+        self.loaded_versions = {}
+
+    def start_load(self, page, func, *args):
+        """Runs the section's first load as a page task, timed on its own and labeled with the route and section."""
+        page.run_task(timed, f"{page.route} {type(self).__name__}", func, *args)
+
+    def is_stale(self, versions):
+        return tables_changed(self.TABLES, self.loaded_versions, versions)
+
+    async def refresh(self):
+        """Reloads the section's data into its existing controls and returns True.
+
+        Sections that build everything from their portal's data in __init__ keep this default,
+        which returns False so the portal builds a fresh instance instead.
+        """
+        return False
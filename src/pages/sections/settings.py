@@ -1,9 +1,12 @@
 import flet as ft
+import aiomysql
 import json
 from pages.sections.section import Section
 from utils.element_factory import create_banner
 
 class Settings(Section):
+    TABLES = ("users",)
+
     def __init__(self, controller):
         super().__init__()
         self.controller = controller # AdminPage or ResidentPage instance
@@ -93,12 +96,9 @@ class Settings(Section):
         if self.is_resident:
             self.controller.data["notifications_enabled"] = self.notify_switch.value
             try:
-                await self.controller.page.data.update_user(
+                await self.controller.page.data.update_user_fields(
                     self.controller.id,
-                    self.controller.username,
-                    self.controller.email,
-                    self.controller.password,
-                    self.controller.data
+                    {"notifications_enabled": self.notify_switch.value}
                 )
                 create_banner(self.controller.page, ft.Colors.GREEN_100, ft.Icon(ft.Icons.CHECK, color="green"), "Preferences saved!", ft.Colors.GREEN)
             except Exception as ex:
@@ -119,12 +119,10 @@ class Settings(Section):
                 return
 
             try:
-                await self.controller.page.data.update_user(
+                await self.controller.page.data.update_user_fields(
                     self.controller.id,
-                    user_tf.value,
-                    email_tf.value,
-                    self.controller.password,
-                    self.controller.data
+                    username=user_tf.value,
+                    email=email_tf.value
                 )
                 
                 self.controller.username = user_tf.value
@@ -139,6 +137,11 @@ class Settings(Section):
                 self.controller.page.close(dlg)
                 create_banner(self.controller.page, ft.Colors.GREEN_100, ft.Icon(ft.Icons.CHECK, color="green"), "Profile updated successfully!", ft.Colors.GREEN)
                 
+            except aiomysql.IntegrityError as ex:
+                if "uq_users_username" not in str(ex):
+                    print(ex); return
+                user_tf.error_text = "Username is already taken"
+                user_tf.update()
             except Exception as ex:
                 print(ex)
 
@@ -176,12 +179,9 @@ class Settings(Section):
                 return
 
             try:
-                await self.controller.page.data.update_user(
+                await self.controller.page.data.update_user_fields(
                     self.controller.id,
-                    self.controller.username,
-                    self.controller.email,
-                    new_pass.value,
-                    self.controller.data
+                    password=new_pass.value
                 )
                 
                 self.controller.password = new_pass.value
@@ -0,0 +1,126 @@
+import copy
+import json
+
+# Rows as returned by Database. JSON columns are decoded once, when the record is built, and the
+# records may be shared through Database.cache: treat them as read-only and use copy_data() (or
+# copy.deepcopy) before changing a decoded column.
+
+def decode_json(raw, default):
+    try: value = json.loads(raw) if raw else None
+    except (ValueError, TypeError): value = None
+    return value if value is not None else default()
+
+def to_timestamp(value):
+    """Epoch seconds from the TEXT/BIGINT date columns, or 0 if unset or unparsable."""
+    try: return int(value)
+    except (ValueError, TypeError): return 0
+
+class Record:
+    __slots__ = ()
+    COLUMNS = ()      # table columns, in the order select() lists them
+    JSON_COLUMNS = {} # column -> default factory, used when the stored JSON is missing or invalid
+
+    def __init__(self, row):
+        for name, value in zip(self.COLUMNS, row):
+            default = self.JSON_COLUMNS.get(name)
+            setattr(self, name, decode_json(value, default) if default is not None else value)
+
+    @classmethod
+    def select(cls, alias=None):
+        """The column list for a SELECT, so records don't depend on the table's physical column order."""
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(prefix + c for c in cls.COLUMNS)
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls(row) for row in rows]
+
+    def values(self):
+        """Every field as a tuple; compares equal for two fetches of an unchanged row."""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={getattr(self, 'id', None)!r})"
+
+class User(Record):
+    COLUMNS = ("id", "username", "email", "password", "data", "role", "linked_admin_id", "room_id", "move_in_date", "due_date", "access_key")
+    JSON_COLUMNS = {"data": dict}
+    __slots__ = COLUMNS
+
+    @property
+    def phone_number(self):
+        return self.data.get("phone_number", "N/A")
+
+    @property
+    def is_admin(self):
+        return self.role == "admin"
+
+    def copy_data(self):
+        """A private copy of `data` that can be changed without touching the shared record."""
+        return copy.deepcopy(self.data)
+
+class Room(Record):
+    COLUMNS = ("id", "admin_user_id", "amenities", "residents", "bed_count", "monthly_rent", "current_status", "thumbnail")
+    JSON_COLUMNS = {"amenities": list, "residents": list}
+    EXTRA_COLUMNS = ("residents_count",) # only filled by Database.get_rooms_with_occupancy
+    __slots__ = COLUMNS + EXTRA_COLUMNS
+
+    def __init__(self, row):
+        super().__init__(row)
+        extras = row[len(self.COLUMNS):]
+        self.residents_count = int(extras[0]) if len(extras) > 0 else 0
+
+    @property
+    def free_beds(self):
+        return max((self.bed_count or 0) - self.residents_count, 0)
+
+class MaintenanceRequest(Record):
+    COLUMNS = ("id", "room_id", "issue", "current_status", "urgency", "user_id", "admin_user_id", "date_created", "date_updated")
+    JSON_COLUMNS = {"issue": dict}
+    EXTRA_COLUMNS = ("username",) # only filled by Database.get_admin_requests_page
+    __slots__ = COLUMNS + EXTRA_COLUMNS
+
+    def __init__(self, row):
+        super().__init__(row)
+        extras = row[len(self.COLUMNS):]
+        self.username = extras[0] if len(extras) > 0 else None
+
+    @property
+    def title(self):
+        return self.issue.get("title", "No Title")
+
+    @property
+    def desc(self):
+        return self.issue.get("desc", "No Description")
+
+    @property
+    def status(self):
+        return self.current_status or "pending"
+
+    @property
+    def created_at(self):
+        return to_timestamp(self.date_created)
+
+class Announcement(Record):
+    COLUMNS = ("id", "admin_user_id", "title", "content", "date_created")
+    EXTRA_COLUMNS = ("like_count", "comment_count", "liked_by_viewer") # only filled by Database.get_announcements_with_counts
+    __slots__ = COLUMNS + EXTRA_COLUMNS
+
+    def __init__(self, row):
+        super().__init__(row)
+        extras = row[len(self.COLUMNS):]
+        self.like_count = int(extras[0]) if len(extras) > 0 else 0
+        self.comment_count = int(extras[1]) if len(extras) > 1 else 0
+        self.liked_by_viewer = bool(extras[2]) if len(extras) > 2 else False
+
+    @property
+    def created_at(self):
+        return to_timestamp(self.date_created)
+
+class Comment(Record):
+    COLUMNS = ("id", "announcement_id", "user_id", "username", "content", "date_created", "parent_id")
+    __slots__ = COLUMNS
+
+    @property
+    def created_at(self):
+        return to_timestamp(self.date_created)
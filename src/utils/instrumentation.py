@@ -0,0 +1,134 @@
+import functools
+import inspect
+import os
+import sys
+import time
+from collections import Counter
+
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000) # upper bounds; slower calls land in the "inf" bucket
+# Diagnostics tab, JSON export and per-call caller attribution (a stack walk on every call); off in production
+DIAGNOSTICS_ENABLED = os.getenv("DORMHUB_DIAGNOSTICS", "").lower() in ("1", "true", "yes")
+
+def find_caller(skip_path):
+    """Class name of the nearest calling `self` defined outside `skip_path` (e.g. "Residents"), or its module name."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename != skip_path and not filename.endswith(("instrumentation.py", "contextlib.py")) and "asyncio" not in filename:
+            caller = frame.f_locals.get("self")
+            if caller is not None: return type(caller).__name__
+            return os.path.splitext(os.path.basename(filename))[0]
+        frame = frame.f_back
+    return "unknown"
+
+class MethodStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.histogram = Counter()
+        self.callers = Counter()
+
+    def record(self, duration_ms, rows, caller, failed):
+        self.calls += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        if failed: self.errors += 1
+        if rows is not None: self.rows += rows
+        if caller is not None: self.callers[caller] += 1
+
+        bucket = next((f"<={b}ms" for b in LATENCY_BUCKETS_MS if duration_ms <= b), "inf")
+        self.histogram[bucket] += 1
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "total_ms": round(self.total_ms, 2),
+            "rows": self.rows,
+            "histogram": dict(self.histogram),
+            "callers": dict(self.callers)
+        }
+
+class Instrumentation:
+    """Per-method call statistics for Database, plus a slow-query log.
+
+    Listeners added with add_listener(fn) are called as fn(method, duration_ms, rows, caller) after every call,
+    so other tools can hook in without touching Database. caller is None unless DIAGNOSTICS_ENABLED.
+    """
+
+    MAX_SLOW_QUERIES = 50
+
+    def __init__(self, slow_query_ms=None):
+        self.slow_query_ms = slow_query_ms if slow_query_ms is not None else float(os.getenv("DORMHUB_SLOW_QUERY_MS", 200))
+        self.methods = {}
+        self.slow_queries = [] # most recent last, capped at MAX_SLOW_QUERIES
+        self.listeners = []
+        self.started_at = int(time.time())
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def record_call(self, method, duration_ms, rows, caller, failed=False):
+        self.methods.setdefault(method, MethodStats()).record(duration_ms, rows, caller, failed)
+        for listener in self.listeners:
+            try: listener(method, duration_ms, rows, caller)
+            except Exception as e: print(f"Instrumentation listener failed: {e}")
+
+    def record_query(self, query, duration_ms, skip_path):
+        """Logs the statement if it ran longer than slow_query_ms, attributed to the first caller outside `skip_path`."""
+        if duration_ms < self.slow_query_ms: return
+
+        caller = find_caller(skip_path) if DIAGNOSTICS_ENABLED else "unknown"
+        sql = " ".join(query.split())
+        print(f"Slow query ({duration_ms:.1f} ms) from {caller}: {sql[:300]}")
+        self.slow_queries.append({"at": int(time.time()), "duration_ms": round(duration_ms, 1), "caller": caller, "sql": sql})
+        del self.slow_queries[:-self.MAX_SLOW_QUERIES]
+
+    def reset(self):
+        self.methods.clear()
+        self.slow_queries.clear()
+        self.started_at = int(time.time())
+
+    def snapshot(self):
+        return {
+            "started_at": self.started_at,
+            "slow_query_ms": self.slow_query_ms,
+            "methods": {name: stats.snapshot() for name, stats in sorted(self.methods.items())},
+            "slow_queries": list(self.slow_queries)
+        }
+
+def count_rows(result):
+    if isinstance(result, (list, tuple)): return len(result)
+    return None
+
+def instrument_methods(cls):
+    """Class decorator: times every public coroutine method through `self.instrumentation`."""
+    source_path = sys.modules[cls.__module__].__file__
+
+    def wrap(name, func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            failed = False
+            result = None
+            try:
+                result = await func(self, *args, **kwargs)
+                return result
+            except:
+                failed = True
+                raise
+            finally:
+                duration_ms = (time.perf_counter() - start) * 1000
+                caller = find_caller(source_path) if DIAGNOSTICS_ENABLED else None
+                self.instrumentation.record_call(name, duration_ms, count_rows(result), caller, failed)
+        return wrapper
+
+    for name, func in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(func): continue
+        setattr(cls, name, wrap(name, func))
+    return cls
@@ -0,0 +1,74 @@
+class KeyedList:
+    """Keeps the controls of a ListView (or Column) in step with a list of items, keyed by id.
+
+    Rows are cached per key together with their signature (the values they show) and rebuilt
+    only when it changes. Kept rows stay the same control objects, so the next update() only
+    sends what was added, removed or rebuilt. With batch_size, only that many rows are put on
+    the list at first; render_more(), called from the list's on_scroll, adds the next batch.
+
+    Nothing here calls update(); callers do, as they did before.
+    """
+
+    def __init__(self, list_view, build, key=None, signature=None, batch_size=None, placeholder=None):
+        self.list_view = list_view
+        self.build = build # item -> control
+        self.key = key or (lambda item: item.id)
+        self.signature = signature or (lambda item: item)
+        self.batch_size = batch_size
+        self.placeholder = placeholder # () -> control shown when there are no items
+        self.items = []
+        self.rows = {} # key -> (signature, control)
+        self.rendered_count = 0
+
+    def row(self, item):
+        key, signature = self.key(item), self.signature(item)
+        cached = self.rows.get(key)
+        if cached is None or cached[0] != signature:
+            cached = (signature, self.build(item))
+            self.rows[key] = cached
+        return cached[1]
+
+    def set_items(self, items, keep_position=False):
+        """Replaces the items. With keep_position (a refresh of the same list) as many rows stay rendered as before."""
+        self.items = list(items)
+        keys = {self.key(item) for item in self.items}
+        self.rows = {key: row for key, row in self.rows.items() if key in keys}
+
+        count = self.batch_size if self.batch_size is not None else len(self.items)
+        if keep_position: count = max(count, self.rendered_count)
+        self.rendered_count = min(count, len(self.items))
+        self.render()
+
+    def append_items(self, items):
+        """Adds items after the current ones, e.g. the next page of a feed."""
+        self.items.extend(items)
+        if self.batch_size is None: self.rendered_count = len(self.items)
+        self.render()
+
+    def render_more(self):
+        """Renders the next batch. Returns False if every item is already on the list."""
+        if self.rendered_count >= len(self.items): return False
+        self.rendered_count = min(self.rendered_count + (self.batch_size or len(self.items)), len(self.items))
+        self.render()
+        return True
+
+    def control(self, key):
+        """The row built for `key`, or None if it isn't cached (any more)."""
+        cached = self.rows.get(key)
+        return cached[1] if cached else None
+
+    def invalidate(self, key):
+        """Forces the row for `key` to be rebuilt the next time it is rendered."""
+        self.rows.pop(key, None)
+
+    def clear(self):
+        self.items = []
+        self.rows = {}
+        self.rendered_count = 0
+        self.list_view.controls = []
+
+    def render(self):
+        if not self.items and self.placeholder is not None:
+            self.list_view.controls = [self.placeholder()]
+        else:
+            self.list_view.controls = [self.row(item) for item in self.items[:self.rendered_count]]
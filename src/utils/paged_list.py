@@ -0,0 +1,59 @@
+from utils.keyed_list import KeyedList
+
+LOAD_MORE_THRESHOLD = 200 # pixels from the bottom at which the next page is fetched
+
+class PagedList(KeyedList):
+    """A KeyedList filled one keyset page at a time, fetching the next page as the list scrolls to its end.
+
+    fetch_page(cursor, limit) returns up to `limit` items following `cursor`, which is None for the first
+    page and cursor(last item) after that. The list view's on_scroll is taken over. Unlike KeyedList,
+    each loaded page is sent with page.update().
+    """
+
+    def __init__(self, page, list_view, build, fetch_page, cursor=None, page_size=20, threshold=LOAD_MORE_THRESHOLD, **kwargs):
+        super().__init__(list_view, build, **kwargs)
+        self.page = page
+        self.fetch_page = fetch_page
+        self.cursor = cursor or (lambda item: item.id)
+        self.page_size = page_size
+        self.threshold = threshold
+        self.last_cursor = None # cursor after the last item shown, None until the first page is in
+        self.has_more = True
+        self.loading = False
+        self.generation = 0
+        list_view.on_scroll = self.on_scroll
+
+    def on_scroll(self, e):
+        if e.pixels >= e.max_scroll_extent - self.threshold:
+            self.page.run_task(self.load_more)
+
+    async def reload(self, keep_position=False):
+        """Restarts from the first page, e.g. after the query changed.
+
+        With keep_position (a refresh of the same list) the first page is as long as the list already was.
+        """
+        limit = max(self.page_size, len(self.items)) if keep_position else self.page_size
+        self.last_cursor = None
+        self.has_more = True
+        self.loading = False
+        self.generation += 1 # pages still in flight for the old query are dropped
+        await self.load_more(limit)
+
+    async def load_more(self, limit=None):
+        """Appends the next page."""
+        if self.loading or not self.has_more: return
+        limit = limit or self.page_size
+        self.loading = True
+        generation = self.generation
+        try:
+            items = await self.fetch_page(self.last_cursor, limit)
+        finally:
+            if generation == self.generation: self.loading = False
+        if generation != self.generation: return
+
+        self.has_more = len(items) == limit
+        # The first page replaces the old items, reusing the rows of those still in it
+        if self.last_cursor is None: self.set_items(items)
+        else: self.append_items(items)
+        if items: self.last_cursor = self.cursor(items[-1])
+        self.page.update()
@@ -0,0 +1,59 @@
+class PoolStats:
+    """Counters for the aiomysql pool: how long callers wait for a connection and how long queries hold one."""
+
+    def __init__(self):
+        self.acquires = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.acquire_timeouts = 0
+        self.peak_active = 0
+
+        self.queries = 0
+        self.total_query_time = 0.0
+        self.max_query_time = 0.0
+
+        self.transactions = 0
+        self.total_transaction_time = 0.0
+
+        self.warmup_ms = None
+
+    def record_acquire(self, wait, active):
+        self.acquires += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.peak_active = max(self.peak_active, active)
+
+    def record_timeout(self):
+        self.acquire_timeouts += 1
+
+    def record_query(self, duration):
+        self.queries += 1
+        self.total_query_time += duration
+        self.max_query_time = max(self.max_query_time, duration)
+
+    def record_transaction(self, duration):
+        self.transactions += 1
+        self.total_transaction_time += duration
+
+    def snapshot(self, pool):
+        """Current pool occupancy plus the counters above, in milliseconds."""
+        size = pool.size if pool is not None else 0
+        idle = pool.freesize if pool is not None else 0
+        return {
+            "min_size": pool.minsize if pool is not None else 0,
+            "max_size": pool.maxsize if pool is not None else 0,
+            "size": size,
+            "active": size - idle,
+            "idle": idle,
+            "peak_active": self.peak_active,
+            "acquires": self.acquires,
+            "acquire_timeouts": self.acquire_timeouts,
+            "avg_wait_ms": round(self.total_wait / self.acquires * 1000, 2) if self.acquires else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "queries": self.queries,
+            "avg_query_ms": round(self.total_query_time / self.queries * 1000, 2) if self.queries else 0.0,
+            "max_query_ms": round(self.max_query_time * 1000, 2),
+            "transactions": self.transactions,
+            "avg_transaction_ms": round(self.total_transaction_time / self.transactions * 1000, 2) if self.transactions else 0.0,
+            "warmup_ms": self.warmup_ms
+        }
@@ -0,0 +1,139 @@
+import contextvars
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from utils.instrumentation import DIAGNOSTICS_ENABLED
+
+PROFILE_MODE = os.getenv("DORMHUB_PROFILE", "").lower() # "", "cprofile" or "pyinstrument"
+PROFILE_DIR = os.getenv("DORMHUB_PROFILE_DIR", "profiles")
+MAX_ROUTE_TIMINGS = 50
+
+current_timer = contextvars.ContextVar("current_timer", default=None)
+route_timings = deque(maxlen=MAX_ROUTE_TIMINGS) # most recent last
+
+def add_db_time(duration, calls=1):
+    """Called by Database for every query, transaction and connection wait; counted against the active route, if any."""
+    timer = current_timer.get()
+    if timer is not None:
+        timer.db_time += duration
+        timer.db_calls += calls
+
+async def timed(label, func, *args):
+    """Awaits func(*args) under its own RouteTimer labeled `label`.
+
+    For the work a navigation hands to page.run_task (section loads, revisits): it finishes after the
+    navigation's own timer has reported, so it is timed and reported separately.
+    """
+    with RouteTimer(label).activate():
+        return await func(*args)
+
+@contextmanager
+def measure_update():
+    """Counts the block as page/view update time of the active timer, if there is one."""
+    timer = current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.measure_update():
+        yield
+
+def detach_timer():
+    """Stops the current task from counting against the route it was started from.
+
+    Tasks copy the context of whoever started them, so a long-lived loop started during a navigation
+    would otherwise keep adding its queries to that route's timer. Call it first thing in such loops.
+    """
+    current_timer.set(None)
+
+class RouteTimer:
+    """Splits one navigation into DB time, page.update time and everything else (building controls)."""
+
+    def __init__(self, route):
+        self.route = route
+        self.db_time = 0.0
+        self.db_calls = 0
+        self.update_time = 0.0
+        self.start = None
+        self.total = None
+
+    @contextmanager
+    def activate(self):
+        token = current_timer.set(self)
+        self.start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total = time.perf_counter() - self.start
+            current_timer.reset(token)
+            self.report()
+
+    @contextmanager
+    def measure_update(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.update_time += time.perf_counter() - start
+
+    def summary(self):
+        total_ms = self.total * 1000
+        db_ms = self.db_time * 1000
+        update_ms = self.update_time * 1000
+        return {
+            "route": self.route,
+            "at": int(time.time()),
+            "total_ms": round(total_ms, 1),
+            "db_ms": round(db_ms, 1),
+            "db_calls": self.db_calls,
+            "build_ms": round(max(0.0, total_ms - db_ms - update_ms), 1),
+            "update_ms": round(update_ms, 1)
+        }
+
+    def report(self):
+        summary = self.summary()
+        route_timings.append(summary)
+        if DIAGNOSTICS_ENABLED: print(f"Route {summary['route']}: {summary['total_ms']} ms (db {summary['db_ms']} ms in {summary['db_calls']} calls, build {summary['build_ms']} ms, update {summary['update_ms']} ms)")
+
+def profile_path(route, extension):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = route.strip("/").replace("/", "_") or "root"
+    return os.path.join(PROFILE_DIR, f"{name}-{int(time.time())}.{extension}")
+
+@contextmanager
+def profile_route(route):
+    """Profiles the block when DORMHUB_PROFILE is set, writing one file per navigation into DORMHUB_PROFILE_DIR."""
+    if PROFILE_MODE == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("DORMHUB_PROFILE=pyinstrument but pyinstrument is not installed; profiling disabled.")
+            yield
+            return
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            path = profile_path(route, "html")
+            with open(path, "w") as f: f.write(profiler.output_html())
+            print(f"Profile for {route} written to {path}")
+
+    elif PROFILE_MODE == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = profile_path(route, "prof")
+            profiler.dump_stats(path)
+            print(f"Profile for {route} written to {path} (open with `python -m pstats` or snakeviz)")
+
+    else:
+        yield
@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict
+
+class QueryCache:
+    """Small TTL + LRU cache for Database read results, invalidated per table by the writers."""
+
+    def __init__(self, ttl=5.0, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict() # key -> (expires_at, tables, value)
+        self.generations = {} # table -> number of times it was invalidated
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns (True, value) on a fresh hit, (False, None) otherwise."""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None: del self.entries[key]
+            self.misses += 1
+            return False, None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[2]
+
+    def set(self, key, value, tables):
+        if self.ttl <= 0: return
+
+        self.entries[key] = (time.monotonic() + self.ttl, frozenset(tables), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *tables):
+        """Drops every entry that was read from any of the given tables."""
+        for table in tables: self.generations[table] = self.generations.get(table, 0) + 1
+        stale = [key for key, entry in self.entries.items() if entry[1] & set(tables)]
+        for key in stale: del self.entries[key]
+        self.invalidations += len(stale)
+
+    def generation(self, tables):
+        """Changes whenever any of `tables` is invalidated; lets callers holding their own copies tell if they are stale."""
+        return tuple(self.generations.get(t, 0) for t in tables)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self.entries),
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries
+        }
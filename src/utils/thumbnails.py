@@ -0,0 +1,78 @@
+import hashlib
+import os
+import shutil
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None # listed in pyproject; if it's missing anyway, only the original is stored and served
+    print("Pillow is not installed; room photos will be stored without resized variants.")
+
+# The app's assets dir (src/assets, which flet serves), wherever the app is started from
+THUMBNAIL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "room_thumbnails")
+HASH_LENGTH = 16 # hex digits of the SHA-256 kept in stored file names
+
+# Variant -> (width, height, crop). Sizes are twice the largest on-screen size, for high-DPI displays.
+VARIANTS = {
+    "card": (300, 300, True),     # 150x150 COVER image on the Rooms cards
+    "dialog": (800, 600, False),  # 300px tall image on My Room
+    "full": (1600, 1600, False),  # full-screen image dialog
+}
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+def variant_names(name, variant):
+    stem = os.path.splitext(name)[0]
+    return [f"{stem}_{variant}.jpg", f"{stem}_{variant}.png"]
+
+def store_thumbnail(source_path):
+    """Stores an uploaded image under its content hash, with its resized variants. Returns the stored name.
+
+    Uploading the same image twice stores it once; different images with the same file name no longer
+    overwrite each other. Blocking, so run it through asyncio.to_thread.
+    """
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    name = content_hash(source_path) + os.path.splitext(source_path)[1].lower()
+    original = os.path.join(THUMBNAIL_DIR, name)
+    if not os.path.exists(original): shutil.copyfile(source_path, original)
+
+    if Image is None:
+        print(f"Pillow is not installed; serving {source_path} at full size everywhere.")
+    else:
+        try: make_variants(original, name)
+        except Exception as e: print(f"Could not resize {source_path}, serving the original: {e}")
+    return name
+
+def make_variants(original, name):
+    with Image.open(original) as img:
+        img = ImageOps.exif_transpose(img) # phone photos are often stored sideways with an orientation tag
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+
+        for variant, (width, height, crop) in VARIANTS.items():
+            jpg_name, png_name = variant_names(name, variant)
+            path = os.path.join(THUMBNAIL_DIR, png_name if has_alpha else jpg_name)
+            if os.path.exists(path): continue
+
+            if crop:
+                resized = ImageOps.fit(img, (width, height), Image.LANCZOS)
+            else:
+                resized = img.copy()
+                resized.thumbnail((width, height), Image.LANCZOS) # only ever shrinks
+            if has_alpha: resized.save(path, optimize=True)
+            else: resized.save(path, quality=85, optimize=True, progressive=True)
+
+def thumbnail_name(name, variant):
+    """The smallest stored file for `variant` of a stored thumbnail: the variant if it exists, else the original.
+
+    Returns None if neither exists, so callers can show their placeholder.
+    """
+    if not name: return None
+    for candidate in variant_names(name, variant) + [name]:
+        if os.path.exists(os.path.join(THUMBNAIL_DIR, candidate)): return candidate
+    return None